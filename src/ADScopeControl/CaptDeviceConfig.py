@@ -5,6 +5,7 @@ Created: 2023-10-19 12:35
 Package Version: 
 """
 import logging
+from pathlib import Path
 
 import confPy6 as cfg
 
@@ -28,9 +29,22 @@ class CaptDeviceConfig(cfg.ConfigNode):
             friendly_name="Analog In Channel",
             description="Analog in channel. Defines which channel is used for capturing.")
 
+        self.simultaneous_ain_channels = cfg.Field(
+            [], friendly_name="Simultaneous Analog In Channels",
+            description="Analog in channels that are captured simultaneously (e.g. [0, 1]). "
+                        "If empty, only the selected analog in channel is captured.")
+
         self.show_simulator = cfg.Field(True, friendly_name="Show Simulators",
                                         description="Show available simulators in the device list "
                                                     "provided by the DreamWaves API.")
+        self.known_devices = cfg.Field([], friendly_name="Known devices",
+                                       description="Devices found by the last discovery. They are listed until the "
+                                                   "discovery of the current session finished.")
+
+        self.capability_cache = cfg.Field(Path("./device_capabilities.json"), friendly_name="Capability cache",
+                                          description="File the capabilities of the devices are cached in, so "
+                                                      "selecting a known device does not need to open it")
+
         self.streaming_history = cfg.Field(
             cfg.SelectableList([100, 200, 500 ,1000, 2000, 5000, 10000, 20000, 30000],
                                description=["100 ms", "200 ms", "500 ms", "1 s", "2 s", "5 s", "10 s", "20 s", "30 s"],
@@ -38,6 +52,123 @@ class CaptDeviceConfig(cfg.ConfigNode):
                                ),
             friendly_name="Streaming history", description="Defines the range of the stream in ms")
 
+        self.stream_transport = cfg.Field(
+            cfg.SelectableList(["queue", "shared_memory"],
+                               description=["Queue", "Shared memory ring buffer"],
+                               selected_index=0),
+            friendly_name="Stream transport",
+            description="Transport used for sending the samples from the capture process to the controller. "
+                        "The shared memory ring buffer avoids pickling every chunk.")
+
+        self.stream_buffer_size = cfg.Field(64, friendly_name="Stream buffer size",
+                                            description="Size of the shared memory ring buffer in MB")
+
+        self.preview_queue_length = cfg.Field(32, friendly_name="Preview queue length",
+                                              description="Maximum number of chunks waiting for the live preview. "
+                                                          "If the preview falls behind, the oldest chunks are "
+                                                          "dropped.")
+
+        self.capture_queue_length = cfg.Field(256, friendly_name="Capture queue length",
+                                              description="Maximum number of captured chunks waiting for the "
+                                                          "controller. The capture channel never drops a chunk, the "
+                                                          "capture process waits if it is full.")
+
+        self.raw_samples = cfg.Field(False, friendly_name="Raw samples",
+                                     description="Stream the raw 16 bit ADC codes instead of volts. The samples "
+                                                 "are converted to volts only for plotting and exporting.")
+
+        self.poll_watermark = cfg.Field(0.5, friendly_name="Poll watermark",
+                                        description="Fraction of the device buffer that should not be exceeded "
+                                                    "between two polls of the device (0..1)")
+
+        self.stream_block_size = cfg.Field(4096, friendly_name="Stream block size",
+                                           description="Number of samples per channel collected before they are "
+                                                       "sent to the controller. Values below 2 send every read.")
+
+        self.stream_max_latency = cfg.Field(0.02, friendly_name="Stream maximum latency",
+                                            description="Maximum time in seconds samples are held back for "
+                                                        "collecting a block")
+
+        self.ain_filter = cfg.Field(
+            cfg.SelectableList([0, 1, 2, 3],
+                               description=["Decimate", "Average", "Min/Max", "Average fit"],
+                               selected_index=0),
+            friendly_name="Acquisition filter",
+            description="Filter applied by the device when the sample rate is below the ADC rate. Decimate stores "
+                        "every Nth conversion, Average the mean of N conversions and Min/Max the interleaved "
+                        "minimum and maximum of 2xN conversions.")
+
+        self.capture_length_samples = cfg.Field(0, friendly_name="Capture length (samples)",
+                                                description="Number of samples per channel after which a capture "
+                                                            "ends by itself. 0 uses the capture length in seconds.")
+
+        self.capture_length_seconds = cfg.Field(0.0, friendly_name="Capture length (s)",
+                                                description="Length of a capture in seconds, if no number of "
+                                                            "samples is given. 0 captures until stopped.")
+
+        self.keep_session = cfg.Field(True, friendly_name="Keep device session",
+                                      description="Keep the device open and configured when capturing stops, so "
+                                                  "the next capture only re-arms the acquisition")
+
+        self.settle_threshold = cfg.Field(0.005, friendly_name="Settling threshold",
+                                          description="Maximum drift of the mean signal in V between two windows "
+                                                      "for the offset to count as settled")
+
+        self.settle_window = cfg.Field(0.05, friendly_name="Settling window",
+                                       description="Length of the averaging window for the settling detection in s")
+
+        self.settle_timeout = cfg.Field(2.0, friendly_name="Settling timeout",
+                                        description="Maximum time in s to wait for the offset to settle")
+
+        self.settle_period = cfg.Field(1.0, friendly_name="Settling signal period",
+                                       description="Period in s of the input signal. The offset is estimated as the "
+                                                   "mean over one period, so the signal is not taken for drift. The "
+                                                   "default matches the generated 1 Hz test sine, 0 is for a DC "
+                                                   "input.")
+
+        self.record_to_disk = cfg.Field(False, friendly_name="Record to disk",
+                                        description="The capture process writes the recording directly to a file in "
+                                                    "the record directory instead of keeping it in memory.")
+
+        self.record_directory = cfg.Field(Path("./recordings"), friendly_name="Record directory",
+                                          description="Directory for the recordings written to disk")
+
+        self.memory_budget = cfg.Field(4096, friendly_name="Memory budget",
+                                       description="Memory in MB a capture may occupy. Beyond it, the capture "
+                                                   "continues in a memory-mapped file in the record directory. "
+                                                   "0 keeps the whole capture in memory.")
+
+        self.keep_spill_file = cfg.Field(False, friendly_name="Keep spill file",
+                                         description="Keep the file of a capture that exceeded the memory budget "
+                                                     "when the capture is reset, instead of deleting it")
+
+        self.capture_mode = cfg.Field(
+            cfg.SelectableList(["continuous", "triggered"],
+                               description=["Continuous stream", "Windows around trigger events"],
+                               selected_index=0),
+            friendly_name="Capture mode",
+            description="In triggered mode only windows of samples around the trigger events are shipped.")
+
+        self.trigger_channel = cfg.Field(0, friendly_name="Trigger channel",
+                                         description="Analog in channel the trigger is detected on")
+
+        self.trigger_level = cfg.Field(0.0, friendly_name="Trigger level",
+                                       description="Trigger level in V")
+
+        self.trigger_hysteresis = cfg.Field(0.01, friendly_name="Trigger hysteresis",
+                                            description="Trigger hysteresis in V")
+
+        self.trigger_edge = cfg.Field(
+            cfg.SelectableList(["rising", "falling"], description=["Rising edge", "Falling edge"],
+                               selected_index=0),
+            friendly_name="Trigger edge", description="Edge the trigger fires on")
+
+        self.trigger_pre_samples = cfg.Field(1000, friendly_name="Pre-trigger samples",
+                                             description="Number of samples shipped before each trigger event")
+
+        self.trigger_post_samples = cfg.Field(4000, friendly_name="Post-trigger samples",
+                                              description="Number of samples shipped from each trigger event on")
+
 
 
 
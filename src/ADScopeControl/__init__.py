@@ -62,5 +62,6 @@ ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(myappid)
 
 from .CaptDeviceConfig import CaptDeviceConfig as Config
 from .controller.BaseADScopeController import BaseADScopeController as Controller
+from .controller.MultiADScopeController import MultiADScopeController as MultiController
 from .model.AD2ScopeModel import AD2ScopeModel as Model
 from .view.AD2CaptDeviceView import ControlWindow as View
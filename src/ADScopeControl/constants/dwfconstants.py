@@ -94,6 +94,7 @@ acqmodeSingle1      = c_int(5)
 filterDecimate = c_int(0)
 filterAverage  = c_int(1)
 filterMinMax   = c_int(2)
+filterAverageFit = c_int(3)
 
 # analog in trigger mode:
 trigtypeEdge         = c_int(0)
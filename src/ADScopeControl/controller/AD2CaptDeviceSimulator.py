@@ -7,7 +7,8 @@ from PySide6.QtCore import Slot
 from ADScopeControl.controller.BaseADScopeController import BaseADScopeController
 
 class ADScopeSimulator(BaseADScopeController):
-
+    # The simulated capture loop runs on the thread pool as well
+    LONG_LIVED_TASKS = BaseADScopeController.LONG_LIVED_TASKS + 1
 
     def connect_device(self, device_id):
         self.logger.info("Connecting to simulator")
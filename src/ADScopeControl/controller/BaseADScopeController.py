@@ -1,25 +1,55 @@
 import logging
 import math
+import queue
 import time
 from abc import abstractmethod
-from collections import deque
-from multiprocessing import Queue, Value, Lock
+from multiprocessing import Value, Lock
+from pathlib import Path
 
 import mpPy6
 import pandas as pd
-from PySide6.QtCore import QThreadPool, Signal
+from PySide6.QtCore import QThread, QThreadPool, Signal
 from PySide6.QtWidgets import QMessageBox
 from numpy import ndarray
 
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
 from ADScopeControl.controller.mp_AD2Capture.MPCaptDevice import MPCaptDevice
+from ADScopeControl.controller.mp_AD2Capture.StreamChannels import CaptureChannel, PreviewChannel, DrainStatistics
 from ADScopeControl.controller.sweepHelpers import ramp
 from ADScopeControl.model.AD2ScopeModel import AD2ScopeModel
 from ADScopeControl.model.AD2Constants import AD2Constants
 
 
+class _StateSignalRelay:
+    """
+    Signal class registered with the process control. The state monitor of the process control emits the result
+    signals of the capture process through it. Instead of emitting them one by one, the relay queues them, so they can
+    be applied in batches.
+    """
+
+    def __init__(self, signals: queue.SimpleQueue):
+        self._signals = signals
+
+    def __getattr__(self, signal_name: str):
+        if signal_name.startswith('_'):
+            raise AttributeError(signal_name)
+        return _RelayedSignal(self._signals, signal_name)
+
+
+class _RelayedSignal:
+
+    def __init__(self, signals: queue.SimpleQueue, signal_name: str):
+        self._signals = signals
+        self._signal_name = signal_name
+
+    def emit(self, *args):
+        self._signals.put((self._signal_name, args))
+
+
 class BaseADScopeController(mpPy6.CProcessControl):
     dwf_version_changed = Signal(str, name="dwf_version_changed")
     discovered_devices_changed = Signal(list, name="discovered_devices_changed")
+    connected_devices_changed = Signal(list, name="connected_devices_changed")
 
     selected_device_index_changed = Signal(int, name="selected_device_index_changed")
     device_connected_changed = Signal(bool, name="connected_changed")
@@ -29,11 +59,19 @@ class BaseADScopeController(mpPy6.CProcessControl):
     ain_channels_changed = Signal(list, name="ain_channels_changed")
     selected_ain_channel_changed = Signal(int, name="selected_ain_channel_changed")
     sample_rate_changed = Signal(float, name="sample_rate_changed")
+    poll_interval_changed = Signal(float, name="poll_interval_changed")
+    settling_result_changed = Signal(dict, name="settling_result_changed")
     ain_buffer_size_changed = Signal(int, name="ain_buffer_size_changed")
     analog_in_bits_changed = Signal(int, name="analog_in_bits_changed")
     analog_in_buffer_size_changed = Signal(int, name="analog_in_buffer_size_changed")
     analog_in_channel_range_changed = Signal(tuple, name="analog_in_channel_range_changed")
     analog_in_offset_changed = Signal(tuple, name="analog_in_offset_changed")
+    device_capabilities_changed = Signal(dict, name="device_capabilities_changed")
+    ain_scaling_changed = Signal(dict, name="ain_scaling_changed")
+    capture_statistics_changed = Signal(dict, name="capture_statistics_changed")
+    recording_file_changed = Signal(str, name="recording_file_changed")
+    channel_statistics_changed = Signal(dict, name="channel_statistics_changed")
+    capture_channel_alarms_changed = Signal(int, name="capture_channel_alarms_changed")
 
     open_device_finished = Signal(int, name="open_device_finished")
     close_device_finished = Signal(name="close_device_finished")
@@ -41,43 +79,85 @@ class BaseADScopeController(mpPy6.CProcessControl):
     device_state_changed = Signal(AD2Constants.DeviceState, name="device_state_changed")
 
     capture_process_state_changed = Signal(AD2Constants.CapturingState, name="capture_process_state_changed")
+    # A fixed-length capture ended by itself, carries the number of captured samples
+    capture_completed = Signal(int, name="capture_completed")
     ready_for_recording_changed = Signal(bool, name="ready_for_recording_changed")
 
-    def __init__(self, ad2capt_model: AD2ScopeModel, start_capture_flag: Value):
+    # Batch of result signals of the capture process as (signal name, arguments), applied in the GUI thread
+    state_signals_received = Signal(list, name="state_signals_received")
+
+    # Tasks running on the thread pool for the lifetime of the controller
+    LONG_LIVED_TASKS = 4
+
+    def __init__(self, ad2capt_model: AD2ScopeModel, start_capture_flag: Value, capture_request_ns: Value = None,
+                 discover: bool = True):
+        """
+        :param ad2capt_model: Model of the device.
+        :param start_capture_flag: Start flag read by the capture process. If None, the controller creates its own.
+        :param capture_request_ns: Time of the last start or stop request. If None, the controller creates its own.
+        :param discover: Discover the connected devices. Can be skipped if the devices are already known.
+        """
         super().__init__()
 
         self.model = ad2capt_model
 
         self.pref = "AD2CaptDev"
 
+        # The state monitor of the process control, the state signal relay and the preview and capture consumers
+        # never finish. Each gets its own thread, the remaining threads are left for short tasks.
         self.thread_manager = QThreadPool()
+        self.thread_manager.setMaxThreadCount(self.LONG_LIVED_TASKS + QThread.idealThreadCount())
         self.kill_thread = False
 
         self.lock = Lock()
-        self.stream_data_queue = Queue()
-
+        # The preview drops the oldest chunks if the GUI falls behind, the capture channel never drops a chunk
+        self.stream_data_queue = PreviewChannel(self.model.capturing_information.stream_transport,
+                                                self.model.capturing_information.preview_queue_length,
+                                                self.model.capturing_information.stream_buffer_size)
+        self.capture_data_queue = CaptureChannel(self.model.capturing_information.capture_queue_length)
+        self._consumers_started = False
+        # Number of chunks taken per drain from the preview and the capture channel
+        self._drain_statistics = {'preview': DrainStatistics(), 'capture': DrainStatistics()}
+        self._ingest_reported = 0
+
+        # A shared start flag is cleared by its owner (e.g. MultiADScopeController) after a fixed-length capture
+        self._owns_start_capture_flag = start_capture_flag is None
         if start_capture_flag is None:
             self.start_capture_flag = Value('i', 0, lock=self.lock)
         else:
             self.start_capture_flag = start_capture_flag
         self.kill_capture_flag = Value('i', 0, lock=self.lock)
+        # Time of the last start or stop request, the capture process resolves it to a sample index
+        if capture_request_ns is None:
+            self.capture_request_ns = Value('q', 0)
+        else:
+            self.capture_request_ns = capture_request_ns
 
-        # Number of sa
-        self.streaming_dqueue: deque = None  # a dqueue, initialize later
-
+        # The state monitor of the process control hands the result signals to the relay, they are applied in
+        # batches. Must be set up before the child process starts reporting its state.
+        self._state_signals = queue.SimpleQueue()
+        self.register_signal_class(_StateSignalRelay(self._state_signals))
+        self.state_signals_received.connect(self._on_state_signals_received)
         self.register_child_process(
             MPCaptDevice,
             self.stream_data_queue,
+            self.capture_data_queue,
             self.start_capture_flag,
-            self.kill_capture_flag
+            self.kill_capture_flag,
+            capture_request_ns=self.capture_request_ns
         )
+        self.thread_manager.start(self.qt_apply_state_signals)
         self.logger.setLevel(logging.INFO)
         self.set_child_log_level(logging.INFO)
 
         self.connect_signals()
         self._connect_config_signals()
 
-        self.discover_connected_devices()
+        self.set_capability_cache(self.model.device_information.capability_cache)
+        # Show the devices of the last session until the discovery in the capture process reports the current ones
+        self.model.device_information.connected_devices = self.model.device_information.known_devices
+        if discover:
+            self.discover_connected_devices()
 
         self.selected_ain_channel = self.model.analog_in.selected_ain_channel
 
@@ -95,6 +175,7 @@ class BaseADScopeController(mpPy6.CProcessControl):
     def connect_signals(self):
         self.dwf_version_changed.connect(self._on_dwf_version_changed)
         self.discovered_devices_changed.connect(self.on_discovered_devices_changed)
+        self.connected_devices_changed.connect(self._on_connected_devices_changed)
 
         self.selected_device_index_changed.connect(self._on_selected_device_index_changed)
 
@@ -116,13 +197,29 @@ class BaseADScopeController(mpPy6.CProcessControl):
         self.analog_in_buffer_size_changed.connect(
             lambda x: type(self.model.analog_in).ain_buffer_size.fset(self.model.analog_in, x))
         self.analog_in_channel_range_changed.connect(
-            lambda x: type(self.model.analog_in).ai.fset(self.model.analog_in, x))
+            lambda x: type(self.model.analog_in).ain_channel_range.fset(self.model.analog_in, x))
         self.analog_in_offset_changed.connect(
             lambda x: type(self.model.analog_in).ain_offset.fset(self.model.analog_in, x))
+        self.device_capabilities_changed.connect(self._on_device_capabilities_changed)
+
+        self.ain_scaling_changed.connect(
+            lambda x: type(self.model.capturing_information).ain_scaling.fset(self.model.capturing_information, x))
+        self.poll_interval_changed.connect(
+            lambda x: type(self.model.capturing_information).poll_interval.fset(self.model.capturing_information, x))
+        self.settling_result_changed.connect(
+            lambda x: type(self.model.capturing_information).settling_result.fset(self.model.capturing_information, x))
+        self.capture_statistics_changed.connect(self._on_capture_statistics_changed)
+        self.channel_statistics_changed.connect(
+            lambda x: type(self.model.capturing_information).channel_statistics.fset(
+                self.model.capturing_information, x))
+        self.capture_channel_alarms_changed.connect(self._on_capture_channel_alarms_changed)
+        self.recording_file_changed.connect(
+            lambda x: type(self.model.capturing_information).recording_file.fset(self.model.capturing_information, x))
 
         self.device_state_changed.connect(
             lambda x: type(self.model.device_information).device_state.fset(self.model.device_information, x))
         self.capture_process_state_changed.connect(self._on_capture_process_state_changed)
+        self.capture_completed.connect(self._on_capture_completed)
         self.ready_for_recording_changed.connect(
             lambda x: type(self.model.capturing_information).ready_for_recording.fset(
                 self.model.capturing_information, x))
@@ -130,7 +227,13 @@ class BaseADScopeController(mpPy6.CProcessControl):
         self.open_device_finished.connect(self.on_open_device_finished)
 
     def _connect_config_signals(self):
-        self.model.ad2captdev_config.streaming_history.connect(self._on_streaming_history_changed)
+        self.model.ad2captdev_config.streaming_history.connect(self._on_streaming_window_changed)
+        self.model.ad2captdev_config.sample_rate.connect(self._on_streaming_window_changed)
+        self.model.ad2captdev_config.memory_budget.connect(self._on_memory_budget_changed)
+        self.model.ad2captdev_config.record_directory.connect(self._on_memory_budget_changed)
+        self.model.ad2captdev_config.keep_spill_file.connect(self._on_memory_budget_changed)
+        self.model.ad2captdev_config.keep_session.connect(self._on_keep_session_changed)
+        self._on_memory_budget_changed(None)
         # self.model.ad2captdev_config.selected_device_index.connect(self._on_selected_device_index_changed)
 
     # ==================================================================================================================
@@ -155,6 +258,67 @@ class BaseADScopeController(mpPy6.CProcessControl):
         :param sample_rate: The sample rate.
         """
 
+    @mpPy6.CProcessControl.register_function()
+    def set_poll_watermark(self, watermark: float):
+        """
+        Sets the fraction of the device buffer that should not be exceeded between two polls.
+        :param watermark: The watermark (0..1).
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_stream_coalescing(self, block_size: int, max_latency: float):
+        """
+        Sets how the capture process collects reads into blocks before sending them.
+        :param block_size: Number of samples per channel of a block.
+        :param max_latency: Maximum time in seconds samples are held back.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_settling(self, threshold: float, window: float, timeout: float, period: float = 0.0):
+        """
+        Sets the detection of the offset settling after the acquisition has been configured.
+        :param threshold: Maximum drift of the offset estimate in V.
+        :param window: Length of the averaging window in s.
+        :param timeout: Maximum time to wait in s.
+        :param period: Period of the input signal in s, the offset is estimated over one period. 0 for a DC input.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_record_directory(self, directory: str):
+        """
+        Lets the capture process write the recordings to files in the given directory.
+        :param directory: Record directory or None to keep the recordings in memory.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_trigger(self, trigger: dict):
+        """
+        Enables the triggered capture mode. Only windows around the trigger events are shipped.
+        :param trigger: Trigger settings (channel, level, hysteresis, rising, pre_samples, post_samples) or None
+        for continuous capturing.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_raw_samples(self, raw_samples: bool):
+        """
+        Enables streaming of raw int16 ADC codes instead of volts.
+        :param raw_samples: True for raw samples.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_ain_filter(self, filter_number: int):
+        """
+        Sets the acquisition filter of the analog in channels.
+        :param filter_number: filterDecimate (0), filterAverage (1), filterMinMax (2) or filterAverageFit (3).
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_simultaneous_ain_channels(self, ain_channels: list):
+        """
+        Sets the analog in channels that are captured simultaneously.
+        :param ain_channels: List of channel indices. If empty, only the selected channel is captured.
+        """
+
     @mpPy6.CProcessControl.register_function(open_device_finished)
     def open_device(self):
         """
@@ -164,6 +328,23 @@ class BaseADScopeController(mpPy6.CProcessControl):
         """
         self.set_sample_rate(self.model.capturing_information.sample_rate)
         self.set_selected_ain_channel(self.model.analog_in.selected_ain_channel)
+        self.set_poll_watermark(self.model.capturing_information.poll_watermark)
+        self.set_raw_samples(self.model.capturing_information.raw_samples)
+        self.set_stream_coalescing(self.model.capturing_information.stream_block_size,
+                                   self.model.capturing_information.stream_max_latency)
+        self.set_settling(*self.model.capturing_information.settling)
+        if self.model.capturing_information.record_to_disk:
+            self.set_record_directory(self.model.capturing_information.record_directory)
+        else:
+            self.set_record_directory(None)
+        if self.model.capturing_information.capture_mode == "triggered":
+            self.set_trigger(self.model.capturing_information.trigger_settings)
+        else:
+            self.set_trigger(None)
+        self.set_simultaneous_ain_channels(self.model.analog_in.simultaneous_ain_channels)
+        self.set_ain_filter(self.model.analog_in.ain_filter)
+        self.set_keep_session(self.model.capturing_information.keep_session)
+        self.set_capture_length(*self.model.capturing_information.capture_length)
 
     def on_open_device_finished(self, device_handle: int):
         self.logger.info(f"Opening device finished with handle {device_handle}")
@@ -184,14 +365,41 @@ class BaseADScopeController(mpPy6.CProcessControl):
         :return:
         """
         self.kill_capture_flag.value = int(False)
-        self.streaming_dqueue = deque(maxlen=self.model.capturing_information.streaming_deque_length)
-        self.thread_manager.start(self.qt_stream_data)
+        self._reset_sample_accounting()
+        # The consumers keep running between captures, a second consumer would reorder the captured chunks
+        if not self._consumers_started:
+            self._consumers_started = True
+            self.thread_manager.start(self.qt_stream_data)
+            self.thread_manager.start(self.qt_capture_data)
 
     def stop_capturing_process(self):
+        """
+        Stops the capture loop. With keep_session the device stays open and configured afterwards, so the next
+        start only re-arms the acquisition. release_session() or close_device() closes it.
+        """
         self.kill_capture_flag.value = int(True)
 
-    def _on_streaming_history_changed(self, history: float):
-        self.streaming_dqueue = deque(maxlen=self.model.capturing_information.streaming_deque_length)
+    def _on_capture_statistics_changed(self, statistics: dict):
+        self.model.capturing_information.capture_statistics = statistics
+        loop = statistics.get('loop', {})
+        self.logger.debug(f"Capture loop: {loop.get('count', 0)} iterations, p50 {loop.get('p50_us', 0):.1f} µs, "
+                          f"p99 {loop.get('p99_us', 0):.1f} µs, max {loop.get('max_us', 0):.1f} µs.")
+
+    def _on_capture_channel_alarms_changed(self, alarms: int):
+        self.logger.warning(f"Capture channel has been full {alarms} time(s). The capture process had to wait, "
+                            f"the device may lose samples.")
+        self.model.capturing_information.capture_channel_alarms = alarms
+
+    def _on_streaming_window_changed(self, value):
+        """ Resizes the stream to the streaming history at the current sample rate, keeping the newest samples."""
+        self.model.capturing_information.stream.resize(self.model.capturing_information.streaming_deque_length)
+
+    def _on_memory_budget_changed(self, value):
+        """ Applies the memory budget to the capture. A capture beyond it continues in the record directory."""
+        capture = self.model.capturing_information.capture
+        capture.memory_budget = self.model.capturing_information.memory_budget * 1024 * 1024
+        capture.spill_directory = Path(self.model.capturing_information.record_directory)
+        capture.keep_spill_file = self.model.capturing_information.keep_spill_file
 
     # ==================================================================================================================
     # DWF Version
@@ -214,10 +422,59 @@ class BaseADScopeController(mpPy6.CProcessControl):
         self.logger.info(f"Discovered devices: {len(devices)}")
         self.logger.debug(f"Discovered devices: {devices}")
         self.model.device_information.connected_devices = devices
+        self.model.device_information.known_devices = devices
+
+    def _on_connected_devices_changed(self, devices: list):
+        # Devices discovered so far, while the discovery is still running
+        self.model.device_information.connected_devices = devices
 
     def _on_selected_device_index_changed(self, index):
         self.model.device_information.selected_device_index = index
 
+    @mpPy6.CProcessControl.register_function()
+    def set_capture_length(self, samples: int, seconds: float):
+        """
+        Sets the length of a fixed-length capture. The capture process ends the capture by itself after the given
+        number of samples. If samples is 0, the length is given by seconds. If both are 0, the capture runs until it
+        is stopped.
+        :param samples: Number of samples per channel.
+        :param seconds: Length in seconds.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def set_keep_session(self, enabled: bool):
+        """
+        Keeps the device open and configured when capturing stops, so the next capture only re-arms the acquisition.
+        The device is closed on disconnect or on an error.
+        :param enabled: True to keep the device session open between captures.
+        """
+
+    @mpPy6.CProcessControl.register_function()
+    def release_session(self):
+        """
+        Closes the device session kept open after the capture stopped. While capturing, the session is released
+        once the capture loop has been stopped.
+        """
+
+    def _on_keep_session_changed(self, enabled: bool):
+        self.set_keep_session(enabled)
+        if not enabled:
+            self.release_session()
+
+    @mpPy6.CProcessControl.register_function()
+    def set_capability_cache(self, path: str):
+        """
+        Lets the capture process cache the device capabilities in the given file, so selecting a known device does
+        not open it. The cache is invalidated if the DWF version changes.
+        :param path: Path of the cache file or None to always read the capabilities from the device.
+        """
+
+    def _on_device_capabilities_changed(self, capabilities: dict):
+        self.model.analog_in.ain_bits = capabilities['ain_bits']
+        self.model.analog_in.ain_buffer_size = capabilities['ain_buffer_size']
+        self.model.analog_in.ain_channel_range = tuple(capabilities['ain_channel_range'])
+        self.model.analog_in.ain_offset = tuple(capabilities['ain_offset'])
+
     @abstractmethod
     def update_device_information(self):
         raise NotImplementedError
@@ -228,6 +485,12 @@ class BaseADScopeController(mpPy6.CProcessControl):
 
     def _on_capture_process_state_changed(self, state):
         self.model.capturing_information.device_capturing_state = state
+
+    def _on_capture_completed(self, samples: int):
+        self.logger.info(f"[{self.pref} Task] Fixed-length capture completed with {samples} samples.")
+        if self._owns_start_capture_flag:
+            # Withdraws the start request, so the next start begins a new capture
+            self.start_capture_flag.value = 0
     
     def set_ad2_acq_status(self, record):
         if record:
@@ -264,29 +527,20 @@ class BaseADScopeController(mpPy6.CProcessControl):
 
     def set_recorded_data_time_axis(self, func=None):
 
-        # Create a new column same as the index
-        self.model.capturing_information.recorded_samples_df['time (s)'] = (
-            self.model.capturing_information.recorded_samples_df.index.to_series().apply(
-                lambda x: x / self.model.capturing_information.sample_rate
-            )
-        )
-
-        self.model.capturing_information.recorded_samples_df['time (ms)'] = (
-            self.model.capturing_information.recorded_samples_df.index.to_series().apply(
-                lambda x: (x / self.model.capturing_information.sample_rate) * 1000
-            )
-        )
+        # The time axis is built from the chunk headers, so missing samples do not shift the following samples
+        time_axis = self.model.capturing_information.capture.time_axis(self.model.capturing_information.sample_rate)
+        self.model.capturing_information.recorded_samples_df['time (s)'] = time_axis
+        self.model.capturing_information.recorded_samples_df['time (ms)'] = time_axis * 1000
 
     def create_dataframe(self):
 
+        # The samples with the absolute sample index of every row, so missing samples can be located in the export,
+        # and the time axis. The time axis is built from the chunk headers, so missing samples do not shift the
+        # following samples. A spilled capture is exported without building these columns in memory.
         self.model.capturing_information.recorded_samples_df = (
-            self.model.capturing_information.capture.to_frame(
-                columns=['Amplitude']
-            )
+            self.model.capturing_information.capture.export_frame(self.model.capturing_information.sample_rate)
         )
 
-        self.set_recorded_data_time_axis()
-
         if self.model.supervisor_information.supervised:
             try:
                 self.model.capturing_information.recorded_samples_df = (
@@ -298,9 +552,11 @@ class BaseADScopeController(mpPy6.CProcessControl):
                 self.logger.info(f"Supervisor could not process capture: {e}")
 
     def stop_capture(self):
+        self.capture_request_ns.value = time.monotonic_ns()
         self.start_capture_flag.value = 0
 
     def start_capture(self, clear=True):
+        self.capture_request_ns.value = time.monotonic_ns()
         self.start_capture_flag.value = 1
 
     def reset_capture(self):
@@ -318,22 +574,121 @@ class BaseADScopeController(mpPy6.CProcessControl):
         self.logger.info(f"[{self.pref} Task] Starting capturing process...")
 
     def qt_stream_data(self):
+        """
+        Moves the preview chunks into the stream. Blocks until chunks arrive and then takes all waiting chunks at
+        once, so they are appended to the stream under a single lock.
+        """
         self.logger.info("Streaming data thread started")
+        overruns = 0
         while not self.kill_thread:
-            if not self.stream_data_queue.empty():
-                self.logger.debug(f"Streaming data queue size: {self.stream_data_queue.qsize()}")
-                d = self.stream_data_queue.get(block=True, timeout=1)
-                self.model.capturing_information.stream.append(d)
-                if self.start_capture_flag.value == 1:
-                    self.model.capturing_information.capture.append(d)
+            chunks = self.stream_data_queue.get_batch(timeout=0.5)
+            if not chunks:
+                continue
+            self._drain_statistics['preview'].record(len(chunks))
+            try:
+                self.model.capturing_information.stream.append_chunks(chunks)
+                for chunk in chunks:
+                    self._account_chunk(chunk)
+            except Exception as e:
+                # A bad batch must not stop the preview for the rest of the session
+                self.logger.error(f"Error while appending {len(chunks)} chunk(s) to the stream: {e}")
+            if self.stream_data_queue.overruns != overruns:
+                overruns = self.stream_data_queue.overruns
+                self.logger.debug(f"Preview fell behind, {overruns} overrun(s) and "
+                                  f"{self.stream_data_queue.lost_chunks} skipped chunk(s) in total.")
+            self._report_ingest_statistics()
         self.logger.info("Streaming data thread ended")
 
-    def qt_get_state(self):
-        while not self.kill_thread and not bool(self.end_process_flag.value):
-            while self.state_queue.qsize() > 0:
-                self._set_ad2state_from_process(self.state_queue.get())
-            # time.sleep(0.1)
-        self.logger.info("Status data consume thread ended")
+    def qt_capture_data(self):
+        """ Moves the captured chunks from the lossless capture channel into the capture, batch by batch."""
+        self.logger.info("Capture data thread started")
+        while not self.kill_thread:
+            chunks = self.capture_data_queue.get_batch(timeout=0.5)
+            if not chunks:
+                continue
+            self._drain_statistics['capture'].record(len(chunks))
+            try:
+                self.model.capturing_information.capture.append_chunks(chunks)
+            except Exception as e:
+                # A bad batch must not stop the capture ingest for the rest of the session
+                self.logger.error(f"Error while appending {len(chunks)} chunk(s) to the capture: {e}")
+        self.logger.info("Capture data thread ended")
+
+    def _report_ingest_statistics(self):
+        """ Reports the number of chunks taken per drain at most once per second."""
+        now = time.monotonic()
+        if now - self._ingest_reported >= 1.0:
+            self._ingest_reported = now
+            self.model.capturing_information.ingest_statistics = {
+                name: statistics.summary() for name, statistics in self._drain_statistics.items()}
+
+    def _reset_sample_accounting(self):
+        self._first_sample_index = None
+        self._samples_lost = 0
+        self._samples_received = 0
+        self._accounting_updated = 0
+        self.model.capturing_information.samples_received = 0
+        self.model.capturing_information.samples_lost = 0
+        self.model.capturing_information.samples_corrupted = 0
+
+    def _account_chunk(self, chunk: DataChunk):
+        """
+        Updates the cumulative sample counters of the model from the preview chunks. Only the samples the device
+        reported as lost are counted as lost, chunks dropped by the preview are not. The preview carries the losses
+        of dropped chunks over to the next chunk, and the received samples follow the sample index, so both
+        counters are complete even if the preview drops chunks.
+        The received samples are only reported every 0.5 s, losses are reported immediately.
+        """
+        missing = chunk.lost
+        self._samples_lost += missing
+        if chunk.flags & DataChunk.FLAG_TRIGGERED:
+            # Triggered windows are not contiguous, only the shipped samples are counted
+            self._samples_received += len(chunk)
+        else:
+            if self._first_sample_index is None:
+                self._first_sample_index = chunk.first_sample_index - chunk.lost
+            self._samples_received = chunk.next_sample_index - self._first_sample_index - self._samples_lost
+
+        now = time.monotonic()
+        if missing or chunk.corrupted or now - self._accounting_updated >= 0.5:
+            self._accounting_updated = now
+            self.model.capturing_information.samples_received = self._samples_received
+        if missing:
+            self.logger.warning(f"{missing} samples lost before sample {chunk.first_sample_index}.")
+            self.model.capturing_information.samples_lost += missing
+        if chunk.corrupted:
+            self.model.capturing_information.samples_corrupted += chunk.corrupted
+
+    # ==================================================================================================================
+    # State messages of the capture process
+    # ==================================================================================================================
+    def qt_apply_state_signals(self):
+        """
+        Blocks until the state monitor relays a result signal of the capture process, takes all pending signals at
+        once and hands them as one batch to the GUI thread. The thread sleeps in the blocking get while the capture
+        process is idle.
+        """
+        self.logger.info("State signal thread started")
+        while not self.kill_thread:
+            try:
+                signals = [self._state_signals.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(signals) < 1024:
+                try:
+                    signals.append(self._state_signals.get_nowait())
+                except queue.Empty:
+                    break
+            # Queued to the GUI thread, the whole batch is applied in one event loop turn
+            self.state_signals_received.emit(signals)
+        self.logger.info("State signal thread ended")
+
+    def _on_state_signals_received(self, signals: list):
+        for signal_name, args in signals:
+            try:
+                getattr(self, signal_name).emit(*args)
+            except Exception as e:
+                self.logger.error(f"Error while emitting {signal_name}{args}: {e}")
 
     # ==================================================================================================================
     # Destructor
@@ -342,3 +697,4 @@ class BaseADScopeController(mpPy6.CProcessControl):
         for c in self.thread_manager.children():
             c.exit()
         self.safe_exit()
+        self.stream_data_queue.close()
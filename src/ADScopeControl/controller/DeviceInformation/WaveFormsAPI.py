@@ -64,9 +64,8 @@ class WFAPIChannels(WFAPI):
         raise NotImplementedError()
 
     @staticmethod
-    def analog_in_channel_filter_info(dwf: CDLL, hdwf: c_int, filter_number: int):
+    def analog_in_channel_filter_info(dwf: CDLL, hdwf: c_int, filter_number: int = None) -> list | bool:
         """
-        Not implemented.
         Returns the supported sampling modes. They are returned (by reference) as a bit field. This bit field
         can be parsed using the IsBitSet Macro. Individual bits are defined using the FILTER constants in dwf.h.
         When the acquisition frequency (FDwfAnalogInFrequencySet) is less than the ADC frequency (maximum
@@ -74,7 +73,7 @@ class WFAPIChannels(WFAPI):
 
         Calls the WaveForms API Function 'FDwfAnalogInChannelFilterInfo(HDWF hdwf, int *pfsfilter)'
 
-        :param filter_number:
+        :param filter_number: If given, only checks if this filter is supported.
             - filterDecimate: 0
               Store every Nth ADC conversion, where N = ADC frequency /acquisition frequency.
             - filterAverage: 1
@@ -84,14 +83,19 @@ class WFAPIChannels(WFAPI):
             - filterAverageFit: 3
               The stored samples match the specified range instead of the device input range options.
               This can improve the vertical resolution of the samples.
+        :return: The list of supported filters or, if filter_number is given, True if the filter is supported.
         """
         WFAPI._check_device_connection(dwf, hdwf)
-        raise NotImplementedError()
+        int0 = c_int()
+        dwf.FDwfAnalogInChannelFilterInfo(hdwf, byref(int0))
+        _filters = [_filter for _filter in range(int0.value.bit_length()) if int0.value & (1 << _filter)]
+        if filter_number is not None:
+            return int(filter_number) in _filters
+        return _filters
 
     @staticmethod
     def analog_in_channel_filter_set(dwf: CDLL, hdwf: c_int, channel: int, filter_number: int):
         """
-        Not implemented.
         Sets the acquisition filter for each AnalogIn channel. With channel index -1, each enabled AnalogIn
         channel filter will be configured to use the same, new option.
 
@@ -110,12 +114,11 @@ class WFAPIChannels(WFAPI):
               This can improve the vertical resolution of the samples.
         """
         WFAPI._check_device_connection(dwf, hdwf)
-        raise NotImplementedError()
+        dwf.FDwfAnalogInChannelFilterSet(hdwf, c_int(channel), c_int(filter_number))
 
     @staticmethod
     def analog_in_channel_filter_get(dwf: CDLL, hdwf: c_int, channel: int) -> int:
         """
-        Not implemented.
         Returns the configured acquisition filter.
 
         Calls the WaveForms API Function 'FDwfAnalogInChannelFilterGet(HDWF hdwf, int idxChannel, FILTER *pfilter)'
@@ -132,6 +135,10 @@ class WFAPIChannels(WFAPI):
               The stored samples match the specified range instead of the device input range options.
               This can improve the vertical resolution of the samples.
         """
+        WFAPI._check_device_connection(dwf, hdwf)
+        int0 = c_int()
+        dwf.FDwfAnalogInChannelFilterGet(hdwf, c_int(channel), byref(int0))
+        return int(int0.value)
 
     @staticmethod
     def analog_in_channel_range_info(dwf: CDLL, hdwf: c_int) -> tuple:
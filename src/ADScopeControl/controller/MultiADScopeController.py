@@ -0,0 +1,173 @@
+import logging
+import os
+import time
+from multiprocessing import Value
+from pathlib import Path
+
+import pandas as pd
+from PySide6.QtCore import QObject, Signal
+
+from ADScopeControl.CaptDeviceConfig import CaptDeviceConfig as Config
+from ADScopeControl.controller.BaseADScopeController import BaseADScopeController
+from ADScopeControl.model.AD2ScopeModel import AD2ScopeModel
+
+
+class MultiADScopeController(QObject):
+    """
+    Captures with several Analog Discovery devices in parallel. Every device gets its own BaseADScopeController
+    and therefore its own capture process and stream transport, so the devices do not share a process or a queue.
+    All capture processes read the same start flag and request time, so capturing is started and stopped on all
+    devices together and at the same moment.
+    The models of the devices are keyed by their serial number. The first device uses the shared configuration,
+    every further device a configuration of its own, stored in a file keyed by its serial number. A device seen for
+    the first time starts from a copy of the shared configuration.
+    """
+    devices_opened_changed = Signal(list, name="devices_opened_changed")
+
+    def __init__(self, config: Config, serial_numbers: list = None, controller_type=BaseADScopeController):
+        """
+        :param config: Configuration used by all devices.
+        :param serial_numbers: Serial numbers of the devices to open. If None, all discovered devices except the
+        demo devices are opened.
+        :param controller_type: Controller class used for each device.
+        """
+        super().__init__()
+        self.logger = logging.getLogger(f"MultiADScopeController({os.getpid()})")
+
+        self.config = config
+        self.serial_numbers = serial_numbers
+        self.controller_type = controller_type
+
+        # Shared between all capture processes
+        self.start_capture_flag = Value('i', 0)
+        self.capture_request_ns = Value('q', 0)
+
+        self.models: dict = {}
+        self.controllers: dict = {}
+        # Devices whose fixed-length capture ended by itself since the last start
+        self._completed: set = set()
+
+        # The first controller discovers the connected devices and is reused for the first device
+        self._discovery_model = AD2ScopeModel(self.config)
+        self._discovery_controller = self.controller_type(self._discovery_model, self.start_capture_flag,
+                                                          self.capture_request_ns)
+        # Only the final result of the discovery, not the devices of the last session or the partial lists
+        self._discovery_controller.discovered_devices_changed.connect(self._on_devices_discovered)
+
+    # ==================================================================================================================
+    # Opening the devices
+    # ==================================================================================================================
+    def _on_devices_discovered(self, devices: list):
+        if self.controllers:
+            return
+        if self.serial_numbers is None:
+            devices = [device for device in devices if device['type'] != "DEMO"]
+        else:
+            devices = [device for device in devices if device['serial_number'] in self.serial_numbers]
+        if not devices:
+            self.logger.warning("No devices found for parallel capturing.")
+            return
+
+        for device in devices:
+            if not self.controllers:
+                model, controller = self._discovery_model, self._discovery_controller
+            else:
+                config, config_file = self._device_config(device['serial_number'])
+                model = AD2ScopeModel(config)
+                # The model saves to the shared file by default
+                config.autosave(enable=True, path=str(config_file))
+                # The devices are already known from the discovery of the first controller
+                controller = self.controller_type(model, self.start_capture_flag, self.capture_request_ns,
+                                                  discover=False)
+            self.models[device['serial_number']] = model
+            self.controllers[device['serial_number']] = controller
+            controller.capture_completed.connect(
+                lambda samples, serial=device['serial_number']: self._on_capture_completed(serial))
+            self.logger.info(f"Opening device {device['device_id']}: {device['device_name']} "
+                             f"({device['serial_number']})")
+            controller.set_selected_device(device['device_id'])
+            controller.open_device()
+        self.devices_opened_changed.emit(list(self.controllers))
+
+    def _device_config(self, serial_number: str) -> tuple:
+        """
+        Returns the configuration of a device and the file it is stored in. A device seen for the first time
+        starts from a copy of the shared configuration.
+        :param serial_number: Serial number of the device.
+        """
+        config_file = Path(f"{self.config.name}_{serial_number}.yaml")
+        if not config_file.exists():
+            config_file.write_text(self.config.serialize())
+        config = type(self.config)()
+        config.load(str(config_file))
+        return config, config_file
+
+    @property
+    def serials(self) -> list:
+        """ Returns the serial numbers of the opened devices."""
+        return list(self.controllers)
+
+    # ==================================================================================================================
+    # Capturing
+    # ==================================================================================================================
+    def start_capture(self):
+        """ Starts capturing on all devices."""
+        self._completed.clear()
+        self.capture_request_ns.value = time.monotonic_ns()
+        self.start_capture_flag.value = 1
+
+    def stop_capture(self):
+        """ Stops capturing on all devices."""
+        self._completed.clear()
+        self.capture_request_ns.value = time.monotonic_ns()
+        self.start_capture_flag.value = 0
+
+    def _on_capture_completed(self, serial: str):
+        """
+        Withdraws the start request once the fixed-length captures of all devices completed. Clearing the shared
+        flag earlier would be read as a stop request by the devices that are still capturing.
+        """
+        self._completed.add(serial)
+        if self._completed >= set(self.controllers):
+            self.logger.info("Fixed-length capture completed on all devices.")
+            self._completed.clear()
+            self.start_capture_flag.value = 0
+
+    def reset_capture(self):
+        self.stop_capture()
+        for model in self.models.values():
+            model.capturing_information.capture = model.capturing_information.capture.clear()
+
+    @property
+    def streams(self) -> dict:
+        """ Returns the streams of all devices, keyed by serial number."""
+        return {serial: model.capturing_information.stream for serial, model in self.models.items()}
+
+    @property
+    def captures(self) -> dict:
+        """ Returns the captures of all devices, keyed by serial number."""
+        return {serial: model.capturing_information.capture for serial, model in self.models.items()}
+
+    def create_dataframe(self) -> pd.DataFrame:
+        """
+        Merges the captures of all devices into one data frame. The columns are keyed by serial number and the
+        rows by the time since the start of each capture.
+        """
+        frames = {}
+        for serial, model in self.models.items():
+            capture = model.capturing_information.capture
+            frame = capture.to_frame(columns=capture.column_names())
+            frame.index = pd.Index(capture.time_axis(model.capturing_information.sample_rate), name='time (s)')
+            frames[serial] = frame
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+    # ==================================================================================================================
+    # Destructor
+    # ==================================================================================================================
+    def exit(self):
+        self.stop_capture()
+        controllers = list(self.controllers.values()) or [self._discovery_controller]
+        for controller in controllers:
+            controller.exit()
@@ -0,0 +1,78 @@
+from ctypes import CDLL, c_int, POINTER
+
+import numpy as np
+from numpy import ndarray
+
+
+class CaptureBuffer:
+    """
+    Preallocated (n_channels x n_samples) sample buffer for the capture loop. The device data is copied by the
+    WaveForms API directly into the rows of the NumPy array, so polling the device does not allocate a new buffer
+    on every iteration.
+    With dtype float64 the buffer holds volts, with dtype int16 the raw ADC codes.
+    """
+
+    def __init__(self, capacity: int, dtype=np.float64, channels: int = 1):
+        self._dtype = np.dtype(dtype)
+        if self._dtype not in (np.dtype(np.float64), np.dtype(np.int16)):
+            raise ValueError(f"Unsupported sample type {self._dtype}. Use float64 or int16.")
+        self._channels = max(int(channels), 1)
+        self._buffer: ndarray = np.empty((self._channels, 0), dtype=self._dtype)
+        self._ptrs = []
+        self._c_first_sample = c_int(0)
+        # Number of times the underlying buffer has been (re)allocated. Stays constant in steady state.
+        self._allocations: int = 0
+        self.reserve(capacity)
+
+    @property
+    def capacity(self) -> int:
+        """ Returns the number of samples per channel the buffer can hold without reallocating."""
+        return self._buffer.shape[1]
+
+    @property
+    def channels(self) -> int:
+        return self._channels
+
+    @property
+    def allocations(self) -> int:
+        """ Returns the number of buffer allocations since the buffer has been created."""
+        return self._allocations
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    def reserve(self, capacity: int):
+        """
+        Makes sure the buffer can hold at least the given number of samples per channel. Only reallocates, if the
+        requested capacity exceeds the current one.
+        :param capacity: Number of samples.
+        """
+        capacity = max(int(capacity), 1)
+        if capacity <= self.capacity:
+            return
+        self._buffer = np.empty((self._channels, capacity), dtype=self._dtype)
+        ptr_type = POINTER(np.ctypeslib.as_ctypes_type(self._dtype))
+        self._ptrs = [row.ctypes.data_as(ptr_type) for row in self._buffer]
+        self._allocations += 1
+
+    def read_analog_in(self, dwf: CDLL, hdwf: c_int, channels: list, c_available: c_int) -> ndarray:
+        """
+        Copies the available samples of the given channels into the rows of the buffer.
+        Calls WaveForms API Function
+        'FDwfAnalogInStatusData(HDWF hdwf, int idxChannel, double *rgdVoltData, int cdData)' or, for raw samples,
+        'FDwfAnalogInStatusData16(HDWF hdwf, int idxChannel, short *rgu16Data, int idxData, int cdData)'
+        :param dwf: Shared library handle.
+        :param hdwf: Interface handle.
+        :param channels: List of channel indices (c_int), one per row.
+        :param c_available: Number of samples to copy per channel.
+        :return: A (n_channels x n_samples) view on the buffer, which is only valid until the next read.
+        """
+        n = c_available.value
+        self.reserve(n)
+        for channel, ptr in zip(channels, self._ptrs):
+            if self._dtype == np.int16:
+                dwf.FDwfAnalogInStatusData16(hdwf, channel, ptr, self._c_first_sample, c_available)
+            else:
+                dwf.FDwfAnalogInStatusData(hdwf, channel, ptr, c_available)
+        return self._buffer[:, :n]
@@ -0,0 +1,107 @@
+import time
+
+
+class StageHistogram:
+    """
+    Fixed-bucket histogram of durations in ns. The buckets are spaced by half octaves, so recording a value only
+    needs a few integer operations and the percentiles are accurate to about 25 %.
+    """
+    # Half octave buckets up to 2^40 ns (~18 min)
+    _BUCKETS = 2 * 41
+
+    def __init__(self):
+        self.counts = [0] * self._BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    @classmethod
+    def bucket_of(cls, ns: int) -> int:
+        """ Returns the bucket index of a duration."""
+        bits = ns.bit_length()
+        if bits < 2:
+            return bits
+        return min(2 * bits - 2 + ((ns >> (bits - 2)) & 1), cls._BUCKETS - 1)
+
+    @classmethod
+    def upper_edge_ns(cls, bucket: int) -> float:
+        """ Returns the upper edge of a bucket in ns."""
+        if bucket < 2:
+            return float(bucket + 1)
+        bits, half = divmod(bucket + 2, 2)
+        return 2 ** (bits - 1) * (1.5 + 0.5 * half)
+
+    def record(self, ns: int):
+        self.counts[self.bucket_of(ns)] += 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile_ns(self, percentile: float) -> float:
+        """
+        Returns the upper edge of the bucket that holds the given percentile.
+        :param percentile: Percentile (0..100).
+        """
+        if not self.count:
+            return 0.0
+        threshold = self.count * percentile / 100
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(self.upper_edge_ns(bucket), float(self.max_ns))
+        return float(self.max_ns)
+
+    def summary(self) -> dict:
+        """ Returns count, mean, p50, p99 and max in µs and the raw bucket counts."""
+        return {
+            'count': self.count,
+            'mean_us': self.total_ns / self.count / 1e3 if self.count else 0.0,
+            'p50_us': self.percentile_ns(50) / 1e3,
+            'p99_us': self.percentile_ns(99) / 1e3,
+            'max_us': self.max_ns / 1e3,
+            'buckets': list(self.counts),
+        }
+
+
+class CaptureInstrumentation:
+    """
+    Collects the durations of the stages of the capture loop into one histogram per stage. Timing a stage costs two
+    calls of time.perf_counter_ns() and a histogram update. The histograms are meant to be shipped periodically
+    and reset afterwards, so every report covers one reporting interval.
+    """
+
+    def __init__(self, stages: tuple, report_interval: float = 1.0):
+        """
+        :param stages: Names of the stages.
+        :param report_interval: Interval in seconds after which due() returns True.
+        """
+        self.stages = tuple(stages)
+        self.report_interval = report_interval
+        self.histograms = {stage: StageHistogram() for stage in self.stages}
+        self._last_report = time.monotonic()
+
+    def record(self, stage: str, start_ns: int) -> int:
+        """
+        Records the time since start_ns for a stage.
+        :param stage: Name of the stage.
+        :param start_ns: Start of the stage as returned by time.perf_counter_ns().
+        :return: The end of the stage, so it can be used as start of the next stage.
+        """
+        end_ns = time.perf_counter_ns()
+        self.histograms[stage].record(end_ns - start_ns)
+        return end_ns
+
+    def due(self) -> bool:
+        """ Returns True, if the report interval has elapsed since the last report."""
+        return time.monotonic() - self._last_report >= self.report_interval
+
+    def report(self) -> dict:
+        """ Returns the summaries of all stages of the current interval and starts a new interval."""
+        now = time.monotonic()
+        report = {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+        report['interval_s'] = now - self._last_report
+        self.histograms = {stage: StageHistogram() for stage in self.stages}
+        self._last_report = now
+        return report
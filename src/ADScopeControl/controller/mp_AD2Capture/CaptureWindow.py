@@ -0,0 +1,98 @@
+class CaptureWindow:
+    """
+    Resolves the start and the end of a capture to absolute sample indices and cuts the captured samples out of
+    the reads of the capture loop. The start and stop requests carry the host time at which they were issued. The
+    capture process maps this time to the sample acquired at that moment, using the time at which a read has been
+    fetched from the device and the sample rate, so the captured range does not depend on the poll interval or the
+    latency of the request.
+    """
+
+    def __init__(self, sample_rate: float, length: int = 0):
+        """
+        :param sample_rate: Sample rate in Hz.
+        :param length: Number of samples of a fixed-length capture. 0 captures until the stop request.
+        """
+        self.sample_rate = sample_rate
+        self.length = max(int(length), 0)
+        self.start_index: int = None
+        self.end_index: int = None
+        self.stop_requested = False
+        # A fixed-length capture that ended by itself. It is not restarted until the start request is withdrawn.
+        self.completed = False
+
+    @property
+    def active(self) -> bool:
+        """ Returns True, if a capture has been started and not finished yet."""
+        return self.start_index is not None
+
+    @property
+    def captured(self) -> int:
+        """ Returns the number of samples of the finished capture, or None while the end is unknown."""
+        return None if self.end_index is None else self.end_index - self.start_index
+
+    def sample_index_at(self, request_ns: int, read_start: int, read_end: int, timestamp_ns: int) -> int:
+        """
+        Returns the index of the first sample acquired after a request. The index is limited to the current read,
+        because the samples of earlier reads have already been published.
+        :param request_ns: Host monotonic time of the request in ns. Values <= 0 resolve to the end of the read.
+        :param read_start: Absolute index of the first sample of the current read.
+        :param read_end: Absolute index following the last sample of the current read.
+        :param timestamp_ns: Host monotonic time at which the read has been fetched from the device.
+        """
+        if request_ns <= 0:
+            return read_end
+        index = read_end - int(round((timestamp_ns - request_ns) * self.sample_rate / 1e9))
+        return min(max(index, read_start), read_end)
+
+    def start(self, index: int):
+        """ Starts a capture at the given sample index."""
+        self.start_index = index
+        self.end_index = index + self.length if self.length else None
+        self.stop_requested = False
+
+    def stop(self, index: int):
+        """ Ends the capture at the given sample index (exclusive). A fixed-length capture may only end earlier."""
+        index = max(index, self.start_index)
+        self.end_index = index if self.end_index is None else min(self.end_index, index)
+        self.stop_requested = True
+
+    def contains(self, index: int) -> bool:
+        """ Returns True, if the sample index belongs to the capture."""
+        return self.active and index >= self.start_index and (self.end_index is None or index < self.end_index)
+
+    def cut(self, read_start: int, read_end: int) -> tuple | None:
+        """
+        Returns the captured part of a read as (start, end) offsets into the read, or None if no sample of the
+        read belongs to the capture.
+        """
+        if not self.active:
+            return None
+        start = max(self.start_index, read_start)
+        end = read_end if self.end_index is None else min(self.end_index, read_end)
+        if end <= start:
+            return None
+        return start - read_start, end - read_start
+
+    def finished(self, read_end: int) -> bool:
+        """ Returns True, if all samples of the capture have been read."""
+        return self.active and self.end_index is not None and read_end >= self.end_index
+
+    def may_start(self, start_requested: bool) -> bool:
+        """
+        Returns True, if a capture should start. A completed fixed-length capture blocks a new capture until the
+        start request has been withdrawn, so the shared start flag does not have to be cleared by the capture.
+        :param start_requested: State of the start flag.
+        """
+        if not start_requested:
+            self.completed = False
+        return start_requested and not self.active and not self.completed
+
+    def reset(self, completed: bool = False):
+        """
+        Ends the capture.
+        :param completed: True, if a fixed-length capture ended by itself.
+        """
+        self.start_index = None
+        self.end_index = None
+        self.stop_requested = False
+        self.completed = completed
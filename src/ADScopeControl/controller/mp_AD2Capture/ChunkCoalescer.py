@@ -0,0 +1,112 @@
+import time
+
+import numpy as np
+from numpy import ndarray
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+
+
+class ChunkCoalescer:
+    """
+    Collects the small reads of the capture loop into larger blocks before they are published to the stream
+    transport. A block is published as soon as it holds the target number of samples or its oldest sample has been
+    waiting for the maximum latency, so the message rate drops at low sample rates while the display latency stays
+    bounded.
+    Reads that follow lost samples or contain corrupted samples always start a new block, so the lost and
+    corrupted samples stay at the beginning of a chunk.
+    """
+
+    def __init__(self, publish, block_size: int, max_latency: float, dtype=np.float64, channels: int = 1,
+                 channel_mask: int = 1, copy_on_publish: bool = True):
+        """
+        :param publish: Callable that receives the finished DataChunk (e.g. the put method of a queue).
+        :param block_size: Target number of samples per channel of a block. Values below 2 disable coalescing.
+        :param max_latency: Maximum time in seconds a sample is held back.
+        :param dtype: Sample type.
+        :param channels: Number of channels of a read.
+        :param channel_mask: Channel mask written to the chunk headers.
+        :param copy_on_publish: Publish a copy of the block, if the transport keeps a reference to the data
+        (e.g. a multiprocessing.Queue).
+        """
+        self._publish = publish
+        self._block_size = max(int(block_size), 1)
+        self._max_latency = max_latency
+        self._copy_on_publish = copy_on_publish
+        self._channel_mask = channel_mask
+        self._buffer: ndarray = np.empty((max(int(channels), 1), self._block_size), dtype=dtype)
+
+        # Pending block
+        self._pending = 0
+        self._first_sample_index = 0
+        self._lost = 0
+        self._corrupted = 0
+        self._oldest = None
+        self._timestamp_ns = 0
+
+        self._reads = 0
+        self._published = 0
+
+    @property
+    def reads(self) -> int:
+        """ Returns the number of reads added to the coalescer."""
+        return self._reads
+
+    @property
+    def published(self) -> int:
+        """ Returns the number of published chunks."""
+        return self._published
+
+    @property
+    def pending(self) -> int:
+        """ Returns the number of samples per channel waiting to be published."""
+        return self._pending
+
+    def add(self, samples: ndarray, first_sample_index: int, lost: int = 0, corrupted: int = 0,
+            timestamp_ns: int = 0):
+        """
+        Adds a read to the pending block and publishes the block if it is full.
+        :param samples: (n_channels x n_samples) view on the capture buffer. Copied, so it can be reused afterwards.
+        :param first_sample_index: Absolute index of the first sample.
+        :param lost: Number of samples lost directly before this read.
+        :param corrupted: Number of samples in this read that could be corrupt.
+        :param timestamp_ns: Host monotonic time at which the read has been fetched from the device.
+        """
+        self._reads += 1
+        n = samples.shape[-1]
+        if self._pending and (lost or corrupted or self._pending + n > self._block_size):
+            self.flush()
+
+        if n >= self._block_size:
+            # Nothing to coalesce, publish the read as it is
+            self._emit(samples, first_sample_index, lost, corrupted, timestamp_ns)
+            return
+
+        if not self._pending:
+            self._first_sample_index = first_sample_index
+            self._lost = lost
+            self._corrupted = corrupted
+            self._oldest = time.monotonic()
+        self._buffer[:, self._pending:self._pending + n] = samples
+        self._pending += n
+        # The timestamp of a block refers to its last sample
+        self._timestamp_ns = timestamp_ns
+        if self._pending >= self._block_size:
+            self.flush()
+
+    def poll(self):
+        """ Publishes the pending block if its oldest sample exceeded the maximum latency."""
+        if self._pending and time.monotonic() - self._oldest >= self._max_latency:
+            self.flush()
+
+    def flush(self):
+        """ Publishes the pending block."""
+        if not self._pending:
+            return
+        self._emit(self._buffer[:, :self._pending], self._first_sample_index, self._lost, self._corrupted,
+                   self._timestamp_ns)
+        self._pending = 0
+
+    def _emit(self, samples: ndarray, first_sample_index: int, lost: int, corrupted: int, timestamp_ns: int):
+        self._publish(DataChunk(samples.copy() if self._copy_on_publish else samples,
+                                first_sample_index, lost, corrupted, timestamp_ns, self._channel_mask))
+        self._published += 1
@@ -0,0 +1,75 @@
+from numpy import ndarray
+
+
+class DataChunk:
+    """
+    Block of samples sent from the capture process to the controller, together with a compact header.
+    The header places the chunk on the sample timeline: the absolute index of the first sample, the host time at
+    which the chunk was read, the captured channels and the number of samples the device reported as lost or
+    corrupted since the previous chunk. Lost samples are not part of the chunk, they precede it: the first sample
+    index already includes them, so consecutive chunks leave a gap of exactly the lost samples. Triggered windows
+    are not contiguous, the samples between two windows have not been shipped.
+    """
+    # Loss flags
+    FLAG_LOST = 0x1
+    FLAG_CORRUPTED = 0x2
+    # The chunk is a window around a trigger event and does not continue the previous chunk
+    FLAG_TRIGGERED = 0x4
+
+    __slots__ = ('samples', 'first_sample_index', 'lost', 'corrupted', 'timestamp_ns', 'channel_mask', 'flags',
+                 'trigger_index')
+
+    def __init__(self, samples: ndarray, first_sample_index: int = 0, lost: int = 0, corrupted: int = 0,
+                 timestamp_ns: int = 0, channel_mask: int = 0, flags: int = None, trigger_index: int = -1):
+        """
+        :param samples: (n_channels x n_samples) or one dimensional array of samples.
+        :param first_sample_index: Absolute index of the first sample since the acquisition has been started.
+        :param lost: Number of samples lost directly before this chunk.
+        :param corrupted: Number of samples in this chunk that could be corrupt.
+        :param timestamp_ns: Host monotonic time (time.monotonic_ns) at which the last sample of the chunk has been
+        read from the device.
+        :param channel_mask: Bit mask of the analog in channels, one row of samples per set bit in ascending order.
+        :param flags: Loss flags. Derived from lost and corrupted if None.
+        :param trigger_index: Absolute index of the trigger event of a triggered window, -1 otherwise.
+        """
+        self.samples = samples
+        self.first_sample_index = first_sample_index
+        self.lost = lost
+        self.corrupted = corrupted
+        self.timestamp_ns = timestamp_ns
+        self.channel_mask = channel_mask
+        if flags is None:
+            flags = (self.FLAG_LOST if lost else 0) | (self.FLAG_CORRUPTED if corrupted else 0)
+        self.flags = flags
+        self.trigger_index = trigger_index
+
+    @staticmethod
+    def channel_mask_of(channels: list) -> int:
+        """ Returns the channel mask of the given analog in channels."""
+        mask = 0
+        for channel in channels:
+            mask |= 1 << channel
+        return mask
+
+    @property
+    def channels(self) -> list:
+        """ Returns the analog in channels of the rows."""
+        return [channel for channel in range(self.channel_mask.bit_length()) if self.channel_mask >> channel & 1]
+
+    def copy(self) -> 'DataChunk':
+        """ Returns a chunk with the same header and a copy of the samples."""
+        return DataChunk(self.samples.copy(), self.first_sample_index, self.lost, self.corrupted, self.timestamp_ns,
+                         self.channel_mask, self.flags, self.trigger_index)
+
+    @property
+    def sample_count(self) -> int:
+        """ Returns the number of samples per channel."""
+        return self.samples.shape[-1]
+
+    @property
+    def next_sample_index(self) -> int:
+        """ Returns the absolute index of the sample following this chunk."""
+        return self.first_sample_index + self.sample_count
+
+    def __len__(self):
+        return self.sample_count
@@ -0,0 +1,85 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+
+class DeviceCapabilityCache:
+    """
+    Persists the capabilities of the devices (analog in channels, buffer sizes, ADC bits, range and offset
+    information) in a JSON file, so they do not have to be read by opening the device every time it is selected.
+    The entries are keyed by device name and serial number. The whole cache is dropped if it has been written with
+    another DWF version, because a new version can report different capabilities for the same device.
+    """
+
+    def __init__(self, path: str | Path, dwf_version: str):
+        """
+        :param path: Path of the JSON file. Missing directories are created when the cache is saved.
+        :param dwf_version: Version of the DWF library the capabilities are read with.
+        """
+        self.logger = logging.getLogger(f"DeviceCapabilityCache({os.getpid()})")
+        self.path = Path(path)
+        self.dwf_version = str(dwf_version)
+        self._devices: dict = {}
+        self.load()
+
+    @staticmethod
+    def key(device_name: str, serial_number: str) -> str:
+        """ Returns the key of a device in the cache."""
+        return f"{device_name}:{serial_number}"
+
+    def load(self):
+        """ Reads the cache file. A missing or unreadable file or another DWF version results in an empty cache."""
+        self._devices = {}
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r') as f:
+                content = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Can not read the capability cache {self.path}: {e}")
+            return
+        if content.get('dwf_version') != self.dwf_version:
+            self.logger.info(f"Capability cache has been written with DWF {content.get('dwf_version')}, "
+                             f"invalidating it for DWF {self.dwf_version}.")
+            return
+        self._devices = dict(content.get('devices', {}))
+
+    def save(self):
+        """ Writes the cache file. The file is replaced atomically, so concurrent readers never see half a file."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with open(temporary, 'w') as f:
+                json.dump({'dwf_version': self.dwf_version, 'devices': self._devices}, f, indent=2)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            self.logger.warning(f"Can not write the capability cache {self.path}: {e}")
+
+    def get(self, device_name: str, serial_number: str) -> dict | None:
+        """
+        Returns the cached capabilities of a device.
+        :param device_name: Name of the device.
+        :param serial_number: Serial number of the device.
+        :return: The capabilities or None, if the device is not cached.
+        """
+        capabilities = self._devices.get(self.key(device_name, serial_number))
+        return dict(capabilities) if capabilities is not None else None
+
+    def put(self, device_name: str, serial_number: str, capabilities: dict):
+        """
+        Stores the capabilities of a device and writes the cache file.
+        :param device_name: Name of the device.
+        :param serial_number: Serial number of the device.
+        :param capabilities: JSON serializable capabilities.
+        """
+        self._devices[self.key(device_name, serial_number)] = dict(capabilities)
+        self.save()
+
+    def invalidate(self, device_name: str = None, serial_number: str = None):
+        """ Removes a device or, if no device is given, all devices from the cache."""
+        if device_name is None:
+            self._devices = {}
+        else:
+            self._devices.pop(self.key(device_name, serial_number), None)
+        self.save()
@@ -1,6 +1,8 @@
 import sys
 import sys
 import time
+from datetime import datetime
+from pathlib import Path
 from ctypes import c_int, c_int32, byref, create_string_buffer, cdll, c_double, c_byte
 from multiprocessing import Queue, Value
 
@@ -8,31 +10,35 @@ import mpPy6
 import numpy as np
 from mpPy6.CProperty import CProperty
 
+from ADScopeControl.controller.DeviceInformation.WaveFormsAPI import WFAPIChannels
+from ADScopeControl.controller.mp_AD2Capture.CaptureBuffer import CaptureBuffer
+from ADScopeControl.controller.mp_AD2Capture.CaptureInstrumentation import CaptureInstrumentation
+from ADScopeControl.controller.mp_AD2Capture.CaptureWindow import CaptureWindow
+from ADScopeControl.controller.mp_AD2Capture.ChunkCoalescer import ChunkCoalescer
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.DeviceCapabilityCache import DeviceCapabilityCache
+from ADScopeControl.controller.mp_AD2Capture.PollScheduler import PollScheduler
+from ADScopeControl.controller.mp_AD2Capture.SettlingDetector import SettlingDetector
+from ADScopeControl.controller.mp_AD2Capture.StreamChannels import CaptureChannel, PreviewChannel
+from ADScopeControl.controller.mp_AD2Capture.StreamFileWriter import StreamFileWriter
+from ADScopeControl.controller.mp_AD2Capture.TriggerDetector import TriggerDetector
 from ADScopeControl.model.AD2Constants import AD2Constants
 from ADScopeControl.constants.dwfconstants import enumfilterType, enumfilterDemo, enumfilterUSB, acqmodeRecord, \
     DwfStateConfig, \
-    DwfStatePrefill, DwfStateArmed
+    DwfStatePrefill, DwfStateArmed, trigsrcDetectorAnalogIn, trigtypeEdge, trigcondRisingPositive, \
+    trigcondFallingNegative
 
 
 class MPCaptDevice(mpPy6.CProcess, ):
 
-    #@staticmethod
-    def timeit(func):
-        def wrapper(self, *args, **kwargs):
-            time_start = time.time()
-            res = func(self, *args, **kwargs)
-            time_stop = time.time()
-            print(f"Function {func.__name__} took {time_stop - time_start} seconds.")
-            return res  # time_stop - time_start
-
-        return wrapper
-
     def __init__(self, state_queue: Queue, cmd_queue: Queue,
-                 streaming_data_queue: Queue,
+                 streaming_data_queue: PreviewChannel,
+                 capture_data_queue: CaptureChannel,
                  start_capture_flag: Value,
                  kill_capture_flag: Value,
                  kill_flag: Value,
-                 internal_log, internal_log_level, log_file):
+                 internal_log, internal_log_level, log_file,
+                 capture_request_ns: Value = None):
         super().__init__(state_queue, cmd_queue,
                          kill_flag=kill_flag,
                          internal_log=internal_log,
@@ -41,7 +47,19 @@ class MPCaptDevice(mpPy6.CProcess, ):
         # Objects for data exchange
         self.start_capture_flag: Value = start_capture_flag
         self.kill_capture_flag: Value = kill_capture_flag
+        # Host monotonic time (ns) of the last start or stop request, used to resolve it to a sample index
+        self.capture_request_ns: Value = capture_request_ns
+        # The lossy preview channel carries all samples, the lossless capture channel only the captured ones
         self.stream_data_queue = streaming_data_queue
+        self.capture_data_queue = capture_data_queue
+        # A queue pickles the data in its feeder thread after put() returned, so it needs its own copy of the
+        # reused capture buffer. The shared memory ring copies the data during put().
+        self._stream_copy_on_put = not streaming_data_queue.copies_on_put
+        # Number of samples of a fixed-length capture and its length in seconds. 0 captures until stopped.
+        self._capture_length_samples = 0
+        self._capture_length_seconds = 0.0
+        self._channel_statistics = {}
+        self._capture_channel_alarms = 0
 
         # WaveForms api objects and handles
         self.dwf = None
@@ -51,11 +69,48 @@ class MPCaptDevice(mpPy6.CProcess, ):
 
         self._connected_devices = []
         self._ain_channels = []
+        # Capabilities of the selected device, read from the capability cache if possible
+        self._capability_cache: DeviceCapabilityCache = None
+        # Keep the device open and configured between captures, only re-arm the acquisition on start
+        self._keep_session = True
+        # Settings the open device is configured with. None, if it has to be configured before the next capture.
+        self._session_settings: tuple = None
+        # Index of the device the open session belongs to
+        self._session_device_index: int = None
+        self._device_capabilities: dict = {}
+        self._ain_buffer_size: int = 0
 
         # Capture data counters
         self._selected_device_index: int = 0
         self._selected_ain_channel: int = 0
         self._sample_rate = 0
+        self._poll_watermark = 0.5
+        self._poll_interval = 0
+        # Reads are coalesced into blocks of this many samples, but held back at most for the given latency (s)
+        self._stream_block_size = 4096
+        self._stream_max_latency = 0.02
+        # Directory the recordings are written to by the capture process. None keeps the recordings in the GUI.
+        self._record_directory: str = None
+        self._recording_file: str = ""
+        # Offset settling detection: maximum drift (V), window length (s), timeout (s) and period of the input
+        # signal (s), matching the generated 1 Hz test sine
+        self._settle_threshold = 0.005
+        self._settle_window = 0.05
+        self._settle_timeout = 2.0
+        self._settle_period = 1.0
+        self._settling_result: dict = {}
+        # Trigger settings of the triggered capture mode. None for continuous capturing.
+        self._trigger: dict = None
+        # Interval in seconds between two reports of the capture loop timing
+        self._statistics_interval = 1.0
+        self._capture_statistics = {}
+        # Stream raw int16 ADC codes instead of volts
+        self._raw_samples = False
+        self._ain_scaling = {}
+        # Acquisition filter of the analog in channels (filterDecimate)
+        self._ain_filter: int = 0
+        # Channels captured simultaneously. If empty, only the selected channel is captured.
+        self._simultaneous_ain_channels: list = []
         self._connected = False
         self._device_serial_number: str = ""
         self._device_name: str = ""
@@ -126,6 +181,15 @@ class MPCaptDevice(mpPy6.CProcess, ):
     def ain_channels(self, value):
         self._ain_channels = value
 
+    @CProperty
+    def device_capabilities(self) -> dict:
+        """ Returns the capabilities of the selected device (channels, buffer sizes, ADC bits, range, offset)."""
+        return self._device_capabilities
+
+    @device_capabilities.setter(emit_to='device_capabilities_changed')
+    def device_capabilities(self, value: dict):
+        self._device_capabilities = value
+
     @CProperty
     def device_capturing(self):
         return self._device_capturing
@@ -151,6 +215,69 @@ class MPCaptDevice(mpPy6.CProcess, ):
     def sample_rate(self, value):
         self._sample_rate = value
 
+    @CProperty
+    def poll_interval(self) -> float:
+        """ Returns the interval between two polls of the device in seconds."""
+        return self._poll_interval
+
+    @poll_interval.setter(emit_to='poll_interval_changed')
+    def poll_interval(self, value: float):
+        self._poll_interval = value
+
+    @CProperty
+    def settling_result(self) -> dict:
+        """ Returns how the offset settling of the last capture ended, including whether it timed out."""
+        return self._settling_result
+
+    @settling_result.setter(emit_to='settling_result_changed')
+    def settling_result(self, value: dict):
+        self._settling_result = value
+
+    @CProperty
+    def recording_file(self) -> str:
+        """ Returns the file the current or last recording has been written to."""
+        return self._recording_file
+
+    @recording_file.setter(emit_to='recording_file_changed')
+    def recording_file(self, value: str):
+        self._recording_file = value
+
+    @CProperty
+    def capture_statistics(self) -> dict:
+        """ Returns the timing histograms of the capture loop stages of the last report interval."""
+        return self._capture_statistics
+
+    @capture_statistics.setter(emit_to='capture_statistics_changed')
+    def capture_statistics(self, value: dict):
+        self._capture_statistics = value
+
+    @CProperty
+    def channel_statistics(self) -> dict:
+        """ Returns the depth and the drop counters of the preview and the capture channel."""
+        return self._channel_statistics
+
+    @channel_statistics.setter(emit_to='channel_statistics_changed')
+    def channel_statistics(self, value: dict):
+        self._channel_statistics = value
+
+    @CProperty
+    def capture_channel_alarms(self) -> int:
+        """ Returns how often the capture process had to wait for the full capture channel."""
+        return self._capture_channel_alarms
+
+    @capture_channel_alarms.setter(emit_to='capture_channel_alarms_changed')
+    def capture_channel_alarms(self, value: int):
+        self._capture_channel_alarms = value
+
+    @CProperty
+    def ain_scaling(self) -> dict:
+        """ Returns the conversion of raw ADC codes to volts as {channel: (scale, offset)}."""
+        return self._ain_scaling
+
+    @ain_scaling.setter(emit_to='ain_scaling_changed')
+    def ain_scaling(self, value: dict):
+        self._ain_scaling = value
+
     @CProperty
     def selected_device_index(self):
         """ Returns the selected device index."""
@@ -159,13 +286,17 @@ class MPCaptDevice(mpPy6.CProcess, ):
     @selected_device_index.setter(emit_to='selected_device_index_changed')
     def selected_device_index(self, device_index: int):
         """ Sets the selected device index."""
+        if device_index != self._selected_device_index and self.session_open():
+            # The session belongs to the previously selected device
+            self.close_device()
         self._selected_device_index = device_index
         # If the selected device index change, we need to update the device information
         self.device_name = self.get_device_name(self._selected_device_index)
         self.device_serial_number = self.get_device_serial_number(self._selected_device_index)
 
-        self.ain_channels = self.get_ain_channels()
-        self.ain_buffer_size = self.get_ain_buffer_size(self._selected_device_index)
+        self.device_capabilities = self.get_device_capabilities()
+        self.ain_channels = list(range(0, self._device_capabilities['ain_channel_count']))
+        self._ain_buffer_size = self._device_capabilities['ain_buffer_size']
 
     @CProperty
     def ready_for_recording(self):
@@ -220,18 +351,16 @@ class MPCaptDevice(mpPy6.CProcess, ):
         self.logger.debug(f"Filter has been used: {hex(int(filter_type))}")
         self.dwf.FDwfEnum(filter, byref(cDevice))
 
+        # One pass over the enumerated devices, every device is reported as soon as it has been read
         for iDevice in range(0, cDevice.value):
-            if self.get_device_serial_number(iDevice) == "DEMO":
-                _type = "DEMO"
-            else:
-                _type = type
+            serial_number = self.get_device_serial_number(iDevice)
             connected_devices.append({
-                'type': _type,
+                'type': "DEMO" if serial_number == "DEMO" else type,
                 'device_id': int(iDevice),
                 'device_name': self.get_device_name(iDevice),
-                'serial_number': self.get_device_serial_number(iDevice)
+                'serial_number': serial_number
             })
-            # _mp_log_debug(f"Found {type} device: {devicename.value.decode('UTF-8')} ({serialnum.value.decode('UTF-8')})")
+            self.connected_devices = list(connected_devices)
         self.logger.debug(f"Found {len(connected_devices)} devices.")
         return connected_devices
 
@@ -249,19 +378,106 @@ class MPCaptDevice(mpPy6.CProcess, ):
         self.selected_device_index = ain_channel
         # self.ain_buffer_size = self.get_ain_buffer_size(self._selected_device_index)
 
+    @mpPy6.CProcess.register_signal()
+    def set_capture_length(self, samples: int, seconds: float):
+        self._capture_length_samples = samples
+        self._capture_length_seconds = seconds
+
+    def capture_length(self) -> int:
+        """ Returns the number of samples of a fixed-length capture, 0 if the capture runs until it is stopped."""
+        if self._capture_length_samples > 0:
+            return int(self._capture_length_samples)
+        return int(round(self._capture_length_seconds * self.sample_rate))
+
+    @mpPy6.CProcess.register_signal()
+    def set_keep_session(self, enabled: bool):
+        self._keep_session = enabled
+
+    @mpPy6.CProcess.register_signal()
+    def set_capability_cache(self, path: str):
+        if path is None:
+            self._capability_cache = None
+        else:
+            self._capability_cache = DeviceCapabilityCache(path, self.get_dwf_version())
+
     @mpPy6.CProcess.register_signal()
     def set_sample_rate(self, sample_rate):
         self.sample_rate = sample_rate
 
+    @mpPy6.CProcess.register_signal()
+    def set_poll_watermark(self, watermark: float):
+        self._poll_watermark = watermark
+
+    @mpPy6.CProcess.register_signal()
+    def set_stream_coalescing(self, block_size: int, max_latency: float):
+        self._stream_block_size = block_size
+        self._stream_max_latency = max_latency
+
+    @mpPy6.CProcess.register_signal()
+    def set_settling(self, threshold: float, window: float, timeout: float, period: float = 0.0):
+        self._settle_threshold = threshold
+        self._settle_window = window
+        self._settle_timeout = timeout
+        self._settle_period = period
+
+    @mpPy6.CProcess.register_signal()
+    def set_record_directory(self, directory: str):
+        self._record_directory = str(directory) if directory else None
+
+    def open_recording_file(self, ain_channels: list, dtype) -> StreamFileWriter:
+        """ Creates a new file for a recording in the record directory."""
+        file_name = f"capture_{self._device_serial_number}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.adsc"
+        writer = StreamFileWriter(Path(self._record_directory) / file_name, self.sample_rate, ain_channels, dtype,
+                                  self._ain_scaling)
+        self.logger.info(f"Recording to {writer.path}.")
+        self.recording_file = str(writer.path)
+        return writer
+
+    @mpPy6.CProcess.register_signal()
+    def set_trigger(self, trigger: dict):
+        self._trigger = dict(trigger) if trigger else None
+
+    @mpPy6.CProcess.register_signal()
+    def set_raw_samples(self, raw_samples: bool):
+        self._raw_samples = raw_samples
+
+    @mpPy6.CProcess.register_signal()
+    def set_ain_filter(self, filter_number: int):
+        self._ain_filter = int(filter_number)
+
+    @mpPy6.CProcess.register_signal()
+    def set_simultaneous_ain_channels(self, ain_channels: list):
+        self._simultaneous_ain_channels = list(ain_channels)
+
+    def capture_channels(self) -> list:
+        """ Returns the sorted list of analog in channels that are captured."""
+        if len(self._simultaneous_ain_channels) > 0:
+            channels = set(int(c) for c in self._simultaneous_ain_channels)
+        else:
+            channels = {int(self.selected_ain_channel)}
+        if self._trigger is not None:
+            # The trigger channel has to be captured for detecting the trigger events
+            channels.add(int(self._trigger['channel']))
+        return sorted(channels)
+
     # ==================================================================================================================
     # Functions for opening and closing the device
     # ==================================================================================================================
     @mpPy6.CProcess.register_signal()
     def open_device(self) -> int:
         """
-        Opens the device and returns the handle.
+        Opens the device and returns the handle. A session kept open for the same device with the same acquisition
+        settings is reused, so the next capture only re-arms the acquisition.
         :return: Device handle.
         """
+        if self.session_open():
+            if self._keep_session and self._session_device_index == self._selected_device_index and \
+                    self._session_settings == self.acquisition_settings(self.capture_channels()):
+                self.logger.info(f"Reusing the open session of {self._device_name} ({self._device_serial_number}).")
+                self.connected = self.device_connected()
+                self.device_state(AD2Constants.DeviceState.ACQ_NOT_STARTED())
+                return int(self.hdwf.value)
+            self.close_device()
         if self.hdwf is not None or not isinstance(self.hdwf, c_int):
             self.hdwf = c_int()
 
@@ -271,6 +487,7 @@ class MPCaptDevice(mpPy6.CProcess, ):
         # Opens the device specified by idxDevice. The device handle is returned in hdwf. If idxDevice is -1, the
         # first available device is opened.
         self.dwf.FDwfDeviceOpen(c_int(self._selected_device_index), byref(self.hdwf))
+        self._session_device_index = self._selected_device_index
 
         self._device_name = self.get_device_name(self._selected_device_index)
         self._device_serial_number = self.get_device_serial_number(self._selected_device_index)
@@ -295,28 +512,78 @@ class MPCaptDevice(mpPy6.CProcess, ):
         self.logger.debug(f"[Task] Closing device...")
         self.dwf.FDwfDeviceClose(self.hdwf)
         self.hdwf.value = 0
+        self._session_settings = None
+        self._session_device_index = None
         self.connected = False
         self.logger.info(f"[Task] Device closed.")
 
+    @mpPy6.CProcess.register_signal()
+    def release_session(self):
+        """ Closes a device session that has been kept open after the capture stopped."""
+        if self.session_open():
+            self.logger.info("Releasing the device session.")
+            self.close_device()
+
+    def session_open(self) -> bool:
+        """ Returns True, if a device handle is open."""
+        return self.hdwf is not None and self.hdwf.value != 0
+
     # ==================================================================================================================
     # Device Information
     # ==================================================================================================================
-    def get_ain_channels(self) -> list:
-        #self.logger.debug(f"Reading available analog input channels for device {self.selected_device_index}.")
-        #cInfo = c_int()
-        #print(f">>> {cInfo}")
-        #self.dwf.FDwfEnumConfigInfo(c_int(self.selected_device_index), c_int(1), byref(cInfo))
-        #print(f">>><<<< {cInfo}")
-        #self.ain_channels = cInfo.value
-        #if self.ain_channels == 0:
-        # Sometimes, the device reports a wrong number of ain channels
-        # so we can try to connect to the device first and retrieve the information
-        self.open_device()
-        self.ain_channels = self.analog_in_channels_count()
-        self.close_device()
-        self.logger.info(f"Device {self.device_name} (#{self.selected_device_index}, SNR: {self.device_serial_number}) "
-                         f"AIn: {self.ain_channels}")
-        return list(range(0, self.ain_channels))
+    def get_device_capabilities(self) -> dict:
+        """
+        Returns the capabilities of the selected device. They are taken from the capability cache if the device is
+        cached, otherwise the device is opened once to read them and the result is cached.
+        """
+        if self._capability_cache is not None:
+            capabilities = self._capability_cache.get(self._device_name, self._device_serial_number)
+            if capabilities is not None:
+                self.logger.debug(f"Capabilities of {self._device_name} ({self._device_serial_number}) "
+                                  f"taken from the cache.")
+                return capabilities
+        capabilities = self.read_device_capabilities()
+        if self._capability_cache is not None:
+            self._capability_cache.put(self._device_name, self._device_serial_number, capabilities)
+        return capabilities
+
+    def read_device_capabilities(self) -> dict:
+        """
+        Opens the selected device, reads its analog in capabilities and closes it again. The configuration info of
+        the enumeration sometimes reports a wrong number of analog in channels, so the device has to be opened.
+        """
+        hdwf = c_int()
+        self.dwf.FDwfDeviceOpen(c_int(self._selected_device_index), byref(hdwf))
+        if hdwf.value == 0:
+            szerr = create_string_buffer(512)
+            self.dwf.FDwfGetLastErrorMsg(szerr)
+            raise Exception(f"Failed to open device for reading its capabilities: {szerr.value.decode('utf-8')}")
+        try:
+            int0, int1 = c_int(), c_int()
+            dbl0, dbl1, dbl2 = c_double(), c_double(), c_double()
+            self.dwf.FDwfAnalogInChannelCount(hdwf, byref(int0))
+            ain_channel_count = int(int0.value)
+            self.dwf.FDwfAnalogInBitsInfo(hdwf, byref(int0))
+            ain_bits = int(int0.value)
+            self.dwf.FDwfAnalogInBufferSizeInfo(hdwf, byref(int0), byref(int1))
+            ain_buffer_size_info = (int(int0.value), int(int1.value))
+            self.dwf.FDwfAnalogInChannelRangeInfo(hdwf, byref(dbl0), byref(dbl1), byref(dbl2))
+            ain_channel_range = (float(dbl0.value), float(dbl1.value), float(dbl2.value))
+            self.dwf.FDwfAnalogInChannelOffsetInfo(hdwf, byref(dbl0), byref(dbl1), byref(dbl2))
+            ain_offset = (float(dbl0.value), float(dbl1.value), float(dbl2.value))
+        finally:
+            self.dwf.FDwfDeviceClose(hdwf)
+        capabilities = {
+            'ain_channel_count': ain_channel_count,
+            'ain_bits': ain_bits,
+            'ain_buffer_size': self.get_ain_buffer_size(self._selected_device_index),
+            'ain_buffer_size_info': ain_buffer_size_info,
+            'ain_channel_range': ain_channel_range,
+            'ain_offset': ain_offset,
+        }
+        self.logger.info(f"Device {self._device_name} (#{self._selected_device_index}, "
+                         f"SNR: {self._device_serial_number}) capabilities: {capabilities}")
+        return capabilities
 
     def get_ain_buffer_size(self, device_id) -> int:
         cInfo = c_int()
@@ -451,27 +718,95 @@ class MPCaptDevice(mpPy6.CProcess, ):
     # ==================================================================================================================
     # Function for setting up the acquisition
     # ==================================================================================================================
-    def setup_acquisition(self, sample_rate: float, ain_channel: int):
+    def setup_acquisition(self, sample_rate: float, ain_channels: list):
         # self.dwf.FDwfAnalogInStatus(self.hdwf, c_int(1),
         #                            byref(self._ain_device_state))  # Variable to receive the acquisition state
-        self.logger.info(f"[Task] Setup for acquisition on channel {ain_channel} with rate {sample_rate} Hz.")
-        self.dwf.FDwfAnalogInChannelEnableSet(self.hdwf, c_int(ain_channel), c_int(1))
-        self.dwf.FDwfAnalogInChannelRangeSet(self.hdwf, c_int(ain_channel), c_double(5))
+        self.logger.info(f"[Task] Setup for acquisition on channel(s) {ain_channels} with rate {sample_rate} Hz.")
+        for ain_channel in ain_channels:
+            self.dwf.FDwfAnalogInChannelEnableSet(self.hdwf, c_int(ain_channel), c_int(1))
+            self.dwf.FDwfAnalogInChannelRangeSet(self.hdwf, c_int(ain_channel), c_double(5))
+            self.setup_ain_filter(ain_channel, self._ain_filter)
         self.dwf.FDwfAnalogInAcquisitionModeSet(self.hdwf, acqmodeRecord)
         self.dwf.FDwfAnalogInFrequencySet(self.hdwf, c_double(sample_rate))
         self.dwf.FDwfAnalogInRecordLengthSet(self.hdwf, c_double(0))  # -1 infinite record length
+        if self._trigger is not None:
+            self.setup_trigger(sample_rate, self._trigger)
         self.dwf.FDwfAnalogInConfigure(self.hdwf, c_int(1), c_int(0))
+        self.ain_scaling = {ain_channel: self.get_ain_scaling(ain_channel) for ain_channel in ain_channels}
         # Variable to receive the acquisition state
         # self.dwf.FDwfAnalogInStatus(self.hdwf, c_int(1), byref(self._ain_device_state))
-        self.logger.info(f"[Task] Wait 2 seconds for the offset to stabilize.")
-        # wait at least 2 seconds for the offset to stabilize
-        time.sleep(2)
+        # The offset settling is detected in the capture loop instead of waiting a fixed time
         self.logger.info(f"[Task] Setup for acquisition done.")
 
+    def acquisition_settings(self, ain_channels: list) -> tuple:
+        """ Returns the settings the device is configured with for capturing the given channels."""
+        trigger = tuple(sorted(self._trigger.items())) if self._trigger is not None else None
+        return self.sample_rate, tuple(ain_channels), self._selected_ain_channel, self._ain_filter, trigger
+
+    def setup_ain_filter(self, ain_channel: int, filter_number: int):
+        """
+        Sets the acquisition filter of a channel. Falls back to decimation if the device does not support the filter.
+        :param ain_channel: Channel index.
+        :param filter_number: filterDecimate (0), filterAverage (1), filterMinMax (2) or filterAverageFit (3).
+        """
+        if not WFAPIChannels.analog_in_channel_filter_info(self.dwf, self.hdwf, filter_number):
+            self.logger.warning(f"Acquisition filter {filter_number} is not supported by the device. "
+                                f"Using decimation instead.")
+            filter_number = 0
+        WFAPIChannels.analog_in_channel_filter_set(self.dwf, self.hdwf, ain_channel, filter_number)
+        self.logger.debug(f"Acquisition filter of channel {ain_channel}: "
+                          f"{WFAPIChannels.analog_in_channel_filter_get(self.dwf, self.hdwf, ain_channel)}")
+
+    def setup_trigger(self, sample_rate: float, trigger: dict):
+        """
+        Configures the edge trigger of the analog in instrument. The recording starts with the first trigger event
+        and includes the pre-trigger samples. The following events are detected by the capture process.
+        :param sample_rate: Sample rate in Hz.
+        :param trigger: Trigger settings (channel, level, hysteresis, rising, pre_samples, post_samples).
+        """
+        self.logger.info(f"[Task] Setup {'rising' if trigger['rising'] else 'falling'} edge trigger on channel "
+                         f"{trigger['channel']} at {trigger['level']} V.")
+        self.dwf.FDwfAnalogInTriggerAutoTimeoutSet(self.hdwf, c_double(0))  # disable auto trigger
+        self.dwf.FDwfAnalogInTriggerSourceSet(self.hdwf, trigsrcDetectorAnalogIn)
+        self.dwf.FDwfAnalogInTriggerTypeSet(self.hdwf, trigtypeEdge)
+        self.dwf.FDwfAnalogInTriggerChannelSet(self.hdwf, c_int(trigger['channel']))
+        self.dwf.FDwfAnalogInTriggerLevelSet(self.hdwf, c_double(trigger['level']))
+        self.dwf.FDwfAnalogInTriggerHysteresisSet(self.hdwf, c_double(trigger['hysteresis']))
+        self.dwf.FDwfAnalogInTriggerConditionSet(
+            self.hdwf, trigcondRisingPositive if trigger['rising'] else trigcondFallingNegative)
+        # Negative position: the record starts this many seconds before the trigger event
+        self.dwf.FDwfAnalogInTriggerPositionSet(self.hdwf, c_double(-trigger['pre_samples'] / sample_rate))
+
+    def create_trigger_detector(self, ain_channels: list) -> TriggerDetector:
+        """ Returns the detector for the trigger events following the first one."""
+        trigger = self._trigger
+        level, hysteresis = trigger['level'], trigger['hysteresis']
+        if self._raw_samples:
+            # The raw samples are compared in ADC codes
+            scale, offset = self._ain_scaling[trigger['channel']]
+            level, hysteresis = (level - offset) / scale, hysteresis / scale
+        return TriggerDetector(level, hysteresis, trigger['rising'], ain_channels.index(trigger['channel']),
+                               trigger['pre_samples'], trigger['post_samples'],
+                               DataChunk.channel_mask_of(ain_channels))
+
+    def get_ain_scaling(self, ain_channel: int) -> tuple:
+        """
+        Returns the factor and offset that convert the raw int16 samples of a channel to volts
+        (volts = raw * scale + offset).
+        Calls WaveForms API Functions 'FDwfAnalogInChannelRangeGet(HDWF hdwf, int idxChannel, double *pvoltsRange)'
+        and 'FDwfAnalogInChannelOffsetGet(HDWF hdwf, int idxChannel, double *pvoltOffset)'
+        :param ain_channel: Channel index
+        :return: The tuple (scale, offset)
+        """
+        volts_range = c_double()
+        volts_offset = c_double()
+        self.dwf.FDwfAnalogInChannelRangeGet(self.hdwf, c_int(ain_channel), byref(volts_range))
+        self.dwf.FDwfAnalogInChannelOffsetGet(self.hdwf, c_int(ain_channel), byref(volts_offset))
+        return float(volts_range.value) / 65536, float(volts_offset.value)
+
     # ==================================================================================================================
     # Python wrapper for WaveForms API Functions
     # ==================================================================================================================
-    @timeit
     def _dwf_analog_in_status(self, hdwf, read_data, ptr_device_state):
         try:
             _read_data_cint = c_int(int(read_data))
@@ -481,7 +816,6 @@ class MPCaptDevice(mpPy6.CProcess, ):
             raise Exception(f"Error while getting data from device: {e}")
         return ptr_device_state
 
-    @timeit
     def _dwf_analog_in_status_record(self, hdwf, ptr_c_available, ptr_c_lost, ptr_c_corrupted):
         """
         Retrieves information about the recording process. The data loss occurs when the device acquisition
@@ -501,7 +835,6 @@ class MPCaptDevice(mpPy6.CProcess, ):
             raise Exception(f"Error while getting data from device: {e}")
         return ptr_c_available, ptr_c_lost, ptr_c_corrupted
 
-    @timeit
     def _dwf_analog_in_status_data(self, hdwf, channel, ptr_rgd_samples, c_available):
         """
         Retrieves the acquired data samples from the specified idxChannel on the AnalogIn instrument. It
@@ -526,6 +859,11 @@ class MPCaptDevice(mpPy6.CProcess, ):
     def capture_process_state(self, state):
         return state
 
+    @mpPy6.CProcess.register_signal(signal_name='capture_completed')
+    def capture_completed(self, samples: int):
+        """ Reports that a fixed-length capture of this device ended by itself."""
+        return samples
+
     # ==================================================================================================================
     #
     # ==================================================================================================================
@@ -537,19 +875,23 @@ class MPCaptDevice(mpPy6.CProcess, ):
         :param sample_rate:
         :return: None
         """
-        self.logger.info(f"Starting capture on channel {self.selected_ain_channel} with rate {self.sample_rate} Hz.")
+        ain_channels = self.capture_channels()
+        self.logger.info(f"Starting capture on channel(s) {ain_channels} with rate {self.sample_rate} Hz.")
         hdwf = self.hdwf
         self.device_state(AD2Constants.DeviceState.DEV_CAPT_SETUP())
 
-        self.setup_sine_wave(self.selected_ain_channel)
-
-        self.setup_acquisition(self.sample_rate, self.selected_ain_channel)
+        # A device that is still configured from the previous capture only needs to be re-armed
+        settings = self.acquisition_settings(ain_channels)
+        session_reused = self._keep_session and self.session_open() and self._session_settings == settings
+        if session_reused:
+            self.logger.info("Device is still configured from the previous capture. Re-arming the acquisition.")
+        else:
+            self.setup_sine_wave(self.selected_ain_channel)
+            self.setup_acquisition(self.sample_rate, ain_channels)
+            self._session_settings = settings
 
         # Variable to receive the acquisition state
         # self.dwf.FDwfAnalogInStatus(self.hdwf, c_int(1), byref(self._ain_device_state))
-        # self.logger.info(f"[Task] Wait 2 seconds for the offset to stabilize.")
-        # wait at least 2 seconds for the offset to stabilize
-        time.sleep(2)
         # self.logger.info(f"[Task] Setup for acquisition done.")
 
         # Creates a Sin Wave on the Analog Out Channel 0
@@ -560,27 +902,84 @@ class MPCaptDevice(mpPy6.CProcess, ):
         self.dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(1))
         # self.logger.info("Device configured. Starting acquisition.")
 
-        time_capture_started = 0
-        capture_samples = 0
-        capture_started = False
-        capture_ended = False
+        # Writes the recording to disk, if a record directory is set
+        recording_writer: StreamFileWriter = None
+        # Start and end of the capture as sample indices
+        capture_window = CaptureWindow(self.sample_rate, self.capture_length())
 
         cAvailable = c_int()
         cLost = c_int()
         cCorrupted = c_int()
         cSamples = 0
+        # Absolute index of the next sample and the lost/corrupted samples not yet reported with a chunk
+        sample_index = 0
+        samples_lost = 0
+        samples_corrupted = 0
         sts = c_byte()
+        c_channels = [c_int(c) for c in ain_channels]
+
+        # The buffer is sized from the device buffer, so the loop does not need to allocate in steady state.
+        # All channels are read into one (n_channels x n_samples) block that is sent as a single chunk.
+        ain_buffer_size = self.get_ain_buffer_size(self._selected_device_index)
+        capture_buffer = CaptureBuffer(ain_buffer_size, dtype=np.int16 if self._raw_samples else np.float64,
+                                       channels=len(ain_channels))
+        self.logger.debug(f"Allocated capture buffer for {len(ain_channels)} x {capture_buffer.capacity} samples.")
+
+        # Sleep between the polls instead of spinning, but keep the device buffer below the watermark. Polling
+        # at least once per latency budget keeps the coalesced blocks within the budget.
+        scheduler = PollScheduler(self.sample_rate, ain_buffer_size, watermark=self._poll_watermark,
+                                  max_interval=min(0.05, max(self._stream_max_latency, 0.0005)))
+        self.poll_interval = scheduler.poll_interval
+
+        # Small reads are collected into larger blocks before they are sent to the controller
+        coalescer = ChunkCoalescer(self.stream_data_queue.put, self._stream_block_size, self._stream_max_latency,
+                                   dtype=capture_buffer.dtype, channels=len(ain_channels),
+                                   channel_mask=DataChunk.channel_mask_of(ain_channels),
+                                   copy_on_publish=self._stream_copy_on_put)
+        # The captured samples are collected into blocks of their own, so the capture channel only receives
+        # samples of the captured range. The capture channel is a queue and always needs a copy.
+        capture_coalescer = ChunkCoalescer(self.put_capture_chunk, self._stream_block_size,
+                                           max(self._stream_max_latency, 1.0), dtype=capture_buffer.dtype,
+                                           channels=len(ain_channels),
+                                           channel_mask=DataChunk.channel_mask_of(ain_channels),
+                                           copy_on_publish=True)
+
+        # In triggered mode only the windows around the trigger events are published
+        trigger_detector = None
+        if self._trigger is not None:
+            trigger_detector = self.create_trigger_detector(ain_channels)
+
+        # Timing of the loop stages, shipped to the controller every report interval
+        instrumentation = CaptureInstrumentation(
+            ('wait', 'status', 'status_record', 'data_copy', 'publish', 'loop'), self._statistics_interval)
+
+        # The samples are discarded until the offset has settled. In triggered mode the device only starts
+        # recording with the first trigger event, so there is no baseline to wait for. A re-armed device has
+        # settled during the previous capture.
+        settling = SettlingDetector(self.sample_rate, self._settle_threshold, self._settle_window,
+                                    self._settle_timeout,
+                                    scale=[self._ain_scaling[c][0] for c in ain_channels] if self._raw_samples else 1.0,
+                                    period=self._settle_period)
+        settling.settled = trigger_detector is not None or session_reused
 
         try:
             # self.dwf.FDwfAnalogOutReset(self.hdwf, c_int(0))
-            self.device_state(AD2Constants.DeviceState.DEV_CAPT_STREAMING())
-            self.ready_for_recording = True
+            if settling.settled:
+                self.device_state(AD2Constants.DeviceState.DEV_CAPT_STREAMING())
+                self.ready_for_recording = True
             while self.kill_capture_flag.value == int(False) and self._kill_flag.value == int(True):
+                if instrumentation.due():
+                    self.capture_statistics = instrumentation.report()
+                    self.channel_statistics = self.get_channel_statistics()
+                t_wait = time.perf_counter_ns()
+                scheduler.wait()
+                coalescer.poll()
+                capture_coalescer.poll()
+                t_loop = t_stage = instrumentation.record('wait', t_wait)
                 self.dwf.FDwfAnalogInStatus(hdwf, c_int(1), byref(sts))
+                t_stage = instrumentation.record('status', t_stage)
                 # self._c_samples = 0
 
-                time_start = time.time()
-
                 # Checks the state of the acquisition. To read the data from the device, set fReadData to TRUE. For
                 # single acquisition mode, the data will be read only when the acquisition is finished
                 if sts == DwfStateConfig or sts == DwfStatePrefill or sts == DwfStateArmed:
@@ -588,42 +987,173 @@ class MPCaptDevice(mpPy6.CProcess, ):
                     continue  # Acquisition not yet started.
 
                 self.dwf.FDwfAnalogInStatusRecord(hdwf, byref(cAvailable), byref(cLost), byref(cCorrupted))
+                t_stage = instrumentation.record('status_record', t_stage)
+                # Lost samples precede the available ones, so they advance the absolute sample index
+                sample_index += cLost.value
+                samples_lost += cLost.value
+                samples_corrupted += cCorrupted.value
+                # Only report the interval if it changed noticeably, to keep the state queue quiet
+                interval = scheduler.update(cAvailable.value)
+                if abs(interval - self._poll_interval) > 0.1 * self._poll_interval:
+                    self.poll_interval = interval
                 if cAvailable.value == 0:
                     # self.device_state(AD2Constants.DeviceState.NO_SAMPLES_AVAILABLE())
                     continue
 
-                rgd_samples = (c_double * cAvailable.value)()
-                # Get the data from the device and store it in rgd_samples
-                self.dwf.FDwfAnalogInStatusData(hdwf, c_int(0), byref(rgd_samples), cAvailable)
-
-                arr = np.array(rgd_samples, copy=True)
-                iteration_time = time.time() - time_start
-
-                if self.start_capture_flag.value == int(True):
-                    if not capture_started:
-                        self.capture_process_state(AD2Constants.CapturingState.RUNNING())
-                        self.logger.info(
-                            "**************************** START command received. Acquisition started.")
-                        time_capture_started = time.time()
-                        capture_started = True
-                elif self.start_capture_flag.value == int(False) and capture_started:
-                    capture_started = False
+                # Get the data from the device and store it in the preallocated capture buffer
+                samples = capture_buffer.read_analog_in(self.dwf, hdwf, c_channels, cAvailable)
+                timestamp_ns = time.monotonic_ns()
+                instrumentation.record('data_copy', t_stage)
+
+                if not settling.settled:
+                    if settling.update(samples):
+                        if settling.timed_out:
+                            self.logger.warning(f"Offset did not settle within {self._settle_timeout} s "
+                                                f"(drift {settling.drift:.5f} V).")
+                        else:
+                            self.logger.info(f"Offset settled after {settling.elapsed:.3f} s "
+                                             f"(drift {settling.drift:.5f} V).")
+                        self.settling_result = settling.result()
+                        self.device_state(AD2Constants.DeviceState.DEV_CAPT_STREAMING())
+                        self.ready_for_recording = True
+                    # Samples before settling are not published
+                    sample_index += samples.shape[1]
+                    samples_lost = 0
+                    samples_corrupted = 0
+                    continue
+
+                # Resolve start and stop requests to the sample acquired at the time of the request
+                read_start, read_end = sample_index, sample_index + samples.shape[1]
+                start_requested = self.start_capture_flag.value == int(True)
+                if capture_window.may_start(start_requested):
+                    capture_window.start(capture_window.sample_index_at(
+                        self._capture_request_ns(), read_start, read_end, timestamp_ns))
+                    self.capture_process_state(AD2Constants.CapturingState.RUNNING())
                     self.logger.info(
-                        "**************************** STOP command received. Acquisition stopped.")
+                        f"**************************** START command received. Capture starts at sample "
+                        f"{capture_window.start_index}"
+                        f"{f' for {capture_window.length} samples' if capture_window.length else ''}.")
+                    if self._record_directory is not None:
+                        recording_writer = self.open_recording_file(ain_channels, capture_buffer.dtype)
+                elif not start_requested and capture_window.active and not capture_window.stop_requested:
+                    capture_window.stop(capture_window.sample_index_at(
+                        self._capture_request_ns(), read_start, read_end, timestamp_ns))
+                    self.logger.info(f"**************************** STOP command received. Capture ends at sample "
+                                     f"{capture_window.end_index}.")
+
+                t_stage = time.perf_counter_ns()
+                if trigger_detector is not None:
+                    for window in trigger_detector.process(samples, sample_index, samples_lost, samples_corrupted,
+                                                           timestamp_ns):
+                        self.stream_data_queue.put(window)
+                        if capture_window.contains(window.trigger_index):
+                            if recording_writer is not None:
+                                recording_writer.write(window)
+                            else:
+                                self.put_capture_chunk(window)
+                    # A window completes post-trigger samples after its trigger event
+                    capture_finished = capture_window.finished(read_end - trigger_detector.post_samples)
+                else:
+                    cut = capture_window.cut(read_start, read_end)
+                    if cut is not None:
+                        start, end = cut
+                        # Lost and corrupted samples belong to the beginning of the read
+                        lost, corrupted = (samples_lost, samples_corrupted) if start == 0 else (0, 0)
+                        if recording_writer is not None:
+                            recording_writer.write(DataChunk(samples[:, start:end], read_start + start, lost,
+                                                             corrupted))
+                        else:
+                            capture_coalescer.add(samples[:, start:end], read_start + start, lost, corrupted,
+                                                  timestamp_ns)
+                    coalescer.add(samples, sample_index, samples_lost, samples_corrupted, timestamp_ns)
+                    capture_finished = capture_window.finished(read_end)
+
+                if capture_finished:
+                    capture_coalescer.flush()
+                    # A fixed-length capture ends by itself. The start flag may be shared with other devices, so it
+                    # is left to the controller to clear it once all devices completed.
+                    completed = not capture_window.stop_requested
                     self.capture_process_state(AD2Constants.CapturingState.STOPPED())
-                    time_capture_stopped = time.time()
-                    time_captured = time_capture_stopped - time_capture_started
-                    self.logger.info(
-                        f"Acquisition stopped after {time_captured} seconds "
-                        f"samples. Resulting in a time of {capture_samples / self.sample_rate} s.")
-                self.stream_data_queue.put(arr)
+                    if completed:
+                        self.capture_completed(capture_window.captured)
+                    self.logger.info(f"Capture ended. Captured samples {capture_window.start_index} to "
+                                     f"{capture_window.end_index} ({capture_window.captured} samples, "
+                                     f"{capture_window.captured / self.sample_rate} s).")
+                    if recording_writer is not None:
+                        recording_writer.close()
+                        self.logger.info(f"Wrote {recording_writer.samples} samples to {recording_writer.path}.")
+                        recording_writer = None
+                    capture_window.reset(completed)
+                instrumentation.record('publish', t_stage)
+                instrumentation.record('loop', t_loop)
+                sample_index += samples.shape[1]
+                samples_lost = 0
+                samples_corrupted = 0
 
         except Exception as e:
             self.logger.error(f"Error while capturing data from device: {e}")
+            self.ready_for_recording = False
+            self.close_device()
             raise Exception(f"Error while capturing data from device: {e}")
-        self.logger.info("Capture thread ended.")
+        finally:
+            if recording_writer is not None:
+                recording_writer.close()
+        coalescer.flush()
+        # A capture that is still running when the capture loop ends keeps the samples captured so far. The flush
+        # waits for the controller to make room in the capture channel.
+        capture_coalescer.flush()
+        self.channel_statistics = self.get_channel_statistics()
+        self.logger.info(f"Capture thread ended. Capture buffer has been allocated "
+                         f"{capture_buffer.allocations} time(s). Coalesced {coalescer.reads} reads into "
+                         f"{coalescer.published} chunks.")
+        if trigger_detector is not None:
+            self.logger.info(f"Detected {trigger_detector.triggers} trigger events, "
+                             f"{trigger_detector.windows_dropped} windows dropped due to lost samples.")
         self.ready_for_recording = False
-        self.close_device()
+        if self._keep_session and self._kill_flag.value == int(True):
+            # Stop the acquisition, but keep the device open and configured for the next capture. The device is
+            # closed on an explicit disconnect.
+            self.dwf.FDwfAnalogInConfigure(hdwf, c_int(0), c_int(0))
+            self.device_state(AD2Constants.DeviceState.ACQ_NOT_STARTED())
+            self.logger.info("Acquisition stopped. Device session kept open.")
+        else:
+            self.close_device()
+
+    def put_capture_chunk(self, chunk: DataChunk):
+        """
+        Puts a chunk into the capture channel, waiting while the channel is full. The wait also continues after the
+        capture loop has been stopped, so the last block of a capture is not lost. Only if the process is killed,
+        the chunk is dropped and reported.
+        """
+        if not self.capture_data_queue.put(chunk, on_full=self._on_capture_channel_full,
+                                           keep_waiting=self._process_running):
+            self.logger.error(f"Dropped {chunk.sample_count} captured samples starting at sample "
+                              f"{chunk.first_sample_index}, the process is shutting down.")
+            self.channel_statistics = self.get_channel_statistics()
+
+    def _process_running(self) -> bool:
+        return self._kill_flag.value == int(True)
+
+    def _capture_request_ns(self) -> int:
+        return self.capture_request_ns.value if self.capture_request_ns is not None else 0
+
+    def _on_capture_channel_full(self, channel: CaptureChannel):
+        if channel.full_events == 1 or channel.full_events % 10 == 0:
+            self.logger.warning(f"Capture channel is full ({channel.max_depth} chunks). Waiting for the controller.")
+        self.capture_channel_alarms = channel.full_events
+
+    def get_channel_statistics(self) -> dict:
+        """ Returns the depth and the drop counters of the preview and the capture channel."""
+        return {
+            'preview_depth': self.stream_data_queue.depth,
+            'preview_max_depth': self.stream_data_queue.max_depth,
+            'preview_dropped': self.stream_data_queue.dropped,
+            'capture_depth': self.capture_data_queue.depth,
+            'capture_max_depth': self.capture_data_queue.max_depth,
+            'capture_full_events': self.capture_data_queue.full_events,
+            'capture_dropped': self.capture_data_queue.dropped,
+            'capture_dropped_samples': self.capture_data_queue.dropped_samples,
+        }
 
     # ==================================================================================================================
     # Others
@@ -640,7 +1170,6 @@ class MPCaptDevice(mpPy6.CProcess, ):
         # dwf.FDwfAnalogOutNodeFrequencySet(hdwf, c_int(0), c_int(2), c_double(0.1))
         # dwf.FDwfAnalogOutNodeAmplitudeSet(hdwf, c_int(0), c_int(2), c_double(50))
         self.dwf.FDwfAnalogOutConfigure(self.hdwf, c_int(channel), c_int(1))
-        time.sleep(1)
         self.logger.debug(f"Sine wave on output channel {channel} configured.")
 
 
@@ -648,12 +1177,14 @@ if __name__ == "__main__":
     state_queue = Queue()
     cmd_queue = Queue()
 
-    streaming_data_queue = Queue()
+    streaming_data_queue = PreviewChannel()
+    capture_data_queue = CaptureChannel()
     start_capture_flag = Value('i', 0)
     kill_capture_flag = Value('i', 0)
 
     mpcapt = MPCaptDevice(state_queue, cmd_queue,
                           streaming_data_queue,
+                          capture_data_queue,
                           start_capture_flag,
                           kill_capture_flag, False
                           )
@@ -0,0 +1,75 @@
+import time
+
+
+class PollScheduler:
+    """
+    Decides how long the capture loop sleeps between two polls of the device. Every poll drains the device
+    buffer, so the fill level at the next poll grows with the observed sample rate times the poll interval.
+    The interval is chosen so that the buffer only fills up to half of the watermark, and drops to the minimum
+    as soon as a poll finds the buffer above the watermark. The observed rate is never assumed below the configured
+    sample rate, so the interval stays below buffer_size * watermark / sample_rate.
+    """
+
+    def __init__(self, sample_rate: float, buffer_size: int, watermark: float = 0.5,
+                 min_interval: float = 0.0005, max_interval: float = 0.05, smoothing: float = 0.2):
+        """
+        :param sample_rate: Configured sample rate in Hz.
+        :param buffer_size: Size of the device buffer in samples.
+        :param watermark: Fraction of the device buffer that should not be exceeded.
+        :param min_interval: Shortest poll interval in seconds.
+        :param max_interval: Longest poll interval in seconds. Bounds the latency of the stream.
+        :param smoothing: Weight of the newest observation in the rate estimate.
+        """
+        self._buffer_size = max(int(buffer_size), 1)
+        self._watermark = min(max(float(watermark), 0.01), 1.0)
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._smoothing = smoothing
+
+        self._sample_rate = max(float(sample_rate), 1.0)
+        self._rate = self._sample_rate
+        self._fill_level = 0.0
+        self._last_poll = None
+        self._poll_interval = self._target_interval()
+
+    @property
+    def poll_interval(self) -> float:
+        """ Returns the current poll interval in seconds."""
+        return self._poll_interval
+
+    @property
+    def fill_level(self) -> float:
+        """ Returns the fill level of the device buffer seen at the last poll (0..1)."""
+        return self._fill_level
+
+    @property
+    def observed_rate(self) -> float:
+        """ Returns the smoothed rate at which samples arrive in the device buffer in Hz."""
+        return self._rate
+
+    def _target_interval(self) -> float:
+        interval = 0.5 * self._watermark * self._buffer_size / self._rate
+        return min(max(interval, self._min_interval), self._max_interval)
+
+    def wait(self):
+        """ Sleeps for the current poll interval."""
+        time.sleep(self._poll_interval)
+
+    def update(self, available: int) -> float:
+        """
+        Updates the scheduler with the number of samples found in the device buffer.
+        :param available: Number of available samples of the last poll.
+        :return: The new poll interval in seconds.
+        """
+        now = time.perf_counter()
+        self._fill_level = available / self._buffer_size
+        if self._last_poll is not None and now > self._last_poll:
+            rate = available / (now - self._last_poll)
+            self._rate = max((1 - self._smoothing) * self._rate + self._smoothing * rate, self._sample_rate)
+        self._last_poll = now
+
+        if self._fill_level >= self._watermark:
+            self._poll_interval = self._min_interval
+        else:
+            self._poll_interval = self._target_interval()
+        return self._poll_interval
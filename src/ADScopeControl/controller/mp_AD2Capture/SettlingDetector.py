@@ -0,0 +1,100 @@
+import time
+from collections import deque
+
+import numpy as np
+from numpy import ndarray
+
+
+class SettlingDetector:
+    """
+    Decides when the offset of the analog in channels has settled after the acquisition has been configured.
+    The offset is estimated as the mean over one period of the input signal, so a periodic signal (e.g. the test sine
+    on the analog out) does not look like drift. The estimate is updated after every window, a whole fraction of the
+    period. The device is considered settled as soon as the estimate of every channel drifts less than the threshold
+    over a number of consecutive windows, or when the timeout expired. Without a period, the estimate is the mean of
+    a single window, which suits a DC input.
+    """
+
+    def __init__(self, sample_rate: float, threshold: float = 0.005, window: float = 0.05, timeout: float = 2.0,
+                 stable_windows: int = 3, scale: ndarray | float = 1.0, period: float = 0.0):
+        """
+        :param sample_rate: Sample rate in Hz.
+        :param threshold: Maximum drift of the offset estimate in V.
+        :param window: Length of a window in seconds. Rounded to a whole fraction of the period.
+        :param timeout: Maximum time in seconds to wait for settling.
+        :param stable_windows: Number of consecutive windows the drift has to stay below the threshold.
+        :param scale: Conversion of the samples to volts per channel (1.0 for samples in volts).
+        :param period: Period of the input signal in seconds. 0 for a DC input.
+        """
+        if period > 0:
+            # The estimate spans the windows of one period
+            period_samples = max(int(round(period * sample_rate)), 1)
+            self._windows_per_estimate = min(max(int(round(period / window)), 1), period_samples)
+            self._window_samples = period_samples // self._windows_per_estimate
+        else:
+            self._windows_per_estimate = 1
+            self._window_samples = max(int(window * sample_rate), 1)
+        self._threshold = threshold
+        self._timeout = timeout
+        self._stable_windows = max(int(stable_windows), 1)
+        self._scale = np.abs(np.atleast_1d(np.asarray(scale, dtype=np.float64)))
+
+        self._sum: ndarray = None
+        self._count = 0
+        # Sums of the last windows that make up the estimate
+        self._window_sums: deque = deque(maxlen=self._windows_per_estimate)
+        self._previous_mean: ndarray = None
+        self._stable = 0
+        self._started = time.monotonic()
+
+        self.settled = False
+        self.timed_out = False
+        self.drift = float('inf')
+
+    @property
+    def elapsed(self) -> float:
+        """ Returns the time in seconds since the detector has been created."""
+        return time.monotonic() - self._started
+
+    def result(self) -> dict:
+        """ Returns whether the offset settled or the detection timed out, the elapsed time and the last drift."""
+        return {'settled': self.settled and not self.timed_out, 'timed_out': self.timed_out,
+                'elapsed': self.elapsed, 'drift': self.drift}
+
+    def update(self, samples: ndarray) -> bool:
+        """
+        Adds a read and returns True as soon as the offset has settled.
+        :param samples: (n_channels x n_samples) samples.
+        """
+        if self.settled:
+            return True
+        samples = np.atleast_2d(samples)
+        if self._sum is None:
+            self._sum = np.zeros(samples.shape[0], dtype=np.float64)
+
+        position = 0
+        while position < samples.shape[1] and not self.settled:
+            n = min(self._window_samples - self._count, samples.shape[1] - position)
+            self._sum += samples[:, position:position + n].sum(axis=1)
+            self._count += n
+            position += n
+            if self._count == self._window_samples:
+                self._close_window()
+
+        if not self.settled and self.elapsed >= self._timeout:
+            self.settled = True
+            self.timed_out = True
+        return self.settled
+
+    def _close_window(self):
+        self._window_sums.append(self._sum.copy())
+        self._sum[:] = 0
+        self._count = 0
+        if len(self._window_sums) < self._windows_per_estimate:
+            return
+        mean = np.sum(self._window_sums, axis=0) / (self._windows_per_estimate * self._window_samples)
+        if self._previous_mean is not None:
+            self.drift = float(np.max(np.abs(mean - self._previous_mean) * self._scale))
+            self._stable = self._stable + 1 if self.drift < self._threshold else 0
+            self.settled = self._stable >= self._stable_windows
+        self._previous_mean = mean
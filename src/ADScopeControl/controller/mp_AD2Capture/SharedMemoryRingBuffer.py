@@ -0,0 +1,272 @@
+import queue
+import struct
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+
+
+class SharedMemoryRingBuffer:
+    """
+    Single-producer/single-consumer ring buffer in shared memory for transporting data chunks between the
+    capture process and the controller without pickling them.
+    Provides the same put/get/empty/qsize interface as a multiprocessing.Queue, so it can be used in its place.
+
+    The producer never waits for the consumer. If the producer laps the consumer, the consumer detects the
+    overrun, skips the overwritten chunks and continues with the oldest chunk that is still intact. The overruns and
+    the skipped chunks are counted. The samples reported as lost or corrupted in the skipped chunks are added to the
+    next delivered chunk, so the loss accounting of the consumer stays complete.
+    """
+
+    # Control block (uint64): published write sequence, read sequence, written and read chunks, the end of the
+    # region the producer is currently writing to and the lost and corrupted samples of all written chunks
+    _CONTROL_SIZE = 64
+    _WRITE_SEQ, _READ_SEQ, _WRITE_COUNT, _READ_COUNT, _RESERVED_SEQ, _LOST_TOTAL, _CORRUPTED_TOTAL = range(7)
+    # Start sequence of the last chunks and the lost and corrupted samples of all chunks before them, indexed by
+    # chunk number. Lets the consumer find the oldest intact chunk after an overrun, because the chunks have
+    # different sizes, and account for the losses of the skipped chunks.
+    _INDEX_LENGTH = 4096
+    _INDEX_SIZE = _INDEX_LENGTH * 3 * 8
+
+    # Message header: message size in bytes, dtype character, number of dimensions, shape and the chunk header
+    # (first sample index, lost and corrupted samples, timestamp, channel mask, flags and trigger index)
+    _HEADER = struct.Struct("<QcB6xQQQQQQIIq")
+    _WRAP_MARKER = b"\x00"
+    _ALIGNMENT = 8
+
+    def __init__(self, capacity: int, name: str = None):
+        """
+        Creates a new ring buffer or attaches to an existing one.
+        :param capacity: Size of the data region in bytes.
+        :param name: Name of the shared memory block to attach to. If None, a new block is created.
+        """
+        self._capacity = self._align(int(capacity))
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True,
+                                                   size=self._CONTROL_SIZE + self._INDEX_SIZE + self._capacity)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self._attach()
+        if self._owner:
+            self._control[:] = 0
+
+        self._reset_consumer()
+
+    def _reset_consumer(self):
+        # Overrun statistics of the consumer
+        self._overruns = 0
+        self._lost_chunks = 0
+        # Lost and corrupted samples of the chunks up to the read position, and those of skipped chunks that are
+        # added to the next delivered chunk
+        self._lost_total = 0
+        self._corrupted_total = 0
+        self._carry_lost = 0
+        self._carry_corrupted = 0
+
+    def _attach(self):
+        self._control = np.ndarray((7,), dtype=np.uint64, buffer=self._shm.buf)
+        self._index = np.ndarray((self._INDEX_LENGTH, 3), dtype=np.uint64, buffer=self._shm.buf,
+                                 offset=self._CONTROL_SIZE)
+        self._data = np.ndarray((self._capacity,), dtype=np.uint8, buffer=self._shm.buf,
+                                offset=self._CONTROL_SIZE + self._INDEX_SIZE)
+
+    # ==================================================================================================================
+    # Pickling (the buffer is attached by name in the other process)
+    # ==================================================================================================================
+    def __getstate__(self):
+        return {'name': self._shm.name, 'capacity': self._capacity}
+
+    def __setstate__(self, state):
+        self._capacity = state['capacity']
+        self._owner = False
+        self._shm = shared_memory.SharedMemory(name=state['name'])
+        self._attach()
+        self._reset_consumer()
+
+    # ==================================================================================================================
+    # Information
+    # ==================================================================================================================
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def capacity(self) -> int:
+        """ Returns the size of the data region in bytes."""
+        return self._capacity
+
+    @property
+    def overruns(self) -> int:
+        """ Returns how often the producer has overwritten data the consumer has not read yet."""
+        return self._overruns
+
+    @property
+    def lost_chunks(self) -> int:
+        """ Returns the number of chunks the consumer skipped because the producer overwrote them."""
+        return self._lost_chunks
+
+    @property
+    def fill_level(self) -> float:
+        """ Returns the fraction of the ring that holds unread data."""
+        pending = int(self._control[self._WRITE_SEQ]) - int(self._control[self._READ_SEQ])
+        return min(pending / self._capacity, 1.0)
+
+    def qsize(self) -> int:
+        """ Returns the approximate number of unread chunks."""
+        return max(int(self._control[self._WRITE_COUNT]) - int(self._control[self._READ_COUNT]), 0)
+
+    def empty(self) -> bool:
+        return int(self._control[self._WRITE_SEQ]) == int(self._control[self._READ_SEQ])
+
+    # ==================================================================================================================
+    # Producer
+    # ==================================================================================================================
+    def put(self, chunk: DataChunk, *args, **kwargs):
+        """
+        Copies the chunk into the ring. The samples can be reused by the caller as soon as the call returns.
+        :param chunk: Chunk with one or two dimensional samples. The samples do not need to be contiguous
+        (e.g. a view on a buffer).
+        """
+        array = chunk.samples
+        shape = array.shape + (0,) * (2 - array.ndim)
+        size = self._align(self._HEADER.size + array.nbytes)
+        if size > self._capacity:
+            raise ValueError(f"Chunk of {array.nbytes} bytes does not fit into the ring of {self._capacity} bytes.")
+
+        seq = int(self._control[self._WRITE_SEQ])
+        pos = seq % self._capacity
+        if pos + size > self._capacity:
+            # Not enough space left at the end of the ring, continue at the beginning
+            if self._capacity - pos >= self._HEADER.size:
+                self._HEADER.pack_into(self._data, pos, 0, self._WRAP_MARKER, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
+            seq += self._capacity - pos
+            pos = 0
+
+        self._control[self._RESERVED_SEQ] = seq + size
+        self._HEADER.pack_into(self._data, pos, size, array.dtype.char.encode(), array.ndim, *shape,
+                               chunk.first_sample_index, chunk.lost, chunk.corrupted,
+                               chunk.timestamp_ns, chunk.channel_mask, chunk.flags, chunk.trigger_index)
+        start = pos + self._HEADER.size
+        self._data[start:start + array.nbytes].view(array.dtype).reshape(array.shape)[...] = array
+
+        # Publish the chunk only after its data has been written
+        self._index[int(self._control[self._WRITE_COUNT]) % self._INDEX_LENGTH] = \
+            (seq, self._control[self._LOST_TOTAL], self._control[self._CORRUPTED_TOTAL])
+        self._control[self._LOST_TOTAL] += chunk.lost
+        self._control[self._CORRUPTED_TOTAL] += chunk.corrupted
+        self._control[self._WRITE_COUNT] += 1
+        self._control[self._WRITE_SEQ] = seq + size
+
+    # ==================================================================================================================
+    # Consumer
+    # ==================================================================================================================
+    def get(self, block: bool = True, timeout: float = None) -> DataChunk:
+        """
+        Returns the next chunk.
+        :param block: If True, waits until a chunk is available.
+        :param timeout: Maximum time to wait in seconds. None waits forever.
+        :raises queue.Empty: If no chunk is available.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            chunk = self._read_next()
+            if chunk is not None:
+                return chunk
+            if not block or (deadline is not None and time.monotonic() >= deadline):
+                raise queue.Empty
+            time.sleep(0.001)
+
+    def _read_next(self):
+        while True:
+            read_seq = int(self._control[self._READ_SEQ])
+            write_seq = int(self._control[self._WRITE_SEQ])
+            if read_seq == write_seq:
+                return None
+            if self._overwritten(read_seq):
+                self._overrun()
+                continue
+
+            pos = read_seq % self._capacity
+            if self._capacity - pos < self._HEADER.size:
+                self._control[self._READ_SEQ] = read_seq + self._capacity - pos
+                continue
+            size, dtype_char, ndim, shape0, shape1, *header = self._HEADER.unpack_from(self._data, pos)
+            if dtype_char == self._WRAP_MARKER:
+                self._control[self._READ_SEQ] = read_seq + self._capacity - pos
+                continue
+            if size == 0 or pos + size > self._capacity:
+                # The header has been overwritten while reading it
+                self._overrun()
+                continue
+
+            dtype = np.dtype(dtype_char.decode())
+            shape = (shape0, shape1)[:ndim]
+            start = pos + self._HEADER.size
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            samples = self._data[start:start + nbytes].view(dtype).reshape(shape).copy()
+
+            # Make sure the producer has not started overwriting the chunk while copying it
+            if self._overwritten(read_seq):
+                self._overrun()
+                continue
+
+            self._control[self._READ_COUNT] += 1
+            self._control[self._READ_SEQ] = read_seq + size
+            chunk = DataChunk(samples, *header)
+            self._lost_total += chunk.lost
+            self._corrupted_total += chunk.corrupted
+            if self._carry_lost or self._carry_corrupted:
+                chunk.lost += self._carry_lost
+                chunk.corrupted += self._carry_corrupted
+                chunk.flags |= (DataChunk.FLAG_LOST if chunk.lost else 0) | \
+                    (DataChunk.FLAG_CORRUPTED if chunk.corrupted else 0)
+                self._carry_lost = self._carry_corrupted = 0
+            return chunk
+
+    def _overwritten(self, read_seq: int) -> bool:
+        return int(self._control[self._RESERVED_SEQ]) - read_seq > self._capacity
+
+    def _overrun(self):
+        """ Skips the overwritten chunks and continues with the oldest chunk the producer has not overwritten."""
+        self._overruns += 1
+        read_count = int(self._control[self._READ_COUNT])
+        write_count = int(self._control[self._WRITE_COUNT])
+        count, seq = write_count, int(self._control[self._WRITE_SEQ])
+        lost, corrupted = int(self._control[self._LOST_TOTAL]), int(self._control[self._CORRUPTED_TOTAL])
+        # Chunks starting before the limit are (being) overwritten
+        limit = int(self._control[self._RESERVED_SEQ]) - self._capacity
+        for candidate in range(write_count - 1, max(write_count - self._INDEX_LENGTH, read_count) - 1, -1):
+            start, lost_before, corrupted_before = (int(value) for value in self._index[candidate % self._INDEX_LENGTH])
+            if start < limit:
+                break
+            count, seq, lost, corrupted = candidate, start, lost_before, corrupted_before
+        if int(self._control[self._WRITE_COUNT]) - count > self._INDEX_LENGTH:
+            # The index entry has been reused meanwhile, continue with the next chunk the producer publishes
+            count, seq = int(self._control[self._WRITE_COUNT]), int(self._control[self._WRITE_SEQ])
+            lost, corrupted = int(self._control[self._LOST_TOTAL]), int(self._control[self._CORRUPTED_TOTAL])
+        self._lost_chunks += max(count - read_count, 0)
+        # Losses of the skipped chunks
+        self._carry_lost += max(lost - self._lost_total, 0)
+        self._carry_corrupted += max(corrupted - self._corrupted_total, 0)
+        self._lost_total = max(lost, self._lost_total)
+        self._corrupted_total = max(corrupted, self._corrupted_total)
+        self._control[self._READ_COUNT] = count
+        self._control[self._READ_SEQ] = seq
+
+    # ==================================================================================================================
+    # Cleanup
+    # ==================================================================================================================
+    def close(self):
+        self._control = None
+        self._index = None
+        self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    @classmethod
+    def _align(cls, value: int) -> int:
+        return (value + cls._ALIGNMENT - 1) // cls._ALIGNMENT * cls._ALIGNMENT
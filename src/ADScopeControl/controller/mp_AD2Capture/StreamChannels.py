@@ -0,0 +1,217 @@
+import queue
+from multiprocessing import Queue
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.SharedMemoryRingBuffer import SharedMemoryRingBuffer
+
+
+def _depth_of(transport) -> int:
+    """ Returns the number of queued chunks or -1, if the platform can not tell (multiprocessing.Queue on macOS)."""
+    try:
+        return transport.qsize()
+    except NotImplementedError:
+        return -1
+
+
+def _drain(transport, timeout: float, max_chunks: int) -> list:
+    """
+    Waits up to timeout for the first chunk and then takes all chunks that are available without waiting.
+    :return: List of chunks, empty if no chunk arrived within the timeout.
+    """
+    try:
+        chunks = [transport.get(block=True, timeout=timeout)]
+    except queue.Empty:
+        return []
+    while len(chunks) < max_chunks:
+        try:
+            chunks.append(transport.get(block=False))
+        except queue.Empty:
+            break
+    return chunks
+
+
+class DrainStatistics:
+    """ Counts the number of chunks taken from a channel per drain, to see how far the consumer falls behind."""
+
+    def __init__(self):
+        self.drains = 0
+        self.chunks = 0
+        self.max_chunks = 0
+        self.last_chunks = 0
+
+    def record(self, chunks: int):
+        self.drains += 1
+        self.chunks += chunks
+        self.last_chunks = chunks
+        if chunks > self.max_chunks:
+            self.max_chunks = chunks
+
+    def summary(self) -> dict:
+        """ Returns the number of drains, the mean, maximum and last number of chunks per drain."""
+        return {
+            'drains': self.drains,
+            'mean_chunks': self.chunks / self.drains if self.drains else 0.0,
+            'max_chunks': self.max_chunks,
+            'last_chunks': self.last_chunks,
+        }
+
+
+class CaptureChannel:
+    """
+    Lossless, bounded channel for the captured samples. The producer blocks while the channel is full instead of
+    dropping a chunk, so the memory stays bounded and the device buffer absorbs the back-pressure. Every time the
+    producer has to wait, the alarm callback is invoked, so a consumer that can not keep up is noticed before the
+    device starts losing samples.
+    """
+
+    def __init__(self, max_depth: int = 256, put_timeout: float = 0.1):
+        """
+        :param max_depth: Maximum number of chunks in the channel.
+        :param put_timeout: Time in seconds after which a blocked put raises the alarm.
+        """
+        self.max_depth = max(int(max_depth), 1)
+        self.put_timeout = put_timeout
+        self._queue = Queue(maxsize=self.max_depth)
+        # Producer statistics
+        self.full_events = 0
+        self.dropped = 0
+        self.dropped_samples = 0
+
+    @property
+    def depth(self) -> int:
+        """ Returns the number of chunks in the channel (-1 if unknown)."""
+        return _depth_of(self._queue)
+
+    def put(self, chunk: DataChunk, on_full=None, keep_waiting=None) -> bool:
+        """
+        Puts a chunk into the channel, waiting as long as the channel is full.
+        :param chunk: Chunk that is not modified afterwards.
+        :param on_full: Called with the channel every put_timeout seconds the channel stays full.
+        :param keep_waiting: Called after each timeout. If it returns False, the chunk is dropped and counted in
+            dropped and dropped_samples.
+        :return: True if the chunk has been put into the channel.
+        """
+        while True:
+            try:
+                self._queue.put(chunk, block=True, timeout=self.put_timeout)
+                return True
+            except queue.Full:
+                self.full_events += 1
+                if on_full is not None:
+                    on_full(self)
+                if keep_waiting is not None and not keep_waiting():
+                    self.dropped += 1
+                    self.dropped_samples += chunk.sample_count
+                    return False
+
+    def get(self, block: bool = True, timeout: float = None) -> DataChunk:
+        return self._queue.get(block=block, timeout=timeout)
+
+    def get_batch(self, timeout: float = 0.5, max_chunks: int = 1024) -> list:
+        """ Waits up to timeout for a chunk and returns it together with all chunks already waiting."""
+        return _drain(self._queue, timeout, max_chunks)
+
+    def empty(self) -> bool:
+        return self._queue.empty()
+
+    def qsize(self) -> int:
+        return self.depth
+
+
+class PreviewChannel:
+    """
+    Lossy channel for the live preview. The producer never waits: if the preview falls behind, the oldest chunks
+    are dropped, so a slow plot neither blocks the capture process nor grows the memory. The samples the device
+    reported as lost or corrupted in a dropped chunk are carried over to the next shipped chunk, so the loss
+    accounting stays complete.
+    Uses either a bounded multiprocessing.Queue or the shared memory ring buffer, which drops the oldest data
+    by itself.
+    """
+
+    def __init__(self, transport: str = "queue", max_depth: int = 32, buffer_size: int = 64 * 1024 * 1024,
+                 drop_timeout: float = 0.01):
+        """
+        :param transport: "queue" or "shared_memory".
+        :param max_depth: Maximum number of chunks in the queue transport.
+        :param buffer_size: Size of the shared memory ring in bytes.
+        :param drop_timeout: Maximum time in seconds the producer waits for the oldest chunk of a full queue.
+        """
+        self.max_depth = max(int(max_depth), 1)
+        self.drop_timeout = drop_timeout
+        if transport == "shared_memory":
+            self._transport = SharedMemoryRingBuffer(buffer_size)
+        else:
+            self._transport = Queue(maxsize=self.max_depth)
+        # Producer statistics
+        self.dropped = 0
+        self._carry_lost = 0
+        self._carry_corrupted = 0
+
+    @property
+    def copies_on_put(self) -> bool:
+        """ Returns True, if put() copies the samples, so the caller can reuse its buffer right away."""
+        return isinstance(self._transport, SharedMemoryRingBuffer)
+
+    @property
+    def depth(self) -> int:
+        """ Returns the number of chunks in the channel (-1 if unknown)."""
+        return _depth_of(self._transport)
+
+    @property
+    def overruns(self) -> int:
+        """ Returns how often the consumer of the shared memory ring skipped chunks it has not read in time."""
+        return self._transport.overruns if isinstance(self._transport, SharedMemoryRingBuffer) else 0
+
+    @property
+    def lost_chunks(self) -> int:
+        """ Returns the number of chunks the consumer of the shared memory ring skipped as they were overwritten."""
+        return self._transport.lost_chunks if isinstance(self._transport, SharedMemoryRingBuffer) else 0
+
+    def put(self, chunk: DataChunk):
+        """ Puts a chunk into the channel. Drops the oldest chunk if the channel is full."""
+        if self._carry_lost or self._carry_corrupted:
+            lost, corrupted = chunk.lost + self._carry_lost, chunk.corrupted + self._carry_corrupted
+            chunk = DataChunk(chunk.samples, chunk.first_sample_index, lost, corrupted, chunk.timestamp_ns,
+                              chunk.channel_mask, chunk.flags | (DataChunk.FLAG_LOST if lost else 0) |
+                              (DataChunk.FLAG_CORRUPTED if corrupted else 0), chunk.trigger_index)
+            self._carry_lost = self._carry_corrupted = 0
+        if isinstance(self._transport, SharedMemoryRingBuffer):
+            self._transport.put(chunk)
+            return
+        try:
+            self._transport.put_nowait(chunk)
+            return
+        except queue.Full:
+            pass
+        try:
+            # The queued chunks may still be on their way through the feeder thread of the queue, so wait briefly
+            # instead of dropping the new chunk
+            self._drop(self._transport.get(block=True, timeout=self.drop_timeout))
+        except queue.Empty:
+            pass
+        try:
+            self._transport.put_nowait(chunk)
+        except queue.Full:
+            self._drop(chunk)
+
+    def _drop(self, chunk: DataChunk):
+        self.dropped += 1
+        self._carry_lost += chunk.lost
+        self._carry_corrupted += chunk.corrupted
+
+    def get(self, block: bool = True, timeout: float = None) -> DataChunk:
+        return self._transport.get(block=block, timeout=timeout)
+
+    def get_batch(self, timeout: float = 0.5, max_chunks: int = 1024) -> list:
+        """ Waits up to timeout for a chunk and returns it together with all chunks already waiting."""
+        return _drain(self._transport, timeout, max_chunks)
+
+    def empty(self) -> bool:
+        return self._transport.empty()
+
+    def qsize(self) -> int:
+        return self.depth
+
+    def close(self):
+        if isinstance(self._transport, SharedMemoryRingBuffer):
+            self._transport.close()
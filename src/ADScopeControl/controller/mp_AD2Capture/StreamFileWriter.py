@@ -0,0 +1,146 @@
+import json
+import struct
+import time
+from pathlib import Path
+
+import numpy as np
+from numpy import ndarray
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+
+
+class StreamFileWriter:
+    """
+    Writes the samples of a recording directly from the capture process to a binary file.
+
+    File layout:
+        - Header (HEADER_SIZE bytes): magic, length of the JSON metadata and the JSON metadata (sample rate,
+          channels, sample type, conversion to volts, number of samples, position of the gap index)
+        - Data: the samples as (n_samples x n_channels) array, so the file can be opened with numpy.memmap
+        - Gap index: (n_gaps x 3) int64 array with the columns row, missing samples and corrupted samples
+
+    The file is preallocated in large steps and truncated to its final size when it is closed. The header is
+    rewritten periodically, so an interrupted recording can still be read up to the last header update.
+    """
+    MAGIC = b"ADSCOPE1"
+    HEADER_SIZE = 4096
+    _PREFIX = struct.Struct("<8sI")
+
+    def __init__(self, path: str | Path, sample_rate: float, channels: list, dtype=np.float64,
+                 scaling: dict = None, preallocation: int = 64 * 1024 * 1024, header_interval: float = 1.0):
+        """
+        :param path: Path of the file. Missing directories are created.
+        :param sample_rate: Sample rate in Hz.
+        :param channels: Analog in channels of the columns.
+        :param dtype: Sample type.
+        :param scaling: Conversion of raw samples to volts as {channel: (scale, offset)}.
+        :param preallocation: Number of bytes the file grows by, if it is full.
+        :param header_interval: Interval in seconds between two header updates.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w+b')
+
+        self._metadata = {
+            'sample_rate': float(sample_rate),
+            'channels': [int(channel) for channel in channels],
+            'dtype': np.dtype(dtype).str,
+            'scaling': {str(channel): list(value) for channel, value in (scaling or {}).items()},
+            'created': time.time(),
+        }
+        self._row_bytes = len(channels) * np.dtype(dtype).itemsize
+        self._preallocation = max(int(preallocation), self._row_bytes)
+        self._allocated = 0
+
+        self._samples = 0
+        self._first_sample_index: int = None
+        self._next_sample_index: int = None
+        self._gaps: list = []
+
+        self._header_interval = header_interval
+        self._header_written = 0
+        self._reserve(self._preallocation)
+        self._write_header()
+
+    @property
+    def samples(self) -> int:
+        """ Returns the number of written samples per channel."""
+        return self._samples
+
+    def _reserve(self, nbytes: int):
+        if nbytes <= self._allocated:
+            return
+        while self._allocated < nbytes:
+            self._allocated += self._preallocation
+        self._file.truncate(self.HEADER_SIZE + self._allocated)
+
+    def _write_header(self, gap_offset: int = 0):
+        metadata = dict(self._metadata, data_offset=self.HEADER_SIZE, samples=self._samples,
+                        first_sample_index=self._first_sample_index or 0, gap_offset=gap_offset,
+                        gap_count=len(self._gaps) if gap_offset else 0)
+        encoded = json.dumps(metadata).encode()
+        if self._PREFIX.size + len(encoded) > self.HEADER_SIZE:
+            raise ValueError("The metadata does not fit into the file header.")
+        self._file.seek(0)
+        self._file.write(self._PREFIX.pack(self.MAGIC, len(encoded)) + encoded)
+        self._header_written = time.monotonic()
+
+    def write(self, chunk: DataChunk):
+        """
+        Appends the samples of a chunk. Samples missing since the previous chunk are recorded in the gap index.
+        :param chunk: Chunk with (n_channels x n_samples) samples.
+        """
+        if self._next_sample_index is None:
+            self._first_sample_index = chunk.first_sample_index
+            missing = 0
+        else:
+            missing = max(chunk.first_sample_index - self._next_sample_index, 0)
+        if missing or chunk.corrupted:
+            self._gaps.append((self._samples, missing, chunk.corrupted))
+        self._next_sample_index = chunk.next_sample_index
+
+        rows = np.ascontiguousarray(np.atleast_2d(chunk.samples).T)
+        offset = self._samples * self._row_bytes
+        self._reserve(offset + rows.nbytes)
+        self._file.seek(self.HEADER_SIZE + offset)
+        self._file.write(rows.data)
+        self._samples += len(rows)
+
+        if time.monotonic() - self._header_written >= self._header_interval:
+            self._write_header()
+            # Hand the samples and the header to the OS, so they survive a crash of the capture process
+            self._file.flush()
+
+    def close(self):
+        """ Writes the gap index and the final header and truncates the file to its size."""
+        if self._file.closed:
+            return
+        gap_offset = self.HEADER_SIZE + self._samples * self._row_bytes
+        gaps = np.array(self._gaps, dtype=np.int64).reshape(-1, 3)
+        self._file.seek(gap_offset)
+        self._file.write(gaps.tobytes())
+        self._file.truncate(gap_offset + gaps.nbytes)
+        self._write_header(gap_offset)
+        self._file.close()
+
+    @classmethod
+    def load(cls, path: str | Path) -> tuple:
+        """
+        Opens a file written by the StreamFileWriter without reading the samples into memory.
+        :param path: Path of the file.
+        :return: The tuple (metadata, samples, gaps) with the samples as read-only (n_samples x n_channels) memmap.
+        """
+        with open(path, 'rb') as f:
+            magic, length = cls._PREFIX.unpack(f.read(cls._PREFIX.size))
+            if magic != cls.MAGIC:
+                raise ValueError(f"{path} is not a stream file.")
+            metadata = json.loads(f.read(length))
+            gaps = np.empty((0, 3), dtype=np.int64)
+            if metadata['gap_count']:
+                f.seek(metadata['gap_offset'])
+                gaps = np.frombuffer(f.read(metadata['gap_count'] * 3 * 8), dtype=np.int64).reshape(-1, 3)
+        shape = (metadata['samples'], len(metadata['channels']))
+        samples: ndarray = np.memmap(path, dtype=np.dtype(metadata['dtype']), mode='r',
+                                     offset=metadata['data_offset'], shape=shape) \
+            if metadata['samples'] else np.empty(shape, dtype=np.dtype(metadata['dtype']))
+        return metadata, samples, gaps
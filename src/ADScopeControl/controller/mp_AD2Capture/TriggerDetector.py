@@ -0,0 +1,168 @@
+import numpy as np
+from numpy import ndarray
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+
+
+class TriggerDetector:
+    """
+    Finds edge trigger events in the continuous sample stream of the capture process and cuts a window of
+    pre- and post-trigger samples around each event. Only the windows are shipped to the controller.
+    The detector keeps the last pre-trigger samples (and the samples of windows that are not complete yet) between
+    two reads in a preallocated ring, so a window can span several reads. The ring is only unrolled into a window
+    when a trigger window is complete. A new trigger is only accepted after the previous window ended.
+    """
+
+    def __init__(self, level: float, hysteresis: float = 0.0, rising: bool = True, row: int = 0,
+                 pre_samples: int = 1000, post_samples: int = 1000, channel_mask: int = 1):
+        """
+        :param level: Trigger level in sample units (volts or raw ADC codes).
+        :param hysteresis: The signal has to cross level -/+ hysteresis before the next edge is accepted.
+        :param rising: True for rising edges, False for falling edges.
+        :param row: Row of the trigger channel in the read samples.
+        :param pre_samples: Number of samples before the trigger event.
+        :param post_samples: Number of samples starting at the trigger event.
+        :param channel_mask: Channel mask written to the chunk headers.
+        """
+        self.level = level
+        self.hysteresis = abs(hysteresis)
+        self.rising = rising
+        self.row = row
+        self.pre_samples = max(int(pre_samples), 0)
+        self.post_samples = max(int(post_samples), 1)
+        self.channel_mask = channel_mask
+
+        # Ring of (n_channels x capacity) samples, the sample with the absolute index i is stored in column
+        # i % capacity. Holds the samples from _history_index up to _history_end.
+        self._history: ndarray = None
+        # Absolute sample index of the first sample of the history
+        self._history_index = 0
+        # Absolute sample index after the newest sample of the history, None if the history has been dropped
+        self._history_end: int = None
+        # Pending windows as (trigger index, start index, end index)
+        self._pending: list = []
+        self._holdoff_until = 0
+        # The signal was on the arming side of the hysteresis before the current read
+        self._armed = False
+        # Lost and corrupted samples since the last shipped window
+        self._lost = 0
+        self._corrupted = 0
+
+        self.triggers = 0
+        self.windows_dropped = 0
+
+    def _detect(self, signal: ndarray) -> ndarray:
+        """ Returns the positions of the trigger edges in the signal."""
+        if self.rising:
+            arm = signal < self.level - self.hysteresis
+            fire = signal >= self.level
+        else:
+            arm = signal > self.level + self.hysteresis
+            fire = signal <= self.level
+        events = np.flatnonzero(arm | fire)
+        if len(events) == 0:
+            return events
+        fired = fire[events]
+        # An event fires if the previous event armed the detector
+        previous_armed = np.empty_like(fired)
+        previous_armed[0] = self._armed
+        previous_armed[1:] = ~fired[:-1]
+        self._armed = not fired[-1]
+        return events[fired & previous_armed]
+
+    def reset(self):
+        """ Drops the history and the pending windows, e.g. after samples have been lost."""
+        self.windows_dropped += len(self._pending)
+        self._history_end = None
+        self._pending = []
+        self._armed = False
+
+    def process(self, samples: ndarray, first_sample_index: int, lost: int = 0, corrupted: int = 0,
+                timestamp_ns: int = 0) -> list:
+        """
+        Processes a read and returns the completed windows.
+        :param samples: (n_channels x n_samples) samples. Not referenced after the call returns.
+        :param first_sample_index: Absolute index of the first sample.
+        :param lost: Number of samples lost directly before this read.
+        :param corrupted: Number of samples in this read that could be corrupt.
+        :param timestamp_ns: Host monotonic time at which the read has been fetched from the device.
+        :return: List of DataChunks, one per completed window.
+        """
+        self._lost += lost
+        self._corrupted += corrupted
+        if lost or self._history_end is None:
+            # A window cannot span lost samples
+            if lost:
+                self.reset()
+            self._history_index = self._history_end = first_sample_index
+
+        for position in self._detect(samples[self.row]):
+            trigger_index = first_sample_index + int(position)
+            if trigger_index < self._holdoff_until:
+                continue
+            start = max(trigger_index - self.pre_samples, self._history_index)
+            end = trigger_index + self.post_samples
+            self._pending.append((trigger_index, start, end))
+            self._holdoff_until = end
+            self.triggers += 1
+
+        self._write(samples, first_sample_index)
+        data_end = self._history_end
+
+        windows = []
+        while self._pending and self._pending[0][2] <= data_end:
+            trigger_index, start, end = self._pending.pop(0)
+            window = self._unroll(start, end)
+            windows.append(DataChunk(window, start, self._lost, self._corrupted, timestamp_ns, self.channel_mask,
+                                     DataChunk.FLAG_TRIGGERED | (DataChunk.FLAG_LOST if self._lost else 0) |
+                                     (DataChunk.FLAG_CORRUPTED if self._corrupted else 0),
+                                     trigger_index))
+            self._lost = 0
+            self._corrupted = 0
+
+        # Keep the pre-trigger samples and the samples of the incomplete windows
+        keep_from = max(data_end - self.pre_samples, self._history_index)
+        if self._pending:
+            keep_from = min(keep_from, self._pending[0][1])
+        self._history_index = keep_from
+        return windows
+
+    def _write(self, samples: ndarray, first_sample_index: int):
+        """ Copies the samples into the ring, growing the ring if the history and the samples do not fit."""
+        required = first_sample_index + samples.shape[1] - self._history_index
+        dtype = samples.dtype if self._history is None else np.result_type(self._history, samples)
+        if (self._history is None or required > self._history.shape[1] or dtype != self._history.dtype or
+                self._history.shape[0] != samples.shape[0]):
+            capacity = max(2 * (self.pre_samples + self.post_samples), 1)
+            while capacity < required:
+                capacity *= 2
+            history = None
+            if self._history is not None and self._history.shape[0] == samples.shape[0]:
+                history = self._unroll(self._history_index, first_sample_index)
+            else:
+                # Other channels, the previous samples cannot be part of a window
+                self._history_index = first_sample_index
+            self._history = np.empty((samples.shape[0], capacity), dtype=dtype)
+            if history is not None:
+                self._put(history, self._history_index)
+        self._put(samples, first_sample_index)
+        self._history_end = first_sample_index + samples.shape[1]
+
+    def _put(self, samples: ndarray, first_sample_index: int):
+        capacity = self._history.shape[1]
+        pos = first_sample_index % capacity
+        n = samples.shape[1]
+        first = min(n, capacity - pos)
+        self._history[:, pos:pos + first] = samples[:, :first]
+        self._history[:, :n - first] = samples[:, first:]
+
+    def _unroll(self, start: int, end: int) -> ndarray:
+        """ Returns a copy of the samples from the absolute index start up to end in order."""
+        capacity = self._history.shape[1]
+        pos = start % capacity
+        n = end - start
+        first = min(n, capacity - pos)
+        window = np.empty((self._history.shape[0], n), dtype=self._history.dtype)
+        window[:, :first] = self._history[:, pos:pos + first]
+        window[:, first:] = self._history[:, :n - first]
+        return window
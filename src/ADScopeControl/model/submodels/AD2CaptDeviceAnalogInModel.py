@@ -49,6 +49,16 @@ class AD2CaptDeviceAnalogInModel:
         self.signals.selected_ain_channel_changed.emit(self.selected_ain_channel)
 
 
+    @property
+    def ain_filter(self) -> int:
+        """ Returns the acquisition filter of the analog in channels (filterDecimate, filterAverage, ...)."""
+        return self.config.ain_filter.get()
+
+    @property
+    def simultaneous_ain_channels(self) -> list:
+        """ Returns the analog in channels captured simultaneously. If empty, only the selected channel is used."""
+        return list(self.config.simultaneous_ain_channels.get())
+
     @property
     def ain_channels(self) -> list:
         return self._ain_channels
@@ -76,6 +86,26 @@ class AD2CaptDeviceAnalogInModel:
         self._ain_bits = value
         self.signals.ain_bits_changed.emit(self.ain_bits)
 
+    @property
+    def ain_channel_range(self) -> tuple:
+        """ Returns the minimum and maximum range (peak to peak) in V and the number of steps."""
+        return self._ain_channel_range
+
+    @ain_channel_range.setter
+    def ain_channel_range(self, value: tuple):
+        self._ain_channel_range = value
+        self.signals.ain_channel_range_changed.emit(self.ain_channel_range)
+
+    @property
+    def ain_offset(self) -> tuple:
+        """ Returns the minimum and maximum offset in V and the number of steps."""
+        return self._ain_offset
+
+    @ain_offset.setter
+    def ain_offset(self, value: tuple):
+        self._ain_offset = value
+        self.signals.ain_offset_changed.emit(self.ain_offset)
+
     @property
     def ain_device_state(self) -> int:
         return self._ain_device_state
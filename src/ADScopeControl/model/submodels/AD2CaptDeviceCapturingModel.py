@@ -1,3 +1,10 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
 import pandas as pd
 from numpy import ndarray
 import numpy as np
@@ -17,10 +24,18 @@ class AD2CaptDeviceCapturingSignals(QObject):
     streaming_rate_changed = Signal(int)
     selected_ain_channel_changed = Signal(int)
     streaming_history_changed = Signal(int)
+    poll_interval_changed = Signal(float)
+    settling_result_changed = Signal(dict)
+    capture_statistics_changed = Signal(dict)
+    channel_statistics_changed = Signal(dict)
+    ingest_statistics_changed = Signal(dict)
+    capture_channel_alarms_changed = Signal(int)
+    recording_file_changed = Signal(str)
     # Acquired Signal Information
     recording_time_changed = Signal(float)
     samples_lost_changed = Signal(int)
     samples_corrupted_changed = Signal(int)
+    samples_received_changed = Signal(int)
     # Actually for the worker, these are the samples that have not been consumed yet by the UI thread.
     unconsumed_stream_samples_changed = Signal(int)
     unconsumed_capture_samples_changed = Signal(int)
@@ -35,38 +50,376 @@ class AD2CaptDeviceCapturingSignals(QObject):
 
 
 def downsample_data(data: ndarray, num_points: int):
-    if num_points >= data.shape[0]:
+    """
+    Reduces the data to at most num_points rows for plotting. The rows are split into num_points // 2 buckets of
+    consecutive samples and every bucket is represented by its minimum followed by its maximum, so spikes between
+    the plotted points are not lost.
+    :param data: (n_samples x n_channels) or one dimensional array.
+    :param num_points: Maximum number of rows, e.g. twice the width of the plot in pixels. None keeps all rows,
+        a single row is the newest sample.
+    """
+    if num_points is None or num_points >= data.shape[0]:
         return data
+    if num_points < 2:
+        # No room for a min/max pair, keep the newest sample (or none)
+        return data[data.shape[0] - max(num_points, 0):]
+    buckets = num_points // 2
+    starts = np.arange(buckets, dtype=np.int64) * data.shape[0] // buckets
+    envelope = np.empty((2 * buckets,) + data.shape[1:], dtype=data.dtype)
+    envelope[0::2] = np.minimum.reduceat(data, starts, axis=0)
+    envelope[1::2] = np.maximum.reduceat(data, starts, axis=0)
+    return envelope
+
+# Chunk header as kept by a recording: row of the first sample and the header fields of the DataChunk
+CHUNK_HEADER_DTYPE = np.dtype([
+    ('row', np.int64), ('first_sample_index', np.int64), ('sample_count', np.int64), ('timestamp_ns', np.int64),
+    ('channel_mask', np.uint32), ('flags', np.uint32), ('trigger_index', np.int64)
+])
 
-    interval = len(data) // (num_points - 1)
-    downsampled_data = data[::interval]
-    downsampled_data = np.r_[downsampled_data, data[-1]]
-    return downsampled_data
 
 class Recording:
+    # Number of rows allocated for the first samples of a recording
+    MIN_CAPACITY = 4096
+    # Number of rows processed at once when a spilled recording is exported
+    SPILL_BLOCK = 1024 * 1024
+    # Number of rows a spill file grows by. Past the memory budget the file grows linearly instead of doubling,
+    # so it never holds more than SPILL_GROWTH unused rows.
+    SPILL_GROWTH = 16 * SPILL_BLOCK
+    # Files derived from a spill file by the export, deleted together with it
+    SPILL_DERIVED = ('volts', 'index', 'time_s', 'time_ms')
+
     def __init__(
             self, array: ndarray = None, 
             show_number: int = None
             ):
-        self.array = array if array is not None else np.empty((0,))
+        # The samples are stored column-wise (n_samples x n_channels) in a buffer with spare capacity. Only the
+        # first _length rows are valid. The capacity doubles when the buffer is full, so appending is amortized
+        # O(chunk) instead of copying the whole recording for every chunk.
+        self._buffer: ndarray = np.empty((0, 1))
+        self._length: int = 0
+        # The recording is appended to by an ingest thread and read or cleared by the GUI thread. Reentrant, so the
+        # locked methods can call each other.
+        self._lock = threading.RLock()
+        if array is not None:
+            self.array = self._columns(array)
         self.show_number = show_number
+        # The analog in channels of the columns
+        self.channels: list = [0]
+        # Conversion of raw ADC codes to volts (volts = raw * scale + offset), one value per channel.
+        # Not applied to float samples.
+        self.scale: ndarray | float = 1.0
+        self.offset: ndarray | float = 0.0
+        # Absolute sample index of the first row and the index expected for the next appended samples
+        self.first_sample_index: int = None
+        self._next_sample_index: int = None
+        # Gap index: one (row, missing samples, corrupted samples) entry for every position where the
+        # recording is not contiguous or possibly corrupt
+        self._gaps: list = []
+        # Headers of the appended chunks
+        self._headers: list = []
+        # Number of bytes the samples may occupy in memory (0 for no limit). Beyond it, the recording continues in
+        # a memory-mapped file in the spill directory (the temporary directory if None).
+        self.memory_budget: int = 0
+        self.spill_directory: Path = None
+        # Keep the file on clear() as the artifact of the recording, instead of deleting it
+        self.keep_spill_file: bool = False
+        self._spill_path: Path = None
+
+    @staticmethod
+    def _columns(array: ndarray) -> ndarray:
+        """ Converts a (n_channels x n_samples) chunk or a 1-D array into columns (n_samples x n_channels)."""
+        array = np.asarray(array)
+        if array.ndim == 1:
+            return array[:, np.newaxis]
+        return array.T
+
+    @property
+    def array(self) -> ndarray:
+        """ Returns the recorded samples (n_samples x n_channels) as view into the buffer, without copying."""
+        with self._lock:
+            return self._buffer[:self._length]
+
+    @array.setter
+    def array(self, value: ndarray):
+        with self._lock:
+            self._buffer = np.asarray(value)
+            self._length = len(self._buffer)
+
+    @property
+    def capacity(self) -> int:
+        """ Returns the number of rows the buffer can hold before it has to grow."""
+        return len(self._buffer)
+
+    @property
+    def spill_path(self) -> Path | None:
+        """ Returns the file the recording continues in after exceeding the memory budget, or None."""
+        return self._spill_path
+
+    def _create_spill_file(self) -> Path:
+        directory = Path(self.spill_directory) if self.spill_directory else Path(tempfile.gettempdir())
+        directory.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(prefix=f"capture_{datetime.now().strftime('%Y%m%d_%H%M%S')}_",
+                                    suffix=".spill", dir=directory)
+        os.close(fd)
+        return Path(path)
+
+    def _release_spill_file(self, path: Path, metadata: dict = None):
+        """
+        Deletes a spill file and the files derived from it by the export. A kept file is instead truncated to the
+        recorded rows and the metadata needed to open it with numpy.memmap is written next to it.
+        """
+        try:
+            for suffix in self.SPILL_DERIVED:
+                derived = path.with_name(f"{path.name}.{suffix}")
+                if derived.exists():
+                    os.remove(derived)
+            if metadata is None:
+                os.remove(path)
+                return
+            with open(path, 'r+b') as f:
+                f.truncate(metadata['rows'] * np.dtype(metadata['dtype']).itemsize * int(np.prod(metadata['columns'])))
+        except OSError:
+            # Still mapped by a data frame or a snapshot (Windows). A kept file still tells its valid rows.
+            pass
+        if metadata is not None:
+            with open(path.with_name(f"{path.name}.json"), 'w') as f:
+                json.dump(metadata, f, indent=2)
+
+    def _reserve(self, columns: list):
+        """
+        Makes room for the columns that are going to be appended. In memory the capacity is at least doubled, so a
+        recording of n samples is copied less than twice in total. A spill file grows in place by SPILL_GROWTH rows.
+        :param columns: (n_samples x n_channels) arrays, defining the number of rows, the dtype and the channels.
+        """
+        # Keep the dtype of the samples (e.g. raw int16 codes)
+        dtype = np.result_type(*columns) if self._length == 0 else np.result_type(self._buffer, *columns)
+        shape = columns[0].shape[1:]
+        required = self._length + sum(len(column) for column in columns)
+        same_layout = dtype == self._buffer.dtype and self._buffer.shape[1:] == shape
+        if required <= len(self._buffer) and same_layout:
+            return
+        capacity = max(required, 2 * len(self._buffer), self.MIN_CAPACITY)
+        spill = self._spill_path is not None or \
+            (self.memory_budget and capacity * dtype.itemsize * int(np.prod(shape)) > self.memory_budget)
+        if spill:
+            capacity = max(required, self._length + self.SPILL_GROWTH)
+        if self._spill_path is not None and same_layout:
+            # numpy extends the file, the recorded rows stay in place
+            self._buffer = np.memmap(self._spill_path, dtype=dtype, mode='r+', shape=(capacity,) + shape)
+            return
+        spill_path = None
+        if spill:
+            spill_path = self._create_spill_file()
+            buffer = np.memmap(spill_path, dtype=dtype, mode='w+', shape=(capacity,) + shape)
+        else:
+            buffer = np.empty((capacity,) + shape, dtype=dtype)
+        if self._length:
+            buffer[:self._length] = self._buffer[:self._length]
+        previous_spill_path, self._spill_path = self._spill_path, spill_path
+        self._buffer = buffer
+        if previous_spill_path is not None:
+            self._release_spill_file(previous_spill_path)
+
+    def _write(self, columns: ndarray):
+        self._buffer[self._length:self._length + len(columns)] = columns
+        self._length += len(columns)
+
+    def append(self, array: ndarray, first_sample_index: int = None, corrupted: int = 0):
+        """
+        Appends samples to the recording.
+        :param array: (n_channels x n_samples) chunk or one dimensional array.
+        :param first_sample_index: Absolute index of the first sample. Used to detect missing samples.
+        :param corrupted: Number of samples at the beginning of the array that could be corrupt.
+        """
+        with self._lock:
+            columns = self._columns(array)
+            if first_sample_index is not None:
+                self._index_gaps(first_sample_index, corrupted, len(columns))
+            self._reserve([columns])
+            self._write(columns)
+            return self
+
+    def append_chunk(self, chunk):
+        """
+        Appends the samples of a chunk and keeps its header.
+        :param chunk: DataChunk received from the capture process.
+        """
+        return self.append_chunks([chunk])
+
+    def append_chunks(self, chunks: list):
+        """
+        Appends the samples of several chunks and keeps their headers. The buffer grows at most once per call.
+        :param chunks: DataChunks received from the capture process, in order.
+        """
+        with self._lock:
+            if not chunks:
+                return self
+            row = len(self)
+            for chunk in chunks:
+                self._headers.append((row, chunk.first_sample_index, chunk.sample_count, chunk.timestamp_ns,
+                                      chunk.channel_mask, chunk.flags, chunk.trigger_index))
+                self._index_gaps(chunk.first_sample_index, chunk.corrupted, chunk.sample_count, row)
+                row += chunk.sample_count
+            columns = [self._columns(chunk.samples) for chunk in chunks]
+            self._reserve(columns)
+            for column in columns:
+                self._write(column)
+            return self
+
+    def _index_gaps(self, first_sample_index: int, corrupted: int, n_samples: int, row: int = None):
+        if self._next_sample_index is None:
+            self.first_sample_index = first_sample_index
+            missing = 0
+        else:
+            missing = max(first_sample_index - self._next_sample_index, 0)
+        if missing or corrupted:
+            self._gaps.append((len(self) if row is None else row, missing, corrupted))
+        self._next_sample_index = first_sample_index + n_samples
+
+    @property
+    def gaps(self) -> ndarray:
+        """ Returns the gap index as (n_gaps x 3) array with the columns row, missing and corrupted samples."""
+        return np.array(self._gaps, dtype=np.int64).reshape(-1, 3)
+
+    @property
+    def headers(self) -> ndarray:
+        """ Returns the headers of the appended chunks as structured array."""
+        return np.array(self._headers, dtype=CHUNK_HEADER_DTYPE)
+
+    def time_axis(self, sample_rate: float) -> ndarray:
+        """
+        Returns the time of every row in seconds since the first sample of the recording. Missing samples are
+        skipped on the time axis instead of shifting the following samples.
+        :param sample_rate: Sample rate in Hz.
+        """
+        time_axis = self._column('time_s', np.float64)
+        for start, indices in self._sample_index_blocks():
+            time_axis[start:start + len(indices)] = (indices - (self.first_sample_index or 0)) / sample_rate
+        return time_axis
+
+    def host_timestamps_ns(self, sample_rate: float) -> ndarray:
+        """
+        Returns the host monotonic time of every row in ns, extrapolated backwards from the timestamp of the chunk
+        the row belongs to. Allows aligning the recording with external events.
+        :param sample_rate: Sample rate in Hz.
+        """
+        headers = self.headers
+        if len(headers) == 0:
+            return np.zeros(len(self), dtype=np.int64)
+        indices = self.sample_indices()
+        # Absolute sample index and timestamp of the last sample of each chunk, repeated for its rows
+        counts = np.diff(np.append(headers['row'], len(self)))
+        last_index = np.repeat(headers['first_sample_index'] + headers['sample_count'] - 1, counts)
+        timestamps = np.repeat(headers['timestamp_ns'], counts)
+        return timestamps - ((last_index - indices) * 1e9 / sample_rate).astype(np.int64)
+
+    def sample_indices(self) -> ndarray:
+        """ Returns the absolute sample index of every row, taking the missing samples into account."""
+        indices = self._column('index', np.int64)
+        for start, block in self._sample_index_blocks():
+            indices[start:start + len(block)] = block
+        return indices
+
+    def _sample_index_blocks(self):
+        """ Yields (first row, absolute sample indices) for blocks of SPILL_BLOCK rows."""
+        gaps = self.gaps
+        # Samples missing before each row, looked up from the gaps at or before the row
+        missing = np.concatenate(([0], np.cumsum(gaps[:, 1])))
+        for start in range(0, len(self), self.SPILL_BLOCK):
+            rows = np.arange(start, min(start + self.SPILL_BLOCK, len(self)), dtype=np.int64)
+            yield start, rows + (self.first_sample_index or 0) + \
+                missing[np.searchsorted(gaps[:, 0], rows, side='right')]
+
+    def _column(self, suffix: str, dtype) -> ndarray:
+        """ Returns an uninitialized column for every row, backed by a file next to the spill file if spilled."""
+        if self._spill_path is None:
+            return np.empty(len(self), dtype=dtype)
+        return np.memmap(self._spill_path.with_name(f"{self._spill_path.name}.{suffix}"), dtype=dtype, mode='w+',
+                         shape=(len(self),))
 
-    def append(self, array: ndarray):
-        self.array = np.append(self.array, array)
-        return self
-    
     def clear(self):
-        self.array = np.empty((0,))
-        return self
+        with self._lock:
+            # Releases the buffer, a new recording starts with the minimum capacity in memory
+            spill_path, metadata = self._spill_path, None
+            if spill_path is not None:
+                self._buffer.flush()
+                if self.keep_spill_file:
+                    metadata = {
+                        'dtype': self._buffer.dtype.str, 'rows': self._length,
+                        'columns': list(self._buffer.shape[1:]), 'channels': list(self.channels),
+                        'scale': np.atleast_1d(self.scale).tolist(), 'offset': np.atleast_1d(self.offset).tolist(),
+                        'first_sample_index': self.first_sample_index or 0, 'gaps': self.gaps.tolist(),
+                    }
+                self._spill_path = None
+            self.array = np.empty((0, 1))
+            if spill_path is not None:
+                self._release_spill_file(spill_path, metadata)
+            self.first_sample_index = None
+            self._next_sample_index = None
+            self._gaps = []
+            self._headers = []
+            return self
     
     def __len__(self):
-        return len(self.array)
+        return self._length
+
+    def column_names(self, name: str = "Amplitude") -> list:
+        if len(self.channels) == 1:
+            return [name]
+        return [f"{name} (CH{channel})" for channel in self.channels]
+
+    def to_volts(self, array: ndarray) -> ndarray:
+        if np.issubdtype(array.dtype, np.integer):
+            return array * self.scale + self.offset
+        return array
     
+    def _volts(self) -> ndarray:
+        array = self.array
+        if self._spill_path is not None and np.issubdtype(array.dtype, np.integer):
+            # Convert block-wise into a second file instead of building the volts in memory
+            volts = np.memmap(self._spill_path.with_name(f"{self._spill_path.name}.volts"), dtype=np.float64,
+                              mode='w+', shape=array.shape)
+            for start in range(0, len(array), self.SPILL_BLOCK):
+                volts[start:start + self.SPILL_BLOCK] = self.to_volts(array[start:start + self.SPILL_BLOCK])
+            return volts
+        return self.to_volts(array)
+
     def to_frame(self, *args, **kwargs) -> pd.DataFrame:
-        return pd.DataFrame(self.array, *args, **kwargs)
+        with self._lock:
+            # Without copying, a spilled recording stays backed by its file
+            return pd.DataFrame(self._volts(), *args, copy=False, **kwargs)
+
+    def export_frame(self, sample_rate: float, name: str = "Amplitude") -> pd.DataFrame:
+        """
+        Returns the samples in volts together with the columns 'sample index', 'time (s)' and 'time (ms)'. The
+        columns are computed block-wise in a single pass and, if the recording is spilled, into files next to the
+        spill file. The frame is built from them without copying.
+        :param sample_rate: Sample rate in Hz.
+        :param name: Name of the sample columns.
+        """
+        with self._lock:
+            volts = self._volts()
+            columns = {column: volts[:, it] for it, column in enumerate(self.column_names(name))}
+            indices = self._column('index', np.int64)
+            time_s = self._column('time_s', np.float64)
+            time_ms = self._column('time_ms', np.float64)
+            for start, block in self._sample_index_blocks():
+                stop = start + len(block)
+                indices[start:stop] = block
+                np.divide(block - (self.first_sample_index or 0), sample_rate, out=time_s[start:stop])
+                np.multiply(time_s[start:stop], 1000, out=time_ms[start:stop])
+            columns.update({'sample index': indices, 'time (s)': time_s, 'time (ms)': time_ms})
+            return pd.DataFrame(columns, copy=False)
     
-    def downsample(self):
-        return downsample_data(self.array, self.show_number)
+    def downsample(self, num_points: int = None):
+        """
+        Returns the min/max envelope of the samples in volts for plotting.
+        :param num_points: Maximum number of rows, e.g. twice the width of the plot in pixels. Defaults to
+            show_number.
+        """
+        with self._lock:
+            # The envelope is taken from the raw codes, so only the plotted rows are converted
+            return self.to_volts(downsample_data(self.array, num_points or self.show_number))
     
 # class SignalingRecording(Recording):
 #     plot_signal = Signal(bool)
@@ -90,14 +443,100 @@ class Recording:
 #         return self
     
 class Stream(Recording):
+    """
+    Window of the newest samples for the live plot. The samples are kept in a preallocated circular buffer of
+    max_number rows, so appending costs O(chunk) and the memory stays constant. Without max_number the stream grows
+    like a recording. The stream is appended to by the ingest thread and read by the GUI thread, a lock keeps the
+    snapshots consistent.
+    """
+
     def __init__(self, *args, max_number: int = None, **kwargs):
+        # Position in the buffer the next sample is written to, once the buffer is full
+        self._head: int = 0
+        # Only None is unbounded. A window rounded down to 0 rows (low rate, short history) keeps the newest row.
+        self.max_number = max(int(max_number), 1) if max_number is not None else None
         super().__init__(*args, **kwargs)
-        self.max_number = max_number
 
-    def append(self, array: ndarray):
-        new_array = np.append(self.array, array)
-        if self.max_number:
-            self.array = new_array[-self.max_number:]
+    @property
+    def array(self) -> ndarray:
+        """ Returns the samples from the oldest to the newest as a contiguous snapshot."""
+        with self._lock:
+            if self._head == 0:
+                return self._buffer[:self._length].copy()
+            return np.concatenate((self._buffer[self._head:self._length], self._buffer[:self._head]))
+
+    @array.setter
+    def array(self, value: ndarray):
+        with self._lock:
+            Recording.array.fset(self, value)
+            self._head = 0
+            if self.max_number is not None and self._length > self.max_number:
+                self._rebuild(self.max_number)
+
+    def segments(self) -> tuple:
+        """
+        Returns the samples as (older, newer) views into the buffer without copying. The views are only valid
+        until the next append, use array for a snapshot.
+        """
+        return self._buffer[self._head:self._length], self._buffer[:self._head]
+
+    def resize(self, max_number: int):
+        """
+        Changes the number of samples kept by the stream (e.g. if the streaming history or the sample rate
+        changed). The newest samples are preserved.
+        :param max_number: Number of rows of the window.
+        """
+        max_number = max(int(max_number), 1)
+        with self._lock:
+            if max_number != self.max_number:
+                self.max_number = max_number
+                self._rebuild(max_number)
+
+    def _rebuild(self, capacity: int, dtype=None):
+        """ Copies the newest samples in order into a new buffer of the given capacity."""
+        ordered = np.concatenate((self._buffer[self._head:self._length], self._buffer[:self._head]))
+        ordered = ordered[-capacity:]
+        buffer = np.empty((capacity,) + self._buffer.shape[1:], dtype=dtype or self._buffer.dtype)
+        buffer[:len(ordered)] = ordered
+        self._buffer = buffer
+        self._length = len(ordered)
+        self._head = self._length % capacity
+
+    def _write_ring(self, columns: ndarray):
+        capacity = self.max_number
+        if self._length == 0 or self._buffer.shape[1:] != columns.shape[1:]:
+            # First samples (or other channels): keep the dtype of the samples (e.g. raw int16 codes)
+            self._buffer = np.empty((capacity,) + columns.shape[1:], dtype=columns.dtype)
+            self._length = self._head = 0
+        elif len(self._buffer) != capacity or np.result_type(self._buffer, columns) != self._buffer.dtype:
+            # E.g. seeded with fewer rows than the window, the samples are kept
+            self._rebuild(capacity, np.result_type(self._buffer, columns))
+        columns = columns[-capacity:]
+        n = len(columns)
+        first = min(n, capacity - self._head)
+        self._buffer[self._head:self._head + first] = columns[:first]
+        self._buffer[:n - first] = columns[first:]
+        self._head = (self._head + n) % capacity
+        self._length = min(self._length + n, capacity)
+
+    def _append_columns(self, columns: ndarray):
+        if self.max_number is not None:
+            self._write_ring(columns)
+        else:
+            self._reserve([columns])
+            self._write(columns)
+
+    def append(self, array: ndarray, *args, **kwargs):
+        # The stream is only displayed, so it does not keep a gap index
+        with self._lock:
+            self._append_columns(self._columns(array))
+        return self
+
+    def append_chunks(self, chunks: list):
+        """ Appends the samples of several chunks, writing each chunk directly into the buffer."""
+        with self._lock:
+            for chunk in chunks:
+                self._append_columns(self._columns(chunk.samples))
         return self
 
 class AD2CaptDeviceCapturingModel:
@@ -107,12 +546,32 @@ class AD2CaptDeviceCapturingModel:
 
         # Acquired Signal Information
         # The number of recorded samples
-        self.stream = Stream(show_number=10000, max_number=1000)
+        self.stream = Stream(show_number=10000, max_number=self.streaming_deque_length)
         self.capture = Recording(show_number=10000)
 
         self._recorded_samples_df: pd.DataFrame = None
+        # Conversion of raw ADC codes to volts per channel {channel: (scale, offset)}
+        self._ain_scaling: dict = {}
+        # Interval between two polls of the device, chosen by the capture process
+        self._poll_interval: float = 0
+        # How the offset settling of the last capture ended
+        self._settling_result: dict = {}
+        # Timing histograms of the capture loop stages, reported periodically by the capture process
+        self._capture_statistics: dict = {}
+        # Depth and drop counters of the preview and the capture channel
+        self._channel_statistics: dict = {}
+        # Number of chunks the controller takes from the channels per drain
+        self._ingest_statistics: dict = {}
+        # Number of times the capture process had to wait for the full capture channel
+        self._capture_channel_alarms: int = 0
+        # File the capture process writes the recording to
+        self._recording_file: str = ""
         # The length of the recording
         self._recording_time: float = 0
+        # Cumulative sample accounting of the stream
+        self._samples_received: int = 0
+        self._samples_lost: int = 0
+        self._samples_corrupted: int = 0
 
         # Flag if the capturing is finished
         self._capturing_finished: bool = False
@@ -138,6 +597,19 @@ class AD2CaptDeviceCapturingModel:
         self._recorded_samples_df = value
 
 
+    @property
+    def ain_scaling(self) -> dict:
+        return self._ain_scaling
+
+    @ain_scaling.setter
+    def ain_scaling(self, value: dict):
+        self._ain_scaling = value
+        channels = sorted(value)
+        for recording in (self.stream, self.capture):
+            recording.channels = channels
+            recording.scale = np.array([value[channel][0] for channel in channels])
+            recording.offset = np.array([value[channel][1] for channel in channels])
+
     @property
     def recording_time(self) -> float:
         return self._recording_time
@@ -165,6 +637,26 @@ class AD2CaptDeviceCapturingModel:
         self._samples_corrupted = value
         self.signals.samples_corrupted_changed.emit(self.samples_corrupted)
 
+    @property
+    def samples_received(self) -> int:
+        return self._samples_received
+
+    @samples_received.setter
+    def samples_received(self, value: int):
+        self._samples_received = value
+        self.signals.samples_received_changed.emit(self.samples_received)
+
+    @property
+    def loss_rate(self) -> float:
+        """ Returns the fraction of samples that have been lost since the stream has been started."""
+        total = self._samples_received + self._samples_lost
+        return self._samples_lost / total if total else 0.0
+
+    @property
+    def corruption_rate(self) -> float:
+        """ Returns the fraction of the received samples that could be corrupt."""
+        return self._samples_corrupted / self._samples_received if self._samples_received else 0.0
+
     @property
     def capturing_finished(self) -> bool:
         return self._capturing_finished
@@ -261,6 +753,153 @@ class AD2CaptDeviceCapturingModel:
         self.config.streaming_rate.set(value)
         self.signals.streaming_rate_changed.emit(self.streaming_rate)
 
+    @property
+    def stream_transport(self) -> str:
+        return self.config.stream_transport.get()
+
+    @property
+    def preview_queue_length(self) -> int:
+        """ Returns the maximum number of chunks in the preview queue."""
+        return self.config.preview_queue_length.get()
+
+    @property
+    def capture_queue_length(self) -> int:
+        """ Returns the maximum number of chunks in the capture channel."""
+        return self.config.capture_queue_length.get()
+
+    @property
+    def stream_buffer_size(self) -> int:
+        """ Returns the size of the shared memory ring buffer in bytes."""
+        return int(self.config.stream_buffer_size.get() * 1024 * 1024)
+
+    @property
+    def raw_samples(self) -> bool:
+        return self.config.raw_samples.get()
+
+    @property
+    def poll_watermark(self) -> float:
+        return self.config.poll_watermark.get()
+
+    @property
+    def stream_block_size(self) -> int:
+        return self.config.stream_block_size.get()
+
+    @property
+    def stream_max_latency(self) -> float:
+        return self.config.stream_max_latency.get()
+
+    @property
+    def capture_length(self) -> tuple:
+        """ Returns the length of a fixed-length capture as (samples, seconds). (0, 0) captures until stopped."""
+        return int(self.config.capture_length_samples.get()), float(self.config.capture_length_seconds.get())
+
+    @property
+    def keep_session(self) -> bool:
+        """ Returns True, if the device is kept open and configured between captures."""
+        return self.config.keep_session.get()
+
+    @property
+    def settling(self) -> tuple:
+        """ Returns the settling threshold (V), window (s), timeout (s) and signal period (s)."""
+        return (self.config.settle_threshold.get(), self.config.settle_window.get(),
+                self.config.settle_timeout.get(), self.config.settle_period.get())
+
+    @property
+    def settling_result(self) -> dict:
+        """ Returns how the offset settling of the last capture ended (settled, timed_out, elapsed, drift)."""
+        return self._settling_result
+
+    @settling_result.setter
+    def settling_result(self, value: dict):
+        self._settling_result = value
+        self.signals.settling_result_changed.emit(self.settling_result)
+
+    @property
+    def record_to_disk(self) -> bool:
+        return self.config.record_to_disk.get()
+
+    @property
+    def record_directory(self) -> str:
+        return str(self.config.record_directory.get())
+
+    @property
+    def memory_budget(self) -> int:
+        return self.config.memory_budget.get()
+
+    @property
+    def keep_spill_file(self) -> bool:
+        return self.config.keep_spill_file.get()
+
+    @property
+    def recording_file(self) -> str:
+        return self._recording_file
+
+    @recording_file.setter
+    def recording_file(self, value: str):
+        self._recording_file = value
+        self.signals.recording_file_changed.emit(self.recording_file)
+
+    @property
+    def capture_mode(self) -> str:
+        return self.config.capture_mode.get()
+
+    @property
+    def trigger_settings(self) -> dict:
+        """ Returns the trigger settings of the triggered capture mode."""
+        return {
+            'channel': self.config.trigger_channel.get(),
+            'level': self.config.trigger_level.get(),
+            'hysteresis': self.config.trigger_hysteresis.get(),
+            'rising': self.config.trigger_edge.get() == "rising",
+            'pre_samples': self.config.trigger_pre_samples.get(),
+            'post_samples': self.config.trigger_post_samples.get(),
+        }
+
+    @property
+    def poll_interval(self) -> float:
+        return self._poll_interval
+
+    @poll_interval.setter
+    def poll_interval(self, value: float):
+        self._poll_interval = value
+        self.signals.poll_interval_changed.emit(self.poll_interval)
+
+    @property
+    def capture_statistics(self) -> dict:
+        return self._capture_statistics
+
+    @capture_statistics.setter
+    def capture_statistics(self, value: dict):
+        self._capture_statistics = value
+        self.signals.capture_statistics_changed.emit(self.capture_statistics)
+
+    @property
+    def channel_statistics(self) -> dict:
+        return self._channel_statistics
+
+    @channel_statistics.setter
+    def channel_statistics(self, value: dict):
+        self._channel_statistics = value
+        self.signals.channel_statistics_changed.emit(self.channel_statistics)
+
+    @property
+    def ingest_statistics(self) -> dict:
+        return self._ingest_statistics
+
+    @ingest_statistics.setter
+    def ingest_statistics(self, value: dict):
+        self._ingest_statistics = value
+        self.signals.ingest_statistics_changed.emit(self.ingest_statistics)
+
+    @property
+    def capture_channel_alarms(self) -> int:
+        return self._capture_channel_alarms
+
+    @capture_channel_alarms.setter
+    def capture_channel_alarms(self, value: int):
+        self._capture_channel_alarms = value
+        self.signals.capture_channel_alarms_changed.emit(self.capture_channel_alarms)
+
     @property
     def streaming_deque_length(self):
         return int((self.streaming_history / 1000) * self.sample_rate)
@@ -63,6 +63,20 @@ class AD2CaptDeviceInformationModel:
         self._connected_devices = value
         self.signals.connected_devices_changed.emit(self.connected_devices)
 
+    @property
+    def known_devices(self) -> list:
+        """ Returns the devices found by the last discovery, marked as cached."""
+        return [dict(device, cached=True) for device in self._config.known_devices.get()]
+
+    @known_devices.setter
+    def known_devices(self, value: list):
+        self._config.known_devices.set([{key: device[key] for key in device if key != 'cached'} for device in value])
+
+    @property
+    def capability_cache(self) -> str:
+        """ Returns the file the device capabilities are cached in."""
+        return str(self._config.capability_cache.get())
+
     @property
     def selected_device_index(self) -> int:
         return self._config.selected_device_index.get()
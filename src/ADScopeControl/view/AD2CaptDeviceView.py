@@ -83,10 +83,15 @@ class ControlWindow(QMainWindow):
         self.stream_update_timer.setInterval(50)
         self.stream_update_timer.timeout.connect(self.update_stream)
 
+        # Serial number of the device selected in the capture process
+        self._selected_device: str = None
+
         # Connect the signals and controls
         self._connect_config_properties()
         self._connect_controls()
         self._connect_signals()
+        # The controller may already list the devices of the last session or the ones discovered so far
+        self._on_connected_devices_changed(self.model.device_information.connected_devices)
         # self._init_other_ui_elements()
         # self._ui.cb_duration_streaming_history.setCurrentIndex(5)
 
@@ -194,6 +199,10 @@ class ControlWindow(QMainWindow):
         self.model.capturing_information.signals.device_capturing_state_changed.connect(
             self._on_capture_process_state_changed)
         self.model.analog_in.signals.selected_ain_channel_changed.connect(self._on_selected_ain_channel_changed)
+        self.model.capturing_information.signals.samples_received_changed.connect(self._on_sample_accounting_changed)
+        self.model.capturing_information.signals.samples_lost_changed.connect(self._on_sample_accounting_changed)
+        self.model.capturing_information.signals.samples_corrupted_changed.connect(
+            self._on_sample_accounting_changed)
 
 
 
@@ -235,12 +244,23 @@ class ControlWindow(QMainWindow):
         :return:
         """
         selection_index = self.model.device_information.selected_device_index
+        # The list is rebuilt for every discovered device, so rebuilding must not select a device
+        self._ui.cb_device_select.blockSignals(True)
         self._ui.cb_device_select.clear()
         for it, dev in enumerate(connected_devices):
             dev: dict
             #  'type': type, 'device_id', 'device_name', 'serial_number'
-            self._ui.cb_device_select.addItem(f"{it}: {dev['type']}{dev['device_id']} - {dev['device_name']}")
+            last_seen = " (last seen)" if dev.get('cached', False) else ""
+            self._ui.cb_device_select.addItem(f"{it}: {dev['type']}{dev['device_id']} - {dev['device_name']}"
+                                              f"{last_seen}")
         self._ui.cb_device_select.setCurrentIndex(selection_index)
+        self._ui.cb_device_select.blockSignals(False)
+        # Devices of the last session are only shown, the device is selected once it has been discovered again
+        if selection_index < len(connected_devices) and not connected_devices[selection_index].get('cached', False):
+            selected_device = connected_devices[selection_index]['serial_number']
+            if selected_device != self._selected_device:
+                self._selected_device = selected_device
+                self._on_ui_selected_device_index_changed(selection_index)
 
     def _on_device_state_changed(self, capturing):
         if capturing == AD2Constants.DeviceState.ACQ_NOT_STARTED():
@@ -274,6 +294,10 @@ class ControlWindow(QMainWindow):
     # UI Slots
     # ==================================================================================================================
     def _on_ui_selected_device_index_changed(self, index):
+        devices = self.model.device_information.connected_devices
+        if index < 0 or index >= len(devices) or devices[index].get('cached', False):
+            return
+        self._selected_device = devices[index]['serial_number']
         self.controller.set_selected_device(index)
 
     def _ui_on_selected_ain_changed(self, channel_index):
@@ -370,24 +394,36 @@ class ControlWindow(QMainWindow):
     def _on_device_name_changed(self, device_name):
         self.dev_info.device_name = device_name
 
+    def _on_sample_accounting_changed(self, *args):
+        capt_info = self.model.capturing_information
+        self.capt_info.lbl_samples_lost.setText(
+            f"Lost samples: {capt_info.samples_lost} ({capt_info.loss_rate * 100:.3f} %)")
+        self.capt_info.led_samples_lost.set_color(color="red" if capt_info.samples_lost else "green")
+        self.capt_info.lbl_samples_corrupted.setText(
+            f"Corrupted samples: {capt_info.samples_corrupted} ({capt_info.corruption_rate * 100:.3f} %)")
+        self.capt_info.led_samples_corrupted.set_color(color="yellow" if capt_info.samples_corrupted else "green")
+
     def _on_device_serial_number_changed(self, serial_number):
         self.dev_info.serial_number = serial_number
 
     # ============== Plotting
+    @staticmethod
+    def _plot_points(scope: pg.PlotWidget) -> int:
+        """ Returns the number of points the plot can resolve: a minimum and a maximum per pixel column."""
+        return 2 * int(scope.getViewBox().width())
+
     def update_capture(self):
-        # Plot the downsampled data
+        # Plot the min/max envelope of the data, one pair per pixel column
         self.scope_captured.clear()
-        self.scope_captured.plot(
-            self.model.capturing_information.capture.downsample(), 
-            pen=pg.mkPen(width=1)
-        )
+        capture = self.model.capturing_information.capture
+        for it, column in enumerate(capture.downsample(self._plot_points(self.scope_captured)).T):
+            self.scope_captured.plot(column, pen=pg.mkPen(color=pg.intColor(it), width=1))
 
     def update_stream(self):
         self.scope_original.clear()
-        self.scope_original.plot(
-            self.model.capturing_information.stream.downsample(),
-            pen=pg.mkPen(width=1)
-        )
+        stream = self.model.capturing_information.stream
+        for it, column in enumerate(stream.downsample(self._plot_points(self.scope_original)).T):
+            self.scope_original.plot(column, pen=pg.mkPen(color=pg.intColor(it), width=1))
 
     # ============== Connected Device Information
     def _on_num_of_connected_devices_changed(self, num_of_connected_devices):
@@ -28,7 +28,15 @@ class WidgetCapturingInformation(QWidget):
         layout.addWidget(self.led_device_state, 2, 0)
         layout.addWidget(self.lbl_device_state, 2, 1)
 
-
+        self.lbl_samples_lost = QLabel("Lost samples: 0")
+        self.led_samples_lost = LEDIndicatorWidget(color="gray")
+        layout.addWidget(self.led_samples_lost, 3, 0)
+        layout.addWidget(self.lbl_samples_lost, 3, 1)
+
+        self.lbl_samples_corrupted = QLabel("Corrupted samples: 0")
+        self.led_samples_corrupted = LEDIndicatorWidget(color="gray")
+        layout.addWidget(self.led_samples_corrupted, 4, 0)
+        layout.addWidget(self.lbl_samples_corrupted, 4, 1)
 
         grid_group_box.setLayout(layout)
         self.layout.addWidget(grid_group_box)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Run the tests against the sources of the checkout
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
@@ -0,0 +1,295 @@
+import json
+import threading
+
+import numpy as np
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.model.submodels.AD2CaptDeviceCapturingModel import Recording, Stream, downsample_data
+
+
+def chunk(first: int, samples: int, channels: int = 2, lost: int = 0, corrupted: int = 0, dtype=np.float64):
+    """ Chunk whose samples are their absolute sample index."""
+    values = np.arange(first, first + samples, dtype=dtype)
+    return DataChunk(np.tile(values, (channels, 1)), first, lost, corrupted, channel_mask=(1 << channels) - 1)
+
+
+# ======================================================================================================================
+# Recording
+# ======================================================================================================================
+def test_recording_appends_chunks_in_order():
+    recording = Recording()
+    recording.append_chunks([chunk(0, 100), chunk(100, 50)])
+    recording.append_chunk(chunk(150, 25))
+
+    assert len(recording) == 175
+    assert recording.array.shape == (175, 2)
+    np.testing.assert_array_equal(recording.array[:, 1], np.arange(175))
+    assert recording.first_sample_index == 0
+    assert list(recording.headers['row']) == [0, 100, 150]
+
+
+def test_recording_grows_by_doubling():
+    recording = Recording()
+    capacities = set()
+    for first in range(0, 100_000, 1000):
+        recording.append_chunk(chunk(first, 1000))
+        capacities.add(recording.capacity)
+
+    assert len(recording) == 100_000
+    assert recording.capacity >= len(recording)
+    # Amortized growth: only a handful of reallocations
+    assert len(capacities) <= 6
+    np.testing.assert_array_equal(recording.array[:, 0], np.arange(100_000))
+
+
+def test_recording_keeps_the_dtype_of_raw_codes():
+    recording = Recording()
+    recording.append_chunk(chunk(0, 10, dtype=np.int16))
+    assert recording.array.dtype == np.int16
+
+    recording.append_chunk(chunk(10, 10))
+    assert recording.array.dtype == np.float64
+    np.testing.assert_array_equal(recording.array[:, 0], np.arange(20))
+
+
+def test_recording_indexes_gaps():
+    recording = Recording()
+    recording.append_chunks([chunk(0, 10), chunk(15, 10, lost=5), chunk(25, 10, corrupted=2)])
+
+    np.testing.assert_array_equal(recording.gaps, [[10, 5, 0], [20, 0, 2]])
+    np.testing.assert_array_equal(recording.sample_indices(), np.r_[0:10, 15:35])
+    np.testing.assert_allclose(recording.time_axis(1000.0), np.r_[0:10, 15:35] / 1000.0)
+
+
+def test_recording_converts_raw_codes_to_volts():
+    recording = Recording()
+    recording.scale = np.array([0.5, 2.0])
+    recording.offset = np.array([1.0, 0.0])
+    recording.append_chunk(chunk(0, 4, dtype=np.int16))
+
+    frame = recording.to_frame()
+    np.testing.assert_allclose(frame[0], np.arange(4) * 0.5 + 1.0)
+    np.testing.assert_allclose(frame[1], np.arange(4) * 2.0)
+
+
+def test_recording_clear_starts_a_new_recording():
+    recording = Recording()
+    recording.append_chunks([chunk(0, 10), chunk(20, 10, lost=10)])
+    recording.clear()
+
+    assert len(recording) == 0
+    assert recording.first_sample_index is None
+    assert recording.gaps.shape == (0, 3)
+    assert len(recording.headers) == 0
+    recording.append_chunk(chunk(500, 10))
+    assert recording.first_sample_index == 500
+    assert recording.gaps.shape == (0, 3)
+
+
+def test_recording_from_one_dimensional_array():
+    recording = Recording(np.arange(5.0))
+    recording.append(np.arange(5.0, 8.0))
+    np.testing.assert_array_equal(recording.array[:, 0], np.arange(8.0))
+
+
+# ======================================================================================================================
+# Stream
+# ======================================================================================================================
+def test_stream_keeps_the_newest_samples():
+    stream = Stream(max_number=100)
+    for first in range(0, 1000, 30):
+        stream.append_chunks([chunk(first, 30)])
+
+    assert len(stream) == 100
+    assert stream.capacity == 100
+    np.testing.assert_array_equal(stream.array[:, 0], np.arange(920, 1020))
+
+
+def test_stream_segments_are_the_ordered_window():
+    stream = Stream(max_number=64)
+    stream.append_chunks([chunk(0, 50), chunk(50, 50)])
+
+    older, newer = stream.segments()
+    np.testing.assert_array_equal(np.concatenate((older, newer))[:, 0], np.arange(36, 100))
+
+
+def test_stream_chunk_larger_than_the_window():
+    stream = Stream(max_number=10)
+    stream.append_chunk(chunk(0, 25))
+    np.testing.assert_array_equal(stream.array[:, 1], np.arange(15, 25))
+
+
+def test_stream_resize_keeps_the_newest_samples():
+    stream = Stream(max_number=100)
+    stream.append_chunk(chunk(0, 150))
+
+    stream.resize(40)
+    np.testing.assert_array_equal(stream.array[:, 0], np.arange(110, 150))
+    stream.resize(200)
+    stream.append_chunk(chunk(150, 10))
+    np.testing.assert_array_equal(stream.array[:, 0], np.arange(110, 160))
+
+
+def test_stream_promotes_the_dtype():
+    stream = Stream(max_number=20)
+    stream.append_chunk(chunk(0, 15, dtype=np.int16))
+    stream.append_chunk(chunk(15, 10))
+
+    assert stream.array.dtype == np.float64
+    np.testing.assert_array_equal(stream.array[:, 0], np.arange(5, 25))
+
+
+def test_stream_keeps_seeded_samples():
+    stream = Stream(max_number=10)
+    stream.array = np.arange(6.0).reshape(6, 1)
+    # One channel, two samples
+    stream.append(np.array([[100.0, 101.0]]))
+    np.testing.assert_array_equal(stream.array[:, 0], [0, 1, 2, 3, 4, 5, 100, 101])
+
+    stream = Stream(np.arange(8.0), max_number=10)
+    stream.append(np.arange(100.0, 104.0))
+    np.testing.assert_array_equal(stream.array[:, 0], [2, 3, 4, 5, 6, 7, 100, 101, 102, 103])
+
+
+def test_stream_window_is_never_empty():
+    stream = Stream(max_number=0)
+    stream.append_chunk(chunk(0, 5))
+    np.testing.assert_array_equal(stream.array[:, 0], [4])
+
+
+def test_stream_without_window_grows():
+    stream = Stream()
+    stream.append_chunks([chunk(0, 5000), chunk(5000, 5000)])
+    assert len(stream) == 10_000
+
+
+# ======================================================================================================================
+# Spilling and export
+# ======================================================================================================================
+def spilled_recording(directory, samples: int = 20_000) -> Recording:
+    recording = Recording()
+    recording.channels = [0, 1]
+    recording.memory_budget = 16 * 1024
+    recording.spill_directory = directory
+    for first in range(0, samples, 1000):
+        recording.append_chunk(chunk(first, 1000, dtype=np.int16))
+    return recording
+
+
+def test_recording_beyond_the_memory_budget_continues_in_a_file(tmp_path):
+    recording = spilled_recording(tmp_path)
+
+    assert recording.spill_path is not None and recording.spill_path.parent == tmp_path
+    assert isinstance(recording.array, np.memmap)
+    np.testing.assert_array_equal(recording.array[:, 0], np.arange(20_000, dtype=np.int16))
+
+
+def test_export_frame_columns(tmp_path):
+    recording = Recording()
+    recording.channels = [0, 1]
+    recording.append_chunks([chunk(100, 10), chunk(115, 10, lost=5)])
+
+    frame = recording.export_frame(1000.0)
+    assert list(frame.columns) == ["Amplitude (CH0)", "Amplitude (CH1)", "sample index", "time (s)", "time (ms)"]
+    np.testing.assert_array_equal(frame["sample index"], np.r_[100:110, 115:125])
+    np.testing.assert_allclose(frame["time (s)"], (np.r_[100:110, 115:125] - 100) / 1000.0)
+    np.testing.assert_allclose(frame["time (ms)"], np.r_[0:10, 15:25])
+
+
+def test_export_frame_of_a_spilled_recording(tmp_path):
+    recording = spilled_recording(tmp_path)
+    recording.scale = 0.5
+
+    frame = recording.export_frame(1000.0, name="Volt")
+    np.testing.assert_allclose(frame["Volt (CH0)"], np.arange(20_000) * 0.5)
+    np.testing.assert_array_equal(frame["sample index"], np.arange(20_000))
+    # The derived columns are files next to the spill file
+    assert recording.spill_path.with_name(f"{recording.spill_path.name}.time_s").exists()
+    del frame
+
+
+def test_clear_deletes_the_spill_file(tmp_path):
+    recording = spilled_recording(tmp_path)
+    recording.export_frame(1000.0)
+    recording.clear()
+
+    assert recording.spill_path is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_kept_spill_file_can_be_opened(tmp_path):
+    recording = spilled_recording(tmp_path, samples=5000)
+    recording.keep_spill_file = True
+    spill_path = recording.spill_path
+    recording.clear()
+
+    metadata = json.loads(spill_path.with_name(f"{spill_path.name}.json").read_text())
+    assert metadata['rows'] == 5000
+    samples = np.memmap(spill_path, dtype=np.dtype(metadata['dtype']), mode='r',
+                        shape=(metadata['rows'], *metadata['columns']))
+    np.testing.assert_array_equal(samples[:, 1], np.arange(5000))
+
+
+# ======================================================================================================================
+# Downsampling
+# ======================================================================================================================
+def test_downsample_keeps_short_data():
+    data = np.arange(10.0)
+    assert downsample_data(data, 10) is data
+    assert downsample_data(data, None) is data
+
+
+def test_downsample_returns_at_most_num_points_rows():
+    data = np.random.default_rng(0).normal(size=(10_001, 2))
+    for num_points in (0, 1, 2, 3, 100, 1001):
+        assert len(downsample_data(data, num_points)) <= num_points
+    np.testing.assert_array_equal(downsample_data(data, 1), data[-1:])
+
+
+def test_downsample_keeps_spikes():
+    data = np.zeros((100_000, 2))
+    data[12_345, 0] = 5.0
+    data[67_890, 1] = -3.0
+
+    envelope = downsample_data(data, 200)
+    assert envelope.shape == (200, 2)
+    assert envelope[:, 0].max() == 5.0
+    assert envelope[:, 1].min() == -3.0
+    # Minimum and maximum of each bucket alternate
+    assert np.all(envelope[0::2] <= envelope[1::2])
+
+
+def test_recording_downsample_converts_to_volts():
+    recording = Recording(show_number=100)
+    recording.scale = 0.5
+    recording.append_chunk(chunk(0, 1000, channels=1, dtype=np.int16))
+
+    envelope = recording.downsample()
+    assert len(envelope) == 100
+    assert envelope.dtype == np.float64
+    assert envelope[0] == 0.0 and envelope[-1] == 999 * 0.5
+
+
+# ======================================================================================================================
+# Concurrent access
+# ======================================================================================================================
+def test_clear_while_appending_from_another_thread():
+    recording = Recording()
+    errors = []
+
+    def ingest():
+        try:
+            for first in range(0, 2_000_000, 1000):
+                recording.append_chunks([chunk(first, 1000)])
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=ingest)
+    thread.start()
+    while thread.is_alive():
+        recording.clear()
+        recording.downsample(100)
+    thread.join()
+
+    assert errors == []
+    assert recording.array.shape[1] in (1, 2)
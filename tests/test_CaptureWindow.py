@@ -0,0 +1,81 @@
+from ADScopeControl.controller.mp_AD2Capture.CaptureWindow import CaptureWindow
+
+
+def test_request_time_is_resolved_to_a_sample_index():
+    window = CaptureWindow(sample_rate=1000)
+    # The read [1000, 1100) was fetched at 10 s, the request was issued 50 ms earlier
+    assert window.sample_index_at(9_950_000_000, 1000, 1100, 10_000_000_000) == 1050
+    # Requests outside the read are limited to it
+    assert window.sample_index_at(1, 1000, 1100, 10_000_000_000) == 1000
+    assert window.sample_index_at(11_000_000_000, 1000, 1100, 10_000_000_000) == 1100
+    assert window.sample_index_at(0, 1000, 1100, 10_000_000_000) == 1100
+
+
+def test_open_ended_capture_is_cut_at_the_stop_index():
+    window = CaptureWindow(sample_rate=1000)
+    window.start(150)
+
+    assert window.active and window.captured is None
+    assert window.cut(100, 200) == (50, 100)
+    assert window.cut(200, 300) == (0, 100)
+    assert not window.finished(300)
+
+    window.stop(320)
+    assert window.stop_requested
+    assert window.cut(300, 400) == (0, 20)
+    assert window.finished(400)
+    assert window.captured == 170
+    assert window.contains(319) and not window.contains(320) and not window.contains(149)
+
+
+def test_fixed_length_capture_ends_by_itself():
+    window = CaptureWindow(sample_rate=1000, length=100)
+    window.start(50)
+
+    assert window.cut(0, 100) == (50, 100)
+    assert window.cut(100, 200) == (0, 50)
+    assert window.cut(200, 300) is None
+    assert window.finished(200)
+    assert window.captured == 100
+    assert not window.stop_requested
+
+
+def test_stop_may_only_shorten_a_fixed_length_capture():
+    window = CaptureWindow(sample_rate=1000, length=100)
+    window.start(0)
+    window.stop(500)
+    assert window.end_index == 100
+
+    window.start(0)
+    window.stop(40)
+    assert window.end_index == 40
+
+
+def test_stop_before_the_start_captures_nothing():
+    window = CaptureWindow(sample_rate=1000)
+    window.start(100)
+    window.stop(50)
+    assert window.captured == 0
+    assert window.cut(0, 200) is None
+
+
+def test_completed_capture_waits_until_the_start_request_is_withdrawn():
+    window = CaptureWindow(sample_rate=1000, length=10)
+    assert window.may_start(True)
+    window.start(0)
+    assert not window.may_start(True)
+
+    window.reset(completed=True)
+    assert not window.active
+    assert not window.may_start(True)
+    assert not window.may_start(False)
+    assert window.may_start(True)
+
+
+def test_stopped_capture_can_be_restarted_right_away():
+    window = CaptureWindow(sample_rate=1000)
+    window.start(0)
+    window.stop(10)
+    window.reset()
+    assert window.may_start(True)
+    assert window.cut(0, 100) is None
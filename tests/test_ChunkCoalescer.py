@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+
+from ADScopeControl.controller.mp_AD2Capture.ChunkCoalescer import ChunkCoalescer
+
+
+def reads(count: int, samples: int, channels: int = 2):
+    for it in range(count):
+        yield np.arange(it * samples, (it + 1) * samples, dtype=np.float64) * np.ones((channels, 1)), it * samples
+
+
+def test_reads_are_published_in_blocks():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=100, max_latency=10, channels=2)
+    for samples, first in reads(10, 25):
+        coalescer.add(samples, first)
+
+    assert [chunk.first_sample_index for chunk in published] == [0, 100]
+    assert all(chunk.samples.shape == (2, 100) for chunk in published)
+    np.testing.assert_array_equal(np.concatenate([chunk.samples for chunk in published], axis=1)[0], np.arange(200))
+    assert coalescer.pending == 50
+    assert (coalescer.reads, coalescer.published) == (10, 2)
+
+
+def test_flush_publishes_the_pending_samples():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=100, max_latency=10, channels=2)
+    for samples, first in reads(3, 10):
+        coalescer.add(samples, first)
+    coalescer.flush()
+
+    assert len(published) == 1 and published[0].samples.shape == (2, 30)
+    assert coalescer.pending == 0
+    coalescer.flush()
+    assert len(published) == 1
+
+
+def test_published_blocks_do_not_share_the_buffer():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=20, max_latency=10, channels=2)
+    for samples, first in reads(4, 10):
+        coalescer.add(samples, first)
+
+    np.testing.assert_array_equal(published[0].samples[0], np.arange(20))
+    np.testing.assert_array_equal(published[1].samples[0], np.arange(20, 40))
+
+
+def test_large_reads_are_published_as_they_are():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=100, max_latency=10, channels=2)
+    coalescer.add(np.zeros((2, 10)), 0)
+    coalescer.add(np.ones((2, 150)), 10)
+
+    assert [(chunk.first_sample_index, chunk.sample_count) for chunk in published] == [(0, 10), (10, 150)]
+
+
+def test_lost_and_corrupted_samples_start_a_new_block():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=100, max_latency=10, channels=1)
+    coalescer.add(np.zeros((1, 10)), 0)
+    coalescer.add(np.zeros((1, 10)), 15, lost=5)
+    coalescer.add(np.zeros((1, 10)), 25)
+    coalescer.add(np.zeros((1, 10)), 35, corrupted=2)
+    coalescer.flush()
+
+    assert [(chunk.first_sample_index, chunk.sample_count, chunk.lost, chunk.corrupted) for chunk in published] == \
+        [(0, 10, 0, 0), (15, 20, 5, 0), (35, 10, 0, 2)]
+
+
+def test_poll_publishes_after_the_maximum_latency():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=100, max_latency=0.02, channels=1)
+    coalescer.add(np.zeros((1, 10)), 0)
+    coalescer.poll()
+    assert not published
+
+    time.sleep(0.03)
+    coalescer.poll()
+    assert len(published) == 1 and published[0].sample_count == 10
+
+
+def test_block_timestamp_refers_to_the_last_read():
+    published = []
+    coalescer = ChunkCoalescer(published.append, block_size=20, max_latency=10, channels=1)
+    coalescer.add(np.zeros((1, 10)), 0, timestamp_ns=1)
+    coalescer.add(np.zeros((1, 10)), 10, timestamp_ns=2)
+
+    assert published[0].timestamp_ns == 2
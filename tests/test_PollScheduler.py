@@ -0,0 +1,88 @@
+import pytest
+
+from ADScopeControl.controller.mp_AD2Capture import PollScheduler as poll_scheduler
+from ADScopeControl.controller.mp_AD2Capture.PollScheduler import PollScheduler
+
+SAMPLE_RATE = 100_000
+BUFFER_SIZE = 8192
+WATERMARK = 0.5
+BOUND = BUFFER_SIZE * WATERMARK / SAMPLE_RATE
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(poll_scheduler.time, 'perf_counter', clock)
+    return clock
+
+
+def poll(scheduler: PollScheduler, clock: Clock, rate: float) -> float:
+    """ Polls after the current interval and finds the samples acquired at the given rate meanwhile."""
+    interval = scheduler.poll_interval
+    clock.now += interval
+    return scheduler.update(int(rate * interval))
+
+
+def test_initial_interval_fills_half_the_watermark():
+    scheduler = PollScheduler(SAMPLE_RATE, BUFFER_SIZE, WATERMARK)
+    assert scheduler.poll_interval == pytest.approx(0.5 * BOUND)
+
+
+def test_interval_shrinks_as_the_fill_level_rises(clock):
+    scheduler = PollScheduler(SAMPLE_RATE, BUFFER_SIZE, WATERMARK)
+    scheduler.update(0)
+    intervals, fill_levels = [], []
+    for rate in (SAMPLE_RATE, 1.5 * SAMPLE_RATE, 2 * SAMPLE_RATE, 3 * SAMPLE_RATE):
+        for _ in range(20):
+            intervals.append(poll(scheduler, clock, rate))
+            fill_levels.append(scheduler.fill_level)
+
+    assert intervals[19] > intervals[39] > intervals[59] > intervals[79]
+    assert max(fill_levels[-20:]) < WATERMARK
+
+
+def test_interval_drops_to_the_minimum_above_the_watermark(clock):
+    scheduler = PollScheduler(SAMPLE_RATE, BUFFER_SIZE, WATERMARK, min_interval=0.0005)
+    scheduler.update(0)
+    clock.now += 0.01
+    assert scheduler.update(int(0.8 * BUFFER_SIZE)) == 0.0005
+    assert scheduler.fill_level == pytest.approx(0.8, abs=1e-3)
+
+
+def test_interval_grows_back_when_the_fill_level_falls(clock):
+    scheduler = PollScheduler(SAMPLE_RATE, BUFFER_SIZE, WATERMARK)
+    scheduler.update(0)
+    for _ in range(20):
+        poll(scheduler, clock, 4 * SAMPLE_RATE)
+    shortest = scheduler.poll_interval
+    for _ in range(40):
+        poll(scheduler, clock, SAMPLE_RATE)
+
+    assert scheduler.poll_interval > shortest
+    assert scheduler.poll_interval == pytest.approx(0.5 * BOUND, rel=0.05)
+
+
+def test_interval_stays_within_the_watermark_bound(clock):
+    scheduler = PollScheduler(SAMPLE_RATE, BUFFER_SIZE, WATERMARK, max_interval=1.0)
+    scheduler.update(0)
+    # Polls that find fewer samples than the sample rate produces must not stretch the interval
+    for available in (0, 10, 0, 100, 0, 0, 5, 0):
+        clock.now += 0.05
+        assert scheduler.update(available) <= BOUND
+    for rate in (0.1 * SAMPLE_RATE, SAMPLE_RATE, 5 * SAMPLE_RATE, 0):
+        for _ in range(10):
+            assert poll(scheduler, clock, rate) <= BOUND
+
+
+def test_interval_is_limited_by_max_interval():
+    scheduler = PollScheduler(10, BUFFER_SIZE, WATERMARK, max_interval=0.05)
+    assert scheduler.poll_interval == 0.05
@@ -0,0 +1,67 @@
+import numpy as np
+
+from ADScopeControl.controller.mp_AD2Capture.SettlingDetector import SettlingDetector
+
+RATE = 500
+
+
+def feed(detector: SettlingDetector, signal: np.ndarray, read_size: int = 25):
+    """ Feeds the signal read by read and returns the time in seconds at which the detector settled, or None."""
+    for start in range(0, signal.shape[-1], read_size):
+        if detector.update(signal[..., start:start + read_size]):
+            return start / RATE
+    return None
+
+
+def sine_with_decaying_offset(seconds: float = 3.0) -> np.ndarray:
+    t = np.arange(0, seconds, 1 / RATE)
+    return np.sin(2 * np.pi * t) + 0.3 * np.exp(-t / 0.15)
+
+
+def test_sine_with_decaying_offset_settles_over_whole_periods():
+    detector = SettlingDetector(RATE, period=1.0, timeout=100)
+    settled_at = feed(detector, sine_with_decaying_offset())
+
+    assert settled_at is not None and settled_at < 2.0
+    assert detector.result()['settled'] and not detector.result()['timed_out']
+    assert detector.drift < 0.005
+
+
+def test_sine_does_not_settle_without_its_period():
+    # Window means of the sine look like drift
+    detector = SettlingDetector(RATE, timeout=100)
+    assert feed(detector, sine_with_decaying_offset()) is None
+    assert not detector.settled
+
+
+def test_dc_input_settles_without_a_period():
+    t = np.arange(0, 1, 1 / RATE)
+    signal = np.vstack((0.5 + 0.2 * np.exp(-t / 0.05), np.full_like(t, -1.0)))
+    detector = SettlingDetector(RATE, period=0, timeout=100)
+
+    assert feed(detector, signal) is not None
+    assert detector.result() | {'elapsed': 0} == {'settled': True, 'timed_out': False, 'elapsed': 0,
+                                                  'drift': detector.drift}
+
+
+def test_drifting_input_times_out():
+    detector = SettlingDetector(RATE, period=0, timeout=0.05)
+    level = 0.0
+    while not detector.update(np.full((1, 25), level)):
+        # 0.1 V per read, far beyond the threshold
+        level += 0.1
+
+    result = detector.result()
+    assert result['timed_out'] and not result['settled']
+    assert result['elapsed'] >= 0.05
+    assert detector.drift > 0.005
+
+
+def test_drift_is_measured_in_volts():
+    # Raw codes rising by 10 per window of 25 samples, compared with the threshold of 5 mV after scaling
+    codes = np.repeat(np.arange(0, 100, 10), 25)[np.newaxis]
+    detector = SettlingDetector(RATE, period=0, timeout=100, scale=0.0001)
+    assert feed(detector, codes) is not None
+
+    detector = SettlingDetector(RATE, period=0, timeout=100, scale=0.001)
+    assert feed(detector, codes) is None
@@ -0,0 +1,101 @@
+import pickle
+import queue
+
+import numpy as np
+import pytest
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.SharedMemoryRingBuffer import SharedMemoryRingBuffer
+
+
+@pytest.fixture
+def ring():
+    ring = SharedMemoryRingBuffer(16 * 1024)
+    yield ring
+    ring.close()
+
+
+def chunk(number: int, samples: int = 100, channels: int = 1, dtype=np.float64) -> DataChunk:
+    return DataChunk(np.full((channels, samples), number, dtype=dtype), number * samples, timestamp_ns=number,
+                     channel_mask=(1 << channels) - 1)
+
+
+def test_round_trip_keeps_samples_and_header(ring):
+    samples = np.arange(20, dtype=np.int16).reshape(2, 10)
+    ring.put(DataChunk(samples, 1000, lost=3, corrupted=2, timestamp_ns=42, channel_mask=3, trigger_index=1005))
+
+    received = ring.get(block=False)
+    assert received.samples.dtype == np.int16
+    np.testing.assert_array_equal(received.samples, samples)
+    assert (received.first_sample_index, received.lost, received.corrupted) == (1000, 3, 2)
+    assert (received.timestamp_ns, received.channel_mask, received.trigger_index) == (42, 3, 1005)
+    assert received.flags == DataChunk.FLAG_LOST | DataChunk.FLAG_CORRUPTED
+    assert ring.empty()
+
+
+def test_put_copies_non_contiguous_views(ring):
+    buffer = np.arange(40, dtype=np.float64).reshape(2, 20)
+    ring.put(DataChunk(buffer[:, 5:15], 5))
+    buffer[:] = 0
+
+    np.testing.assert_array_equal(ring.get(block=False).samples, np.arange(40).reshape(2, 20)[:, 5:15])
+
+
+def test_one_dimensional_samples(ring):
+    ring.put(DataChunk(np.arange(7, dtype=np.float32)))
+    np.testing.assert_array_equal(ring.get(block=False).samples, np.arange(7, dtype=np.float32))
+
+
+def test_chunks_stay_in_order_across_the_wrap(ring):
+    received = []
+    for number in range(100):
+        ring.put(chunk(number, samples=int(50 + number % 7 * 30)))
+        received.append(ring.get(block=False).first_sample_index // int(50 + number % 7 * 30))
+    assert received == list(range(100))
+    assert ring.overruns == 0
+
+
+def test_empty_ring_raises_empty(ring):
+    with pytest.raises(queue.Empty):
+        ring.get(block=False)
+    with pytest.raises(queue.Empty):
+        ring.get(timeout=0.01)
+
+
+def test_chunk_larger_than_the_ring_is_rejected(ring):
+    with pytest.raises(ValueError):
+        ring.put(chunk(0, samples=ring.capacity))
+
+
+def test_overrun_resumes_at_the_oldest_intact_chunk(ring):
+    for number in range(100):
+        ring.put(chunk(number))
+
+    received = []
+    while not ring.empty():
+        received.append(ring.get(block=False).timestamp_ns)
+
+    # The newest chunks have not been overwritten and are all delivered in order
+    assert received == list(range(100 - len(received), 100))
+    assert len(received) > 1
+    assert ring.overruns == 1
+    assert ring.lost_chunks == 100 - len(received)
+    assert ring.qsize() == 0
+
+
+def test_qsize_and_fill_level(ring):
+    assert ring.qsize() == 0 and ring.fill_level == 0
+    for number in range(3):
+        ring.put(chunk(number))
+    assert ring.qsize() == 3
+    assert 0 < ring.fill_level < 1
+
+
+def test_pickled_ring_attaches_to_the_same_memory(ring):
+    consumer = pickle.loads(pickle.dumps(ring))
+    try:
+        ring.put(chunk(7))
+        assert consumer.get(block=False).timestamp_ns == 7
+        assert ring.empty()
+    finally:
+        consumer.close()
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from ADScopeControl.controller.BaseADScopeController import BaseADScopeController
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.StreamChannels import CaptureChannel, PreviewChannel
+
+
+def chunks(count: int, samples: int = 100, lost: int = 0, corrupted: int = 0) -> list:
+    """ Consecutive chunks, each preceded by lost samples. The samples hold their absolute sample index."""
+    result, first = [], 0
+    for _ in range(count):
+        first += lost
+        result.append(DataChunk(np.arange(first, first + samples, dtype=np.float64)[np.newaxis], first, lost,
+                                corrupted, channel_mask=1))
+        first += samples
+    return result
+
+
+def drain(channel) -> list:
+    received = []
+    while True:
+        batch = channel.get_batch(timeout=0.5)
+        if not batch:
+            return received
+        received += batch
+
+
+def account(received: list) -> SimpleNamespace:
+    """ Feeds the chunks through the sample accounting of the controller and returns the controller."""
+    controller = SimpleNamespace(
+        _first_sample_index=None, _samples_lost=0, _samples_received=0, _accounting_updated=0,
+        logger=logging.getLogger(__name__),
+        model=SimpleNamespace(capturing_information=SimpleNamespace(samples_received=0, samples_lost=0,
+                                                                    samples_corrupted=0)))
+    for chunk in received:
+        BaseADScopeController._account_chunk(controller, chunk)
+    return controller
+
+
+# ======================================================================================================================
+# Capture channel
+# ======================================================================================================================
+def test_capture_channel_delivers_every_chunk_in_order():
+    channel = CaptureChannel(max_depth=4)
+    sent = chunks(20)
+    consumer = threading.Thread(target=lambda: received.extend(drain(channel)))
+    received = []
+    consumer.start()
+    for chunk in sent:
+        assert channel.put(chunk)
+    consumer.join()
+
+    assert [chunk.first_sample_index for chunk in received] == [chunk.first_sample_index for chunk in sent]
+    assert channel.dropped == 0 and channel.dropped_samples == 0
+
+
+def test_full_capture_channel_waits_and_raises_the_alarm():
+    channel = CaptureChannel(max_depth=2, put_timeout=0.02)
+    for chunk in chunks(2):
+        channel.put(chunk)
+    alarms = []
+
+    def consume_later():
+        time.sleep(0.1)
+        channel.get(timeout=1)
+
+    consumer = threading.Thread(target=consume_later)
+    consumer.start()
+    assert channel.put(chunks(1)[0], on_full=alarms.append, keep_waiting=lambda: True)
+    consumer.join()
+
+    assert alarms and all(alarm is channel for alarm in alarms)
+    assert channel.full_events == len(alarms)
+    assert channel.dropped == 0 and channel.dropped_samples == 0
+    assert len(drain(channel)) == 2
+
+
+def test_full_capture_channel_drops_only_when_told_to_stop_waiting():
+    channel = CaptureChannel(max_depth=1, put_timeout=0.01)
+    channel.put(chunks(1)[0])
+    alarms = []
+
+    assert not channel.put(chunks(1, samples=250)[0], on_full=alarms.append, keep_waiting=lambda: False)
+    assert len(alarms) == 1
+    assert channel.dropped == 1
+    assert channel.dropped_samples == 250
+    assert len(drain(channel)) == 1
+
+
+# ======================================================================================================================
+# Preview channel
+# ======================================================================================================================
+@pytest.fixture(params=["queue", "shared_memory"])
+def preview(request):
+    # Room for a few chunks of 100 samples only
+    channel = PreviewChannel(request.param, max_depth=3, buffer_size=4 * 1024)
+    yield channel
+    channel.close()
+
+
+def test_preview_delivers_the_newest_chunks(preview):
+    sent = chunks(50)
+    for chunk in sent:
+        preview.put(chunk)
+    received = drain(preview)
+
+    assert 0 < len(received) < len(sent)
+    assert received[-1].first_sample_index == sent[-1].first_sample_index
+    indices = [chunk.first_sample_index for chunk in received]
+    assert indices == sorted(indices)
+
+
+def test_preview_carries_the_losses_of_dropped_chunks(preview):
+    sent = chunks(50, lost=3, corrupted=2)
+    # The accounting starts at the first received chunk
+    preview.put(sent[0])
+    received = drain(preview)
+    for chunk in sent[1:]:
+        preview.put(chunk)
+    received += drain(preview)
+    # A chunk dropped last hands its losses to the next put
+    final = DataChunk(np.zeros((1, 10)), sent[-1].next_sample_index, channel_mask=1)
+    preview.put(final)
+    received += drain(preview)
+
+    assert sum(chunk.lost for chunk in received) == 3 * len(sent)
+    assert sum(chunk.corrupted for chunk in received) == 2 * len(sent)
+    assert all(chunk.flags & DataChunk.FLAG_LOST for chunk in received[:-1])
+
+    controller = account(received)
+    assert controller.model.capturing_information.samples_lost == 3 * len(sent)
+    assert controller.model.capturing_information.samples_corrupted == 2 * len(sent)
+    # The received samples follow the sample index, including those of the dropped chunks
+    assert controller._samples_received == final.next_sample_index - 3 * len(sent)
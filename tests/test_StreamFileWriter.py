@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.StreamFileWriter import StreamFileWriter
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "records" / "capture.bin"
+    writer = StreamFileWriter(path, 1000.0, [0, 1], dtype=np.int16, scaling={0: (0.1, 0.0), 1: (0.2, -1.0)},
+                              preallocation=64)
+    samples = np.arange(200, dtype=np.int16).reshape(2, 100)
+    writer.write(DataChunk(samples[:, :40], 500))
+    writer.write(DataChunk(samples[:, 40:], 540))
+    writer.close()
+
+    metadata, loaded, gaps = StreamFileWriter.load(path)
+    assert metadata['sample_rate'] == 1000.0
+    assert metadata['channels'] == [0, 1]
+    assert metadata['samples'] == 100
+    assert metadata['first_sample_index'] == 500
+    assert metadata['scaling'] == {'0': [0.1, 0.0], '1': [0.2, -1.0]}
+    assert loaded.dtype == np.int16
+    np.testing.assert_array_equal(loaded, samples.T)
+    assert gaps.shape == (0, 3)
+    # The preallocated space is truncated
+    assert path.stat().st_size == StreamFileWriter.HEADER_SIZE + samples.nbytes
+
+
+def test_gaps_are_indexed(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = StreamFileWriter(path, 1000.0, [0])
+    writer.write(DataChunk(np.zeros((1, 10)), 0))
+    writer.write(DataChunk(np.ones((1, 10)), 15, lost=5))
+    writer.write(DataChunk(np.ones((1, 10)), 25, corrupted=3))
+    writer.close()
+
+    metadata, loaded, gaps = StreamFileWriter.load(path)
+    assert len(loaded) == 30
+    np.testing.assert_array_equal(gaps, [[10, 5, 0], [20, 0, 3]])
+
+
+def test_interrupted_recording_can_be_read_up_to_the_last_header(tmp_path):
+    path = tmp_path / "capture.bin"
+    writer = StreamFileWriter(path, 1000.0, [0], header_interval=0)
+    writer.write(DataChunk(np.arange(10, dtype=np.float64)[np.newaxis], 0))
+
+    metadata, loaded, gaps = StreamFileWriter.load(path)
+    np.testing.assert_array_equal(loaded[:, 0], np.arange(10))
+    del loaded
+    writer.close()
+
+
+def test_empty_recording(tmp_path):
+    path = tmp_path / "capture.bin"
+    StreamFileWriter(path, 1000.0, [0, 1]).close()
+
+    metadata, loaded, gaps = StreamFileWriter.load(path)
+    assert loaded.shape == (0, 2)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        StreamFileWriter.load(path)
@@ -0,0 +1,83 @@
+import numpy as np
+
+from ADScopeControl.controller.mp_AD2Capture.DataChunk import DataChunk
+from ADScopeControl.controller.mp_AD2Capture.TriggerDetector import TriggerDetector
+
+
+def square_wave(length: int, period: int, channels: int = 2) -> np.ndarray:
+    """ Square wave between 0 and 1 with rising edges at multiples of the period. Row 1 holds the sample index."""
+    index = np.arange(length)
+    rows = [(index % period < period // 2).astype(np.float64), index.astype(np.float64)]
+    return np.array(rows[:channels])
+
+
+def feed(detector: TriggerDetector, samples: np.ndarray, read_size: int, first_sample_index: int = 0) -> list:
+    windows = []
+    for start in range(0, samples.shape[1], read_size):
+        windows += detector.process(samples[:, start:start + read_size], first_sample_index + start)
+    return windows
+
+
+def test_windows_around_rising_edges():
+    detector = TriggerDetector(0.5, 0.1, pre_samples=10, post_samples=20)
+    windows = feed(detector, square_wave(1000, 100), 1000)
+
+    # The first edge at sample 0 is not armed, the following edges are at multiples of the period
+    assert [window.trigger_index for window in windows] == list(range(100, 1000, 100))
+    for window in windows:
+        assert window.samples.shape == (2, 30)
+        assert window.first_sample_index == window.trigger_index - 10
+        np.testing.assert_array_equal(window.samples[1], np.arange(window.first_sample_index,
+                                                                   window.first_sample_index + 30))
+        assert window.flags & DataChunk.FLAG_TRIGGERED
+
+
+def test_falling_edges():
+    detector = TriggerDetector(0.5, 0.1, rising=False, pre_samples=5, post_samples=5)
+    windows = feed(detector, square_wave(400, 100), 400)
+    assert [window.trigger_index for window in windows] == [50, 150, 250, 350]
+
+
+def test_windows_span_several_reads():
+    samples = square_wave(2000, 100)
+    expected = feed(TriggerDetector(0.5, 0.1, pre_samples=60, post_samples=30), samples, 2000)
+    for read_size in (1, 7, 33, 100, 250):
+        windows = feed(TriggerDetector(0.5, 0.1, pre_samples=60, post_samples=30), samples, read_size)
+        assert [window.trigger_index for window in windows] == [window.trigger_index for window in expected]
+        for window, reference in zip(windows, expected):
+            np.testing.assert_array_equal(window.samples, reference.samples)
+
+
+def test_pre_trigger_history_is_limited_to_the_first_sample():
+    detector = TriggerDetector(0.5, 0.1, pre_samples=80, post_samples=10)
+    windows = feed(detector, square_wave(200, 100), 200, first_sample_index=1000)
+
+    assert windows[0].trigger_index == 1100
+    assert windows[0].first_sample_index == 1020
+    assert windows[0].sample_count == 90
+
+
+def test_new_trigger_only_after_the_window_ended():
+    detector = TriggerDetector(0.5, 0.1, pre_samples=0, post_samples=150)
+    windows = feed(detector, square_wave(1000, 100), 1000)
+    assert [window.trigger_index for window in windows] == [100, 300, 500, 700]
+
+
+def test_lost_samples_drop_the_pending_window():
+    detector = TriggerDetector(0.5, 0.1, pre_samples=10, post_samples=50)
+    samples = square_wave(400, 100)
+    assert detector.process(samples[:, :120], 0) == []
+    # The window of the trigger at 100 would span the lost samples
+    windows = detector.process(samples[:, 150:], 150, lost=30)
+
+    assert detector.windows_dropped == 1
+    assert [window.trigger_index for window in windows] == [200, 300]
+    assert windows[0].lost == 30 and windows[0].flags & DataChunk.FLAG_LOST
+    assert windows[1].lost == 0
+
+
+def test_raw_codes_keep_their_dtype():
+    detector = TriggerDetector(100, 10, row=0, pre_samples=5, post_samples=5)
+    samples = (square_wave(300, 100, channels=1) * 200).astype(np.int16)
+    windows = feed(detector, samples, 64)
+    assert windows and all(window.samples.dtype == np.int16 for window in windows)